@@ -68,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'dietapp.context_processors.unread_messages',
             ],
         },
     },
@@ -85,6 +86,29 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Cache and live event configuration
+# The food catalog, dashboard and poll results expire their cached copies
+# through version stamps in this cache, and live events reach the other
+# workers' connections through Redis pub/sub, so every worker must share
+# them. Without REDIS_URL each process keeps its own (fine for runserver only).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+    EVENTS_BACKEND = 'dietapp.events.RedisBackend'
+    EVENTS_REDIS_URL = REDIS_URL
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -9,11 +9,8 @@ from django.conf.urls.static import static #New import 2
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('dietapp.urls')),
-    path('register/', views.register, name='register'),
     path('login/', auth_views.LoginView.as_view(template_name='users/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(template_name='users/logout.html'), name='logout'),
-    path('profile/', views.profile, name='profile'),
-    path('polls/', include('polls.urls')),
     path('password-reset/',
         auth_views.PasswordResetView.as_view(
             template_name='users/password_reset.html'
@@ -34,6 +31,8 @@ urlpatterns = [
             template_name='users/password_reset_complete.html'
         ),
         name='password_reset_complete'),
+    # register/, profile/ and users/provision/; login/ and logout/ above take precedence
+    path('', include('users.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,14 +1,39 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
-from .models import Profile, Meal, Vitamin, Mineral, Weekly, Exercise, TDEE, JournalEntry, Message
+from django.db.models.functions import Substr
+from django.utils.timezone import localtime
+from .models import Profile, Meal, Vitamin, Mineral, Weekly, Exercise, TDEE, JournalEntry, Message, DailyNutritionSummary, Food, ColumnHistogram
+from .messaging import broadcast
+from .histograms import histogram_boundaries
+from .pagination import EstimatedCountPaginator
 
 # Use get_user_model() to dynamically fetch the user model
 User = get_user_model()
 
+class BroadcastActionForm(ActionForm):
+    content = forms.CharField(
+        required=False, label="Announcement",
+        widget=forms.TextInput(attrs={'size': 60, 'placeholder': "Message for the send announcement action"}),
+    )
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
-    pass
+    action_form = BroadcastActionForm
+    actions = ['send_announcement']
+
+    @admin.action(description="Send announcement to selected users")
+    def send_announcement(self, request, queryset):
+        content = request.POST.get('content', '').strip()
+        if not content:
+            self.message_user(request, "Write the announcement before running the action.", messages.ERROR)
+            return
+        result = broadcast(request.user, queryset, content)
+        self.message_user(request, f"Announcement sent: {result}.", messages.SUCCESS)
 
 # Custom Admin for Profile
 @admin.register(Profile)
@@ -35,23 +60,142 @@ class ProfileAdmin(admin.ModelAdmin):
     bmi.short_description = 'BMI'
  
 
+# Admin for large tables
+class LeanChangeList(ChangeList):
+    def get_queryset(self, *args, **kwargs):
+        return self.model_admin.lean_queryset(super().get_queryset(*args, **kwargs))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for tables too large to count or read whole on every page.
+
+    Pages are counted by EstimatedCountPaginator (a capped count shows as
+    "10000+") and without the unfiltered total, ordered by the primary key
+    index by default, and the changelist
+    never loads the ``deferred_fields``; a ``preview_fields`` column is shown
+    through ``<field>_preview``, its first ``preview_length`` characters.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-pk',)
+    deferred_fields = ()
+    preview_fields = ()
+    preview_length = 60
+
+    def get_changelist(self, request, **kwargs):
+        return LeanChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator = super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        # Count past the requested page, so the count reaches beyond it
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        paginator.count_limit = paginator.count_limit + (page - 1) * per_page
+        return paginator
+
+    def lean_queryset(self, queryset):
+        # One character past the preview tells whether the text was cut
+        previews = {f'{field}_head': Substr(field, 1, self.preview_length + 1) for field in self.preview_fields}
+        return queryset.annotate(**previews).defer(*self.deferred_fields, *self.preview_fields)
+
+    def preview(self, obj, field):
+        text = getattr(obj, f'{field}_head', None)
+        if text is None:
+            text = getattr(obj, field) or ''
+        if len(text) > self.preview_length:
+            return text[:self.preview_length].rstrip() + '…'
+        return text
+
+
 # Custom Filters
-class HighCalorieMealFilter(admin.SimpleListFilter):
-    title = 'High Calorie Meals'
-    parameter_name = 'calories'
+class RangeBucketFilter(admin.SimpleListFilter):
+    """
+    Filter a numeric column by a few ranges instead of by its distinct values.
+
+    The range boundaries come from the column's stored histogram (see
+    histograms.py), falling back to ``boundaries`` until one is computed, so
+    building the filter never scans the column and filtering is an indexed
+    range lookup.
+    """
+    field_name = None
+    boundaries = ()
+    unit = ''
+
+    def get_boundaries(self, model):
+        return histogram_boundaries(model, self.field_name) or list(self.boundaries)
 
     def lookups(self, request, model_admin):
-        return (
-            ('high', 'Above 500 kcal'),
-            ('low', 'Below 500 kcal'),
-        )
+        edges = [None, *self.get_boundaries(model_admin.model), None]
+        choices = []
+        for low, high in zip(edges, edges[1:]):
+            value = f"{'' if low is None else f'{low:g}'}-{'' if high is None else f'{high:g}'}"
+            if low is None:
+                label = f"Below {high:g} {self.unit}"
+            elif high is None:
+                label = f"{low:g} {self.unit} and above"
+            else:
+                label = f"{low:g}–{high:g} {self.unit}"
+            choices.append((value, label.strip()))
+        return choices if len(choices) > 1 else ()
 
     def queryset(self, request, queryset):
-        if self.value() == 'high':
-            return queryset.filter(calories__gt=500)
-        if self.value() == 'low':
-            return queryset.filter(calories__lte=500)
-        return queryset
+        if not self.value():
+            return queryset
+        low, _, high = self.value().partition('-')
+        try:
+            bounds = {}
+            if low:
+                bounds[f'{self.field_name}__gte'] = float(low)
+            if high:
+                bounds[f'{self.field_name}__lt'] = float(high)
+        except ValueError:
+            raise IncorrectLookupParameters(f"Invalid range {self.value()!r}.")
+        return queryset.filter(**bounds)
+
+
+class HighCalorieMealFilter(RangeBucketFilter):
+    title = 'Calories'
+    parameter_name = 'calories'
+    field_name = 'calories'
+    boundaries = (500,)
+    unit = 'kcal'
+
+
+class ProteinRangeFilter(RangeBucketFilter):
+    title = 'Protein'
+    parameter_name = 'protein'
+    field_name = 'protein'
+    boundaries = (10, 20, 40)
+    unit = 'g'
+
+
+class CarbsRangeFilter(RangeBucketFilter):
+    title = 'Carbs'
+    parameter_name = 'carbs'
+    field_name = 'carbs'
+    boundaries = (20, 50, 100)
+    unit = 'g'
+
+
+class FatRangeFilter(RangeBucketFilter):
+    title = 'Fat'
+    parameter_name = 'fat'
+    field_name = 'fat'
+    boundaries = (10, 20, 40)
+    unit = 'g'
+
+# Custom Admin for the food catalog
+@admin.register(Food)
+class FoodAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'gcarb', 'gfat', 'gprotein', 'popularity', 'source_id')
+    list_filter = ('category',)
+    search_fields = ('name', 'source_id')
+    readonly_fields = ('popularity',)
+    list_per_page = 50
+
 
 # Inline Admin for Vitamins and Minerals in Meals
 class VitaminInline(admin.TabularInline):
@@ -69,13 +213,14 @@ class MineralInline(admin.TabularInline):
 
 # Custom Admin for Meal
 @admin.register(Meal)
-class MealAdmin(admin.ModelAdmin):
+class MealAdmin(LargeTableAdmin):
     list_display = ('name', 'user', 'calories', 'protein', 'carbs', 'fat', 'date')
-    list_filter = ('date', 'protein', 'carbs', 'fat', HighCalorieMealFilter)
+    list_filter = ('date', 'planned', HighCalorieMealFilter, ProteinRangeFilter, CarbsRangeFilter, FatRangeFilter)
     search_fields = ('name', 'user__username')
     inlines = [VitaminInline, MineralInline]
     list_select_related = ('user',)
     list_per_page = 25
+    deferred_fields = ('description', 'nutrients')
 
 # Custom Admin for Weekly Plan
 @admin.register(Weekly)
@@ -88,13 +233,29 @@ class WeeklyAdmin(admin.ModelAdmin):
 
 # Custom Admin for Exercise
 @admin.register(Exercise)
-class ExerciseAdmin(admin.ModelAdmin):
+class ExerciseAdmin(LargeTableAdmin):
     list_display = ('user', 'name', 'type', 'duration', 'calories_burned', 'date')
     list_filter = ('type', 'date')
     search_fields = ('user__username', 'name')
     list_select_related = ('user',)
 
 
+@admin.register(ColumnHistogram)
+class ColumnHistogramAdmin(admin.ModelAdmin):
+    list_display = ('name', 'boundaries', 'row_count', 'refreshed_at')
+    readonly_fields = ('name', 'boundaries', 'row_count', 'refreshed_at')
+
+
+# Custom Admin for the daily nutrition rollup
+@admin.register(DailyNutritionSummary)
+class DailyNutritionSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'calories_intake', 'calories_burned', 'protein', 'carbs', 'fat')
+    list_filter = ('day',)
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'day', 'calories_intake', 'calories_burned', 'protein', 'carbs', 'fat')
+
+
 # Custom Admin for TDEE
 @admin.register(TDEE)
 class TDEEAdmin(admin.ModelAdmin):
@@ -105,14 +266,16 @@ class TDEEAdmin(admin.ModelAdmin):
 
 
 @admin.register(JournalEntry)
-class JournalEntryAdmin(admin.ModelAdmin):
+class JournalEntryAdmin(LargeTableAdmin):
     list_display = ('title', 'author', 'formatted_date_posted')  # Use the formatted date
     search_fields = ('title', 'author__username')
     list_filter = ('date_posted', 'author')  # Allow filtering by author
     list_editable = ('title',)  # Allow editing title in the list view
+    list_display_links = ('formatted_date_posted',)
     list_select_related = ('author',)
     list_per_page = 20  # Enable pagination
     search_help_text = "Search by title or author's username"
+    deferred_fields = ('content',)
 
     def formatted_date_posted(self, obj):
         return localtime(obj.date_posted).strftime('%Y-%m-%d %H:%M:%S')
@@ -122,8 +285,13 @@ class JournalEntryAdmin(admin.ModelAdmin):
 
 # Custom Admin for Message
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
-    list_display = ('sender', 'receiver', 'content', 'timestamp')
+class MessageAdmin(LargeTableAdmin):
+    list_display = ('sender', 'receiver', 'content_preview', 'timestamp')
     list_filter = ('timestamp',)
     search_fields = ('sender__username', 'receiver__username', 'content')
     list_select_related = ('sender', 'receiver')
+    preview_fields = ('content',)
+
+    @admin.display(description='Content')
+    def content_preview(self, obj):
+        return self.preview(obj, 'content')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DietappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dietapp'
+
+    def ready(self):
+        import dietapp.signals  # Defer importing signals until the app is ready
@@ -0,0 +1,97 @@
+# catalog.py
+"""
+Process-local cache of the food catalog tables.
+
+Each food category is small and almost never written, but every meal log
+reads it. Each worker keeps the rows in memory and revalidates them against
+a version stamp held in the shared Django cache, which the receivers in
+signals.py bump whenever a catalog row is saved or deleted.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Carbs, Drinks, Fats, FoodCategory, Proteins
+
+VERSION_KEY = 'dietapp:food-catalog-version:{}'
+
+# Catalog tables the meal form can draw ingredients from, keyed by category.
+FOOD_CATEGORIES = {
+    FoodCategory.CARB: Carbs,
+    FoodCategory.FAT: Fats,
+    FoodCategory.PROTEIN: Proteins,
+    FoodCategory.DRINK: Drinks,
+}
+
+
+class FoodCatalog:
+    """Read-through, versioned LRU/TTL cache of the per-category Food tables."""
+
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'FOOD_CATALOG_TTL', 300)
+        self.max_entries = max_entries or getattr(settings, 'FOOD_CATALOG_MAX_ENTRIES', 32)
+        self._entries = OrderedDict()  # label -> (version, loaded_at, rows)
+        self._lock = threading.Lock()
+
+    def models(self):
+        """Return the per-category Food proxy models the catalog is split into."""
+        return list(FOOD_CATEGORIES.values())
+
+    def version(self, model):
+        """Return the cross-worker version stamp of ``model``'s table."""
+        return cache.get(VERSION_KEY.format(model._meta.label_lower), 0)
+
+    def foods(self, model):
+        """
+        Return every row of ``model`` as a dict keyed by primary key.
+
+        The rows are shared between requests and must not be modified.
+        """
+        label = model._meta.label_lower
+        # Read the stamp before the rows so a concurrent write is never masked
+        version = self.version(model)
+        with self._lock:
+            entry = self._entries.get(label)
+            if entry and entry[0] == version and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(label)
+                return entry[2]
+
+        rows = model.objects.in_bulk()
+        with self._lock:
+            self._entries[label] = (version, time.monotonic(), rows)
+            self._entries.move_to_end(label)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rows
+
+    def get(self, model, pk):
+        """Return a single catalog row, or None if it does not exist or ``pk`` is not an id."""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self.foods(model).get(pk)
+
+    def load(self):
+        """Load every catalog table in one pass."""
+        for model in self.models():
+            self.foods(model)
+
+    def invalidate(self, model):
+        """Bump ``model``'s version stamp so every worker reloads its rows."""
+        key = VERSION_KEY.format(model._meta.label_lower)
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+        with self._lock:
+            self._entries.pop(model._meta.label_lower, None)
+
+    def clear(self):
+        """Drop this worker's cached rows."""
+        with self._lock:
+            self._entries.clear()
+
+
+food_catalog = FoodCatalog()
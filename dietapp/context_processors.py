@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .messaging import unread_count
+
+
+def unread_messages(request):
+    """Expose the user's unread message count; only queried if a template uses it."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_message_count': SimpleLazyObject(lambda: unread_count(user))}
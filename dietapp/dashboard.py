@@ -0,0 +1,181 @@
+# dashboard.py
+"""
+Dashboard context builder.
+
+The whole dashboard is read with one annotated user query plus a fixed set of
+sliced prefetches, whatever the size of the user's history. The rendered
+cards are cached per user under a version stamp that the Meal, Exercise,
+Weekly, Profile (the users app's) and TDEE receivers in signals.py bump on
+every write, and under the current week, whose totals restart when it rolls
+over. Version stamps live in the default cache, which must be shared (Redis)
+for a write in one worker to expire the cards cached by the others.
+"""
+import datetime
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Sum
+from django.utils import timezone
+from django.utils.timezone import localdate, make_aware
+
+from .events import hub
+from .models import Exercise, Meal, TDEE, Weekly
+
+VERSION_KEY = 'dietapp:dashboard-version:{}'
+MODIFIED_KEY = 'dietapp:dashboard-modified:{}'
+
+# Number of entries shown in the recent meals and exercises cards.
+RECENT_MEALS = 5
+RECENT_EXERCISES = 10
+
+# Seconds a user's rendered dashboard cards stay cached.
+CACHE_TTL = 600
+
+
+def dashboard_version(user_id):
+    """
+    Return the user's dashboard version stamp.
+
+    A missing stamp restarts from the current time in milliseconds, so a
+    stamp lost to cache eviction never repeats a value handed out before.
+    """
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def dashboard_modified(user_id):
+    """Return when the user's dashboard data last changed, if known."""
+    return cache.get(MODIFIED_KEY.format(user_id))
+
+
+def invalidate_dashboard(user_id):
+    """Bump the user's dashboard version stamp, expiring their cached cards and telling open pages."""
+    dashboard_version(user_id)
+    version = cache.incr(VERSION_KEY.format(user_id))
+    cache.set(MODIFIED_KEY.format(user_id), timezone.now(), timeout=None)
+    hub.publish(user_id, 'dashboard', {'version': version})
+
+
+def week_start(day=None):
+    """Return the Monday of the week of ``day`` (default: today)."""
+    day = day or localdate()
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def dashboard_etag(request, *args, **kwargs):
+    """ETag of the requesting user's dashboard, for Django's ``condition`` decorator."""
+    return f'"{request.user.pk}-{dashboard_version(request.user.pk)}-{week_start():%Y%m%d}"'
+
+
+def dashboard_last_modified(request, *args, **kwargs):
+    """Last-Modified of the requesting user's dashboard, for Django's ``condition`` decorator."""
+    modified = dashboard_modified(request.user.pk)
+    if modified is None:
+        return None
+    # The week totals reset at the start of the week without any write
+    return max(modified, make_aware(datetime.datetime.combine(week_start(), datetime.time.min)))
+
+
+def build_dashboard(user):
+    """
+    Return the dashboard context for ``user`` in four queries.
+
+    Totals come from the daily nutrition rollup, so neither the query count nor
+    the amount of data read grows with the user's history.
+    """
+    monday = week_start()
+    latest_tdee = TDEE.objects.filter(user=OuterRef('pk')).order_by('-date', '-pk').values('calories')[:1]
+    meal_count = (
+        Meal.objects.filter(user=OuterRef('pk'), planned=False).order_by().values('user')
+        .annotate(count=Count('pk')).values('count')
+    )
+    member = (
+        get_user_model().objects
+        .filter(pk=user.pk)
+        .select_related('profile')
+        .annotate(
+            calories_consumed=Sum('daily_summaries__calories_intake'),
+            calories_burned=Sum('daily_summaries__calories_burned'),
+            week_calories_intake=Sum('daily_summaries__calories_intake', filter=Q(daily_summaries__day__gte=monday)),
+            week_calories_burned=Sum('daily_summaries__calories_burned', filter=Q(daily_summaries__day__gte=monday)),
+            meal_count=Subquery(meal_count),
+            latest_tdee=Subquery(latest_tdee),
+        )
+        .prefetch_related(
+            Prefetch(
+                'meals',
+                queryset=Meal.objects.filter(planned=False).only('id', 'user_id', 'name', 'calories', 'date').order_by('-date')[:RECENT_MEALS],
+                to_attr='recent_meals',
+            ),
+            Prefetch(
+                'exercises',
+                queryset=Exercise.objects.filter(date__gte=make_aware(datetime.datetime.combine(monday, datetime.time.min)))
+                .only('id', 'user_id', 'name', 'duration', 'calories_burned', 'date')[:RECENT_EXERCISES],
+                to_attr='recent_exercises',
+            ),
+            Prefetch(
+                'weekly_entries',
+                queryset=Weekly.objects.select_related('meal').only('id', 'day', 'user_id', 'meal__id', 'meal__name', 'meal__calories'),
+                to_attr='weekly_plan',
+            ),
+        )
+        .get()
+    )
+    profile = getattr(member, 'profile', None)
+    return {
+        'name': member.get_full_name() or member.username,
+        'profile': profile,
+        'bmi': profile.bmi if profile else None,
+        'meal_count': member.meal_count or 0,
+        'calories_consumed': member.calories_consumed or 0,
+        'calories_burned': member.calories_burned or 0,
+        'total_calories_intake': member.week_calories_intake or 0,
+        'total_calories_burned': member.week_calories_burned or 0,
+        'tdee': member.latest_tdee,
+        'meals': member.recent_meals,
+        'exercises': member.recent_exercises,
+        'weekly_plan': member.weekly_plan,
+    }
+
+
+def serialize_dashboard(context):
+    """Turn a ``build_dashboard`` context into JSON-friendly data."""
+    profile = context['profile']
+    return {
+        'name': context['name'],
+        'profile': {
+            'age': profile.age,
+            'height': profile.height,
+            'weight': profile.weight,
+            'bmi': context['bmi'],
+        } if profile else None,
+        'meal_count': context['meal_count'],
+        'calories_consumed': context['calories_consumed'],
+        'calories_burned': context['calories_burned'],
+        'tdee': context['tdee'],
+        'week': {
+            'calories_intake': context['total_calories_intake'],
+            'calories_burned': context['total_calories_burned'],
+            'net': context['total_calories_intake'] - context['total_calories_burned'],
+        },
+        'meals': [
+            {'id': meal.pk, 'name': meal.name, 'calories': meal.calories, 'date': meal.date.isoformat()}
+            for meal in context['meals']
+        ],
+        'exercises': [
+            {
+                'id': exercise.pk, 'name': exercise.name, 'duration': exercise.duration,
+                'calories_burned': exercise.calories_burned, 'date': exercise.date.isoformat(),
+            }
+            for exercise in context['exercises']
+        ],
+        'weekly_plan': [
+            {'day': entry.day, 'meal': entry.meal.name, 'calories': entry.meal.calories}
+            for entry in context['weekly_plan']
+        ],
+    }
@@ -0,0 +1,186 @@
+# events.py
+"""
+Publish/subscribe hub for live updates.
+
+Sync code (signal receivers, views) publishes small events to a user's
+channel, and the async Server-Sent Events view waits on a subscription, so an
+idle connection costs a queue rather than a thread. The backend is chosen by
+the EVENTS_BACKEND setting: LocalBackend fans out inside one process, and
+RedisBackend relays events between processes through Redis pub/sub. With
+more than one worker (as in the procfile) an event published in one worker
+only reaches connections held by the others through RedisBackend, which
+settings.py selects whenever REDIS_URL is set.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'dietapp.events.LocalBackend'
+
+# Events buffered per connection before the oldest are dropped.
+QUEUE_SIZE = 100
+
+_event_ids = itertools.count(1)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def format_event(event):
+    """Encode an event as a Server-Sent Events frame."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class Subscription:
+    """A connection's queue of events on one channel."""
+
+    def __init__(self, backend, channel, loop, queue_size=QUEUE_SIZE):
+        self.backend = backend
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(queue_size)
+
+    def offer(self, event):
+        """Queue ``event``, dropping the oldest one if the client is not keeping up. Loop thread only."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Return the next event, or None if ``timeout`` seconds pass first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class LocalBackend:
+    """Fan events out to the subscriptions of this process."""
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        """Register a subscription; call from the event loop that will read it."""
+        subscription = Subscription(self, channel, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        """Hand ``event`` to this process's subscriptions; safe from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisBackend(LocalBackend):
+    """
+    Relay events between worker processes through Redis pub/sub.
+
+    Every process runs one listener per event loop that feeds its local
+    subscriptions. Needs the ``redis`` package and the EVENTS_REDIS_URL setting.
+    """
+    prefix = 'dietapp:events:'
+
+    def __init__(self, url=None, queue_size=QUEUE_SIZE):
+        import redis
+
+        super().__init__(queue_size)
+        self.url = url or getattr(settings, 'EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+        self._client = redis.Redis.from_url(self.url)
+        self._listeners = {}  # event loop -> listener task
+
+    def publish(self, channel, event):
+        self._client.publish(self.prefix + channel, json.dumps(event))
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        loop = subscription.loop
+        if loop not in self._listeners or self._listeners[loop].done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.psubscribe(self.prefix + '*')
+        try:
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                channel = message['channel'].decode()[len(self.prefix):]
+                self.deliver(channel, json.loads(message['data']))
+        finally:
+            await pubsub.close()
+            await client.close()
+
+
+class EventHub:
+    """Entry point to the configured backend, loaded on first use."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(getattr(settings, 'EVENTS_BACKEND', DEFAULT_BACKEND))()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def publish(self, user_id, event_type, data):
+        """Send an event to every open stream of ``user_id``."""
+        event = {'id': next(_event_ids), 'type': event_type, 'data': data}
+        self.backend.publish(user_channel(user_id), event)
+        return event
+
+    def subscribe(self, user_id):
+        return self.backend.subscribe(user_channel(user_id))
+
+
+hub = EventHub()
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting in ('EVENTS_BACKEND', 'EVENTS_REDIS_URL'):
+        hub.backend = None
@@ -0,0 +1,87 @@
+# histograms.py
+"""
+Column histograms for the admin range filters.
+
+Listing a float column in ``list_filter`` makes the changelist run a
+``SELECT DISTINCT`` over the whole column and render a link per value.
+Range filters show a handful of buckets instead. Their boundaries are
+equal-height histograms (each bucket holds about the same number of rows),
+computed periodically by ``refresh_histograms`` with one indexed ``OFFSET``
+seek per boundary and read back from the cache, so a changelist never
+scans the column.
+"""
+import math
+
+from django.apps import apps
+from django.core.cache import cache
+
+from .models import ColumnHistogram
+
+CACHE_KEY = 'dietapp:histogram:{}'
+CACHE_TTL = 600
+
+# Number of buckets each histogram aims for.
+HISTOGRAM_BUCKETS = 6
+
+# Columns refresh_histograms keeps histograms of, as (model label, field).
+HISTOGRAM_COLUMNS = (
+    ('dietapp.Meal', 'calories'),
+    ('dietapp.Meal', 'protein'),
+    ('dietapp.Meal', 'carbs'),
+    ('dietapp.Meal', 'fat'),
+)
+
+
+def histogram_name(model, field):
+    return f'{model._meta.label_lower}.{field}'
+
+
+def round_boundary(value):
+    """Round to two significant figures (a whole number from 10 up), so bucket labels read well."""
+    if value <= 0:
+        return 0
+    if value < 10:
+        return round(value, 1)
+    digits = int(math.floor(math.log10(value))) - 1
+    return int(round(value, -digits))
+
+
+def compute_boundaries(queryset, field, buckets=HISTOGRAM_BUCKETS):
+    """Return the sorted, distinct rounded values splitting ``field`` of ``queryset`` into ``buckets`` ranges."""
+    values = queryset.exclude(**{f'{field}__isnull': True}).order_by(field).values_list(field, flat=True)
+    count = values.count()
+    if not count:
+        return [], 0
+    boundaries = set()
+    for position in range(1, buckets):
+        boundaries.add(round_boundary(values[count * position // buckets]))
+    boundaries.discard(0)
+    return sorted(boundaries), count
+
+
+def refresh_histogram(model, field, buckets=HISTOGRAM_BUCKETS):
+    """Recompute and store the histogram of ``model.field``. Returns its boundaries."""
+    boundaries, count = compute_boundaries(model._default_manager.all(), field, buckets)
+    name = histogram_name(model, field)
+    ColumnHistogram.objects.update_or_create(name=name, defaults={'boundaries': boundaries, 'row_count': count})
+    cache.set(CACHE_KEY.format(name), boundaries, CACHE_TTL)
+    return boundaries
+
+
+def refresh_histograms(columns=HISTOGRAM_COLUMNS, buckets=HISTOGRAM_BUCKETS):
+    """Refresh the histogram of every ``(model label, field)`` column. Returns ``{name: boundaries}``."""
+    refreshed = {}
+    for label, field in columns:
+        model = apps.get_model(label)
+        refreshed[histogram_name(model, field)] = refresh_histogram(model, field, buckets)
+    return refreshed
+
+
+def histogram_boundaries(model, field):
+    """Return the stored boundaries of ``model.field``; empty if it has no histogram yet."""
+    key = CACHE_KEY.format(histogram_name(model, field))
+    boundaries = cache.get(key)
+    if boundaries is None:
+        boundaries = ColumnHistogram.objects.filter(name=histogram_name(model, field)).values_list('boundaries', flat=True).first() or []
+        cache.set(key, boundaries, CACHE_TTL)
+    return boundaries
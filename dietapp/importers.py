@@ -0,0 +1,308 @@
+# importers.py
+"""
+Streaming meal importer and nutrient database loader.
+
+Rows are parsed lazily from CSV or JSON Lines, validated with the Meal,
+Vitamin and Mineral field validators and written with bulk_create, one
+transaction per chunk, so memory stays bounded by the chunk size whatever the
+size of the file.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import food_catalog
+from .micronutrients import nutrient_vector, pack
+from .models import Food, FoodCategory, Meal, Mineral, Vitamin
+from .rollups import rebuild_summaries
+
+# Meal fields an import row may set; anything else in the row is ignored.
+IMPORT_FIELDS = ('name', 'calories', 'protein', 'carbs', 'fat', 'description', 'date')
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    """Running totals and row-level errors of an import."""
+
+    def __init__(self, max_errors=1000):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (line number, {field: [messages]})
+        self.max_errors = max_errors
+        self.first_day = None
+        self.last_day = None
+        self.error = None  # Why reading stopped before the end of the file
+
+    @property
+    def processed(self):
+        return self.imported + self.failed
+
+    def add_error(self, line, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}))
+
+    def add_day(self, day):
+        self.first_day = day if self.first_day is None else min(self.first_day, day)
+        self.last_day = day if self.last_day is None else max(self.last_day, day)
+
+    def as_dict(self):
+        data = {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': [{'line': line, 'errors': errors} for line, errors in self.errors],
+        }
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+def read_csv(stream):
+    """Yield ``(line number, row)`` pairs from a CSV file with a header row."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(stream):
+    """Yield ``(line number, row)`` pairs from a JSON Lines file."""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            row = error
+        yield line_number, row
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def parse_nutrients(value):
+    """
+    Parse a row's vitamins or minerals into ``(name, percentage)`` pairs.
+
+    Accepts "Vitamin C:20;Iron:5" strings (CSV), ``{"Vitamin C": 20}``
+    objects and ``[{"name": ..., "percentage": ...}]`` lists (JSON).
+    """
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return list(value.items())
+    if isinstance(value, list):
+        if not all(isinstance(item, dict) for item in value):
+            raise ValidationError("Expected a list of {\"name\": ..., \"percentage\": ...} objects.")
+        return [(item.get('name'), item.get('percentage')) for item in value]
+    pairs = []
+    for part in str(value).split(';'):
+        if part.strip():
+            name, _, percentage = part.partition(':')
+            pairs.append((name.strip(), percentage.strip()))
+    return pairs
+
+
+def build_meal(user, row):
+    """
+    Validate one import row and return the unsaved meal and its children.
+
+    Raises ValidationError with the offending fields.
+    """
+    if not isinstance(row, dict):
+        raise ValidationError(f"Invalid row: {row}")
+    values = {field: row[field] for field in IMPORT_FIELDS if row.get(field) not in (None, '')}
+    meal = Meal(user=user, **values)
+    meal.full_clean(exclude=['user'], validate_unique=False, validate_constraints=False)
+    if timezone.is_naive(meal.date):
+        meal.date = timezone.make_aware(meal.date)
+
+    children = []
+    for model, key in ((Vitamin, 'vitamins'), (Mineral, 'minerals')):
+        try:
+            pairs = parse_nutrients(row.get(key))
+        except ValidationError as error:
+            raise ValidationError({key: error.messages})
+        for name, percentage in pairs:
+            child = model(name=name, percentage=percentage)
+            try:
+                child.full_clean(exclude=['meal'], validate_unique=False, validate_constraints=False)
+            except ValidationError as error:
+                raise ValidationError({key: [f"{name}: {message}" for message in error.messages]})
+            children.append(child)
+    return meal, children
+
+
+def write_chunk(chunk, batch_size):
+    """Insert a chunk of ``(meal, children)`` pairs in one transaction."""
+    # bulk_create skips the nutrient vector signals
+    for meal, children in chunk:
+        meal.nutrients = pack(nutrient_vector((child.name, child.percentage) for child in children))
+    with transaction.atomic():
+        meals = Meal.objects.bulk_create([meal for meal, _ in chunk], batch_size=batch_size)
+        vitamins, minerals = [], []
+        for meal, (_, children) in zip(meals, chunk):
+            for child in children:
+                child.meal = meal
+                (vitamins if isinstance(child, Vitamin) else minerals).append(child)
+        Vitamin.objects.bulk_create(vitamins, batch_size=batch_size)
+        Mineral.objects.bulk_create(minerals, batch_size=batch_size)
+
+
+def import_meals(user, stream, format='csv', batch_size=500, chunk_size=5000, progress=None, max_errors=1000):
+    """
+    Import meals for ``user`` from a text stream of CSV or JSON Lines.
+
+    Valid rows are written in ``bulk_create`` batches of ``batch_size``, one
+    transaction per ``chunk_size`` rows; invalid rows are skipped and reported.
+    ``progress`` is called with the running ImportResult after every chunk.
+    A file that cannot be decoded or parsed stops the import at that point,
+    keeping the rows before it, and sets ``error`` on the result. The user's
+    daily rollup is rebuilt for the imported date range at the end, even if
+    the import fails.
+    """
+    if format not in READERS:
+        raise ValueError(f"Unknown import format {format!r}; expected one of {', '.join(IMPORT_FORMATS)}.")
+    result = ImportResult(max_errors=max_errors)
+    chunk = []
+    line_number = 0
+    try:
+        try:
+            for line_number, row in READERS[format](stream):
+                try:
+                    meal, children = build_meal(user, row)
+                except ValidationError as error:
+                    result.add_error(line_number, error)
+                    continue
+                chunk.append((meal, children))
+                result.add_day(timezone.localdate(meal.date))
+                if len(chunk) >= chunk_size:
+                    write_chunk(chunk, batch_size)
+                    result.imported += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(result)
+        except (csv.Error, UnicodeDecodeError) as error:
+            result.error = f"Could not read the file after line {line_number}: {error}"
+        if chunk:
+            write_chunk(chunk, batch_size)
+            result.imported += len(chunk)
+            if progress:
+                progress(result)
+    finally:
+        # bulk_create skips the rollup signals
+        if result.imported:
+            rebuild_summaries(users=[user.pk], start=result.first_day, end=result.last_day)
+    return result
+
+
+# Column of a USDA-style nutrient dump holding each Food field.
+FOOD_COLUMNS = {
+    'source_id': 'fdc_id',
+    'name': 'description',
+    'category': 'food_category',
+    'gcarb': 'carbohydrate',
+    'gfat': 'fat',
+    'gprotein': 'protein',
+}
+
+MACRO_FIELDS = ('gcarb', 'gfat', 'gprotein')
+
+# Fields refreshed when a loaded row's source_id already exists.
+FOOD_UPDATE_FIELDS = ('name', 'category', 'gcarb', 'gfat', 'gprotein')
+
+
+def classify_food(source_category, gcarb, gfat, gprotein):
+    """
+    Map a source database category onto a FoodCategory.
+
+    Our own category names are kept as is and beverages become drinks;
+    anything else is filed under the macro providing most of its energy.
+    """
+    source_category = (source_category or '').strip().lower()
+    if source_category in FoodCategory.values:
+        return source_category
+    if 'beverage' in source_category or 'drink' in source_category:
+        return FoodCategory.DRINK
+    energy = {
+        FoodCategory.CARB: gcarb * 4,
+        FoodCategory.FAT: gfat * 9,
+        FoodCategory.PROTEIN: gprotein * 4,
+    }
+    return max(energy, key=energy.get)
+
+
+def build_food(row, columns=FOOD_COLUMNS):
+    """Validate one nutrient dump row and return an unsaved Food."""
+    values, errors = {}, {}
+    for name in ('source_id', 'name', *MACRO_FIELDS):
+        field = Food._meta.get_field(name)
+        raw = (row.get(columns[name]) or '').strip()
+        if name in MACRO_FIELDS:
+            raw = raw or 0
+        elif name == 'name':
+            raw = raw[:field.max_length]
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    if not values.get('source_id') and 'source_id' not in errors:
+        errors['source_id'] = ["This field is required."]
+    if errors:
+        raise ValidationError(errors)
+    values['category'] = classify_food(row.get(columns['category']), *(values[name] for name in MACRO_FIELDS))
+    return Food(**values)
+
+
+def write_foods(foods, batch_size, update):
+    """Insert a chunk of foods in one transaction, resolving source_id conflicts."""
+    with transaction.atomic():
+        if update:
+            Food.objects.bulk_create(
+                foods, batch_size=batch_size, update_conflicts=True,
+                unique_fields=['source_id'], update_fields=FOOD_UPDATE_FIELDS,
+            )
+        else:
+            Food.objects.bulk_create(foods, batch_size=batch_size, ignore_conflicts=True)
+
+
+def load_foods(stream, columns=None, batch_size=1000, chunk_size=10000, update=True, progress=None, max_errors=1000):
+    """
+    Load a USDA-style CSV nutrient dump into the Food table.
+
+    ``columns`` overrides the FOOD_COLUMNS header mapping. Rows whose
+    source_id already exists are updated (or skipped with ``update=False``).
+    Writes happen in ``bulk_create`` batches, one transaction per chunk.
+    """
+    columns = {**FOOD_COLUMNS, **(columns or {})}
+    result = ImportResult(max_errors=max_errors)
+    chunk = {}
+
+    def flush():
+        write_foods(list(chunk.values()), batch_size, update)
+        result.imported += len(chunk)
+        chunk.clear()
+        if progress:
+            progress(result)
+
+    for line_number, row in read_csv(stream):
+        try:
+            food = build_food(row, columns)
+        except ValidationError as error:
+            result.add_error(line_number, error)
+            continue
+        # Keyed by source_id: a row may not be upserted twice in one statement
+        chunk[food.source_id] = food
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    # bulk_create skips the catalog signals
+    for model in food_catalog.models():
+        food_catalog.invalidate(model)
+    return result
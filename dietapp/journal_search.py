@@ -0,0 +1,111 @@
+# journal_search.py
+"""
+Ranked full-text search over a user's journal.
+
+On SQLite the entries are indexed by an external-content FTS5 table kept in
+sync by triggers, so queryset updates and bulk inserts are indexed too. On
+PostgreSQL the same search runs against a GIN expression index over a
+weighted ``tsvector``. Migration 0006 creates both. Any other backend falls back to ``icontains``.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import JournalEntry
+
+FTS_TABLE = 'dietapp_journalentry_fts'
+PG_INDEX = 'dietapp_journalentry_search_idx'
+
+# Snippet markers, swapped for <mark> tags once the text is HTML-escaped.
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+# Words in a snippet, and relative weight of title over content matches.
+SNIPPET_WORDS = 16
+TITLE_WEIGHT = 10.0
+
+TERM_RE = re.compile(r'\w+')
+
+# Expression indexed by migration 0006; queries must repeat it verbatim to use the index.
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', {table}title), 'A') || setweight(to_tsvector('english', {table}content), 'B')"
+)
+
+def search_backend(connection):
+    if connection.vendor == 'sqlite':
+        return 'fts5'
+    if connection.vendor == 'postgresql':
+        return 'tsvector'
+    return None
+
+
+def rebuild_index(using=None):
+    """Repopulate the search index, created by migration 0006, from the journal entries."""
+    using = using or router.db_for_write(JournalEntry)
+    connection = connections[using]
+    backend = search_backend(connection)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        else:
+            cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+
+
+def fts5_query(query):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    return ' '.join(f'"{term}"*' for term in TERM_RE.findall(query))
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and wrap its matches in <mark> tags."""
+    snippet = escape(snippet or '')
+    return mark_safe(snippet.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def search_journal(user, query, limit=50):
+    """
+    Return up to ``limit`` of ``user``'s journal entries matching ``query``,
+    best match first. Each entry carries a ``rank`` (higher is better) and an
+    HTML ``snippet`` with the matches marked.
+    """
+    using = router.db_for_read(JournalEntry)
+    backend = search_backend(connections[using])
+    if backend == 'fts5':
+        terms = fts5_query(query)
+        if not terms:
+            return []
+        entries = JournalEntry.objects.using(using).raw(
+            f"""SELECT e.*, -bm25({FTS_TABLE}, %s, 1.0) AS search_rank,
+                       snippet({FTS_TABLE}, 1, %s, %s, '…', %s) AS raw_snippet
+                FROM {FTS_TABLE} JOIN dietapp_journalentry e ON e.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s AND e.author_id = %s
+                ORDER BY search_rank DESC, e.date_posted DESC LIMIT %s""",
+            [TITLE_WEIGHT, MATCH_START, MATCH_END, SNIPPET_WORDS, terms, user.pk, limit],
+        )
+    elif backend == 'tsvector':
+        if not query.strip():
+            return []
+        entries = JournalEntry.objects.using(using).raw(
+            f"""SELECT e.*, ts_rank({PG_DOCUMENT.format(table='e.')}, q) AS search_rank,
+                       ts_headline('english', e.content, q, %s) AS raw_snippet
+                FROM dietapp_journalentry e, websearch_to_tsquery('english', %s) q
+                WHERE {PG_DOCUMENT.format(table='e.')} @@ q AND e.author_id = %s
+                ORDER BY search_rank DESC, e.date_posted DESC LIMIT %s""",
+            [
+                f'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}',
+                query, user.pk, limit,
+            ],
+        )
+    else:
+        query = query.strip()
+        entries = JournalEntry.objects.filter(Q(title__icontains=query) | Q(content__icontains=query), author=user)[:limit]
+
+    entries = list(entries)
+    for entry in entries:
+        entry.rank = getattr(entry, 'search_rank', None)
+        entry.snippet = highlight(getattr(entry, 'raw_snippet', entry.content[:200]))
+    return entries
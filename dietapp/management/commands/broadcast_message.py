@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dietapp.messaging import broadcast
+
+
+class Command(BaseCommand):
+    help = "Send one message from a user to every member of a group (or to all active users)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('sender', help="Username the message is sent from.")
+        parser.add_argument('content', help="Message text; '-' reads it from standard input.")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--group', help="Name of the auth group receiving the message.")
+        target.add_argument('--all', action='store_true', help="Send to every active user.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Messages written per transaction.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            sender = User.objects.get(username=options['sender'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['sender']!r} does not exist.")
+        content = sys.stdin.read() if options['content'] == '-' else options['content']
+        if not content.strip():
+            raise CommandError("The message is empty.")
+
+        receivers = User.objects.filter(is_active=True)
+        if options['group']:
+            receivers = receivers.filter(groups__name=options['group'])
+
+        result = broadcast(
+            sender, receivers, content, batch_size=options['batch_size'],
+            progress=lambda result: self.stdout.write(f"{result.sent} sent ({result.rate:.0f}/s)"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Broadcast done: {result}."))
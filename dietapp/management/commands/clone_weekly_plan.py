@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dietapp.planning import clone_weekly_plan
+
+
+class Command(BaseCommand):
+    help = "Copy one user's weekly plan, with their own copies of its meals, to every member of a group (or to all users)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', help="Username whose weekly plan is copied.")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--group', help="Name of the auth group receiving the plan.")
+        target.add_argument('--all', action='store_true', help="Copy the plan to every active user.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users written per transaction.")
+        parser.add_argument('--keep-other-days', action='store_true', help="Do not clear days the template leaves empty.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            template = User.objects.get(username=options['template'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['template']!r} does not exist.")
+
+        users = User.objects.filter(is_active=True)
+        if options['group']:
+            users = users.filter(groups__name=options['group'])
+
+        updated = clone_weekly_plan(
+            template, users, batch_size=options['batch_size'], replace=not options['keep_other_days'],
+            progress=lambda count: self.stdout.write(f"{count} users updated"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Copied {template.username}'s weekly plan to {updated} users."))
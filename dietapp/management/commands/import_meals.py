@@ -0,0 +1,40 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from dietapp.importers import IMPORT_FORMATS, import_meals
+
+
+class Command(BaseCommand):
+    help = "Import a user's meal history from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help="Owner of the imported meals.")
+        parser.add_argument('path', help="CSV (with header row) or JSON Lines file.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="File format (default: from the file extension).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk INSERT.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per transaction.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']!r} does not exist.")
+
+        format = options['format'] or ('jsonl' if os.path.splitext(options['path'])[1] in ('.jsonl', '.json') else 'csv')
+
+        def progress(result):
+            self.stdout.write(f"{result.processed} rows processed, {result.imported} imported, {result.failed} failed")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            result = import_meals(
+                user, stream, format=format,
+                batch_size=options['batch_size'], chunk_size=options['chunk_size'], progress=progress,
+            )
+
+        for line, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f"Line {line}: {field}: {' '.join(messages)}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.imported} meals ({result.failed} rows rejected)."))
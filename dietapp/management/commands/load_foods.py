@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.importers import FOOD_COLUMNS, load_foods
+
+
+class Command(BaseCommand):
+    help = "Load a USDA-style CSV nutrient dump into the Food table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk INSERT.")
+        parser.add_argument('--chunk-size', type=int, default=10000, help="Rows per transaction.")
+        parser.add_argument('--skip-existing', action='store_true', help="Leave foods whose source id already exists untouched.")
+        for field, column in FOOD_COLUMNS.items():
+            parser.add_argument(f'--{field.replace("_", "-")}-column', dest=f'{field}_column', default=column, help=f"Column holding {field} (default: {column}).")
+
+    def handle(self, *args, **options):
+        columns = {field: options[f'{field}_column'] for field in FOOD_COLUMNS}
+
+        def progress(result):
+            self.stdout.write(f"{result.processed} rows processed, {result.imported} loaded, {result.failed} failed")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            result = load_foods(
+                stream, columns=columns, batch_size=options['batch_size'], chunk_size=options['chunk_size'],
+                update=not options['skip_existing'], progress=progress,
+            )
+
+        for line, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f"Line {line}: {field}: {' '.join(messages)}")
+        self.stdout.write(self.style.SUCCESS(f"Loaded {result.imported} foods ({result.failed} rows rejected)."))
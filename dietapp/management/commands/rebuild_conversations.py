@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.messaging import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = "File every message under its Conversation and recompute the conversation previews and unread counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Conversations created per INSERT.")
+
+    def handle(self, *args, **options):
+        count = rebuild_conversations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} conversations."))
@@ -0,0 +1,18 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from dietapp.rollups import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyNutritionSummary rollup from the raw Meal and Exercise rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only rebuild this user id (repeatable).")
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help="First day to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--until', type=datetime.date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        written = rebuild_summaries(users=options['users'], start=options['since'], end=options['until'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily summaries."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.journal_search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Repopulate the journal full-text search index from the journal entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=None, help="Database alias to rebuild (default: the journal's write database).")
+
+    def handle(self, *args, **options):
+        rebuild_index(options['database'])
+        self.stdout.write(self.style.SUCCESS("Rebuilt the journal search index."))
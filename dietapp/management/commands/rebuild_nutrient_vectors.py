@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.micronutrients import rebuild_meal_vectors
+from dietapp.models import Meal
+
+
+class Command(BaseCommand):
+    help = "Recompute every meal's packed micronutrient vector from its Vitamin and Mineral rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only rebuild this user id's meals (repeatable).")
+        parser.add_argument('--missing', action='store_true', help="Only meals that have no vector yet.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Meals read per query.")
+
+    def handle(self, *args, **options):
+        meals = Meal.objects.all()
+        if options['users']:
+            meals = meals.filter(user__in=options['users'])
+        if options['missing']:
+            meals = meals.filter(nutrients__isnull=True)
+        count = rebuild_meal_vectors(meals, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} nutrient vectors."))
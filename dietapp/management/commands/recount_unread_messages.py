@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.messaging import recount_unread
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's unread message count from the Message table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only recount this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        counted = recount_unread(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Recounted unread messages; {counted} users have unread messages."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dietapp.histograms import HISTOGRAM_BUCKETS, refresh_histograms
+
+
+class Command(BaseCommand):
+    help = "Recompute the column histograms behind the admin range filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buckets', type=int, default=HISTOGRAM_BUCKETS, help="Buckets per histogram.")
+
+    def handle(self, *args, **options):
+        for name, boundaries in refresh_histograms(buckets=options['buckets']).items():
+            self.stdout.write(f"{name}: {', '.join(f'{boundary:g}' for boundary in boundaries) or 'no rows'}")
+        self.stdout.write(self.style.SUCCESS("Histograms refreshed."))
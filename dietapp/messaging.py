@@ -0,0 +1,342 @@
+# messaging.py
+"""
+Message storage helpers.
+
+Each user's unread count lives in a one-row Mailbox that is adjusted with F()
+expressions as messages arrive, are read or are deleted, so an unread badge
+is a primary key lookup instead of a COUNT over the whole inbox. Likewise
+every pair of users has one Conversation row carrying the latest message
+preview and both sides' unread counts, so the conversation list is an
+indexed scan of those rows instead of a GROUP BY over the message history.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Substr
+from django.utils import timezone
+
+from .events import hub
+from .models import Conversation, Mailbox, Message
+
+PREVIEW_LENGTH = Conversation._meta.get_field('last_message_preview').max_length
+
+# Most messages per INSERT of a broadcast; bulk_create lowers it further to
+# stay within the database's query parameter limit (999 on older SQLite)
+INSERT_BATCH_SIZE = 500
+
+
+def adjust_unread(user_id, delta):
+    """Add ``delta`` (may be negative) to a user's unread count, never going below zero."""
+    if not delta:
+        return
+    if delta > 0:
+        Mailbox.objects.get_or_create(user_id=user_id)
+    Mailbox.objects.filter(user_id=user_id).update(unread=Greatest(F('unread') + delta, 0))
+
+
+def unread_count(user):
+    """Return the number of unread messages ``user`` has received."""
+    return Mailbox.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+
+
+def preview(content):
+    content = ' '.join(content.split())
+    return content if len(content) <= PREVIEW_LENGTH else content[:PREVIEW_LENGTH - 1] + '…'
+
+
+def conversation_between(user_id, other_id):
+    """Return the Conversation of two user ids, creating it if needed."""
+    user_low, user_high = sorted((user_id, other_id))
+    conversation, _ = Conversation.objects.get_or_create(user_low_id=user_low, user_high_id=user_high)
+    return conversation
+
+
+def record_message(message):
+    """Fold a new message into its conversation's preview and unread count."""
+    updates = {
+        'last_message_preview': preview(message.content),
+        'last_sender_id': message.sender_id,
+        'last_timestamp': message.timestamp,
+    }
+    if message.read_at is None:
+        field = f'user_{receiver_side(message)}_unread'
+        updates[field] = F(field) + 1
+    Conversation.objects.filter(pk=message.conversation_id).update(**updates)
+
+
+def receiver_side(message):
+    """
+    Return the side of its conversation's pair the receiver of ``message`` is
+    on. A note to self is counted on the low side, where Conversation.side
+    finds it.
+    """
+    return 'low' if message.receiver_id <= message.sender_id else 'high'
+
+
+def adjust_conversation_unread(conversation_id, side, delta):
+    """Add ``delta`` to one side's unread count of a conversation, never going below zero."""
+    field = f'user_{side}_unread'
+    Conversation.objects.filter(pk=conversation_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def record_bulk_delete(origin, message):
+    """
+    Note a message deleted by a bulk or cascading deletion started from
+    ``origin``. The counts and previews it touched are settled once, with
+    set-based queries, when the deletion commits (see settle_deleted_messages).
+    """
+    pending = getattr(origin, '_deleted_messages', None)
+    if pending is None:
+        pending = origin._deleted_messages = {'receivers': set(), 'conversations': set()}
+        transaction.on_commit(lambda: settle_deleted_messages(pending))
+    if message.read_at is None:
+        pending['receivers'].add(message.receiver_id)
+    if message.conversation_id is not None:
+        pending['conversations'].add(message.conversation_id)
+
+
+def settle_deleted_messages(pending):
+    """Recount the mailboxes and conversations a bulk deletion of messages touched."""
+    with transaction.atomic():
+        if pending['receivers']:
+            recount_unread(pending['receivers'])
+        if pending['conversations']:
+            # Conversations deleted along with their messages match nothing
+            summarize_conversations(Conversation.objects.filter(pk__in=pending['conversations']))
+
+
+def refresh_conversation(conversation_id):
+    """Point a conversation's preview back at its latest remaining message."""
+    latest = Message.objects.filter(conversation_id=conversation_id).order_by('-timestamp', '-pk').first()
+    Conversation.objects.filter(pk=conversation_id).update(
+        last_message_preview=preview(latest.content) if latest else '',
+        last_sender_id=latest.sender_id if latest else None,
+        last_timestamp=latest.timestamp if latest else None,
+    )
+
+
+def message_event(message):
+    """Live event data announcing ``message`` to its receiver."""
+    return {
+        'id': message.pk,
+        'conversation': message.conversation_id,
+        'sender': message.sender_id,
+        'preview': preview(message.content),
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+def conversations_for(user):
+    """
+    Return ``user``'s conversations, most recent first. The two sides are
+    looked up separately and combined with UNION, so each one is served by
+    its own (user, last_timestamp) index instead of an OR over both columns.
+    """
+    as_low = Conversation.objects.filter(user_low=user, last_timestamp__isnull=False).order_by().values('pk')
+    as_high = Conversation.objects.filter(user_high=user, last_timestamp__isnull=False).order_by().values('pk')
+    return Conversation.objects.filter(pk__in=as_low.union(as_high)).select_related('user_low', 'user_high')
+
+
+def send_message(sender, receiver, content):
+    """
+    Store a message. The receivers in signals.py file it in the conversation
+    and count it as unread, in the same transaction.
+    """
+    with transaction.atomic():
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+
+def mark_read(user, messages=None):
+    """
+    Mark ``user``'s unread received messages as read, all of them or only the
+    ones in ``messages`` (ids or Message instances), in one UPDATE. Returns the
+    number of messages marked.
+    """
+    unread = Message.objects.filter(receiver=user, read_at__isnull=True)
+    if messages is not None:
+        unread = unread.filter(pk__in=[getattr(message, 'pk', message) for message in messages])
+    with transaction.atomic():
+        per_conversation = list(
+            unread.order_by().values('conversation', 'sender').annotate(count=Count('pk'))
+            .values_list('conversation', 'sender', 'count')
+        )
+        marked = unread.update(read_at=timezone.now())
+        adjust_unread(user.pk, -marked)
+        for conversation_id, sender_id, count in per_conversation:
+            if conversation_id is not None:
+                adjust_conversation_unread(conversation_id, 'low' if user.pk <= sender_id else 'high', -count)
+    return marked
+
+
+def mark_conversation_read(user, conversation):
+    """Mark every message ``user`` received in ``conversation`` as read."""
+    return mark_read(user, Message.objects.filter(conversation=conversation, receiver=user, read_at__isnull=True).values_list('pk', flat=True))
+
+
+def recount_unread(users=None):
+    """Recompute the Mailbox of ``users`` (ids; default: everyone) from the messages."""
+    counts = Message.objects.filter(read_at__isnull=True)
+    mailboxes = Mailbox.objects.all()
+    if users is not None:
+        counts = counts.filter(receiver__in=users)
+        mailboxes = mailboxes.filter(user__in=users)
+    counts = dict(counts.order_by().values('receiver').annotate(unread=Count('pk')).values_list('receiver', 'unread'))
+    with transaction.atomic():
+        mailboxes.exclude(user__in=counts).update(unread=0)
+        Mailbox.objects.bulk_create(
+            [Mailbox(user_id=user_id, unread=unread) for user_id, unread in counts.items()],
+            update_conflicts=True, unique_fields=['user'], update_fields=['unread'],
+        )
+    return len(counts)
+
+
+def rebuild_conversations(batch_size=1000):
+    """
+    File every message without a conversation under its pair's Conversation,
+    then recompute every conversation's preview and unread counts from the
+    messages. Returns the number of conversations.
+    """
+    unfiled = Message.objects.filter(conversation__isnull=True).annotate(
+        low=Least('sender', 'receiver'), high=Greatest('sender', 'receiver'),
+    )
+    with transaction.atomic():
+        pairs = set(unfiled.order_by().values_list('low', 'high').distinct())
+        Conversation.objects.bulk_create(
+            [Conversation(user_low_id=low, user_high_id=high) for low, high in pairs],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        unfiled.update(conversation=Subquery(
+            Conversation.objects.filter(
+                user_low=Least(OuterRef('sender'), OuterRef('receiver')),
+                user_high=Greatest(OuterRef('sender'), OuterRef('receiver')),
+            ).values('pk')[:1]
+        ))
+
+        return summarize_conversations(Conversation.objects.all())
+
+
+def summarize_conversations(conversations):
+    """Recompute the preview and unread counts of ``conversations`` (a queryset) from their messages."""
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp', '-pk')
+
+    def unread(side):
+        counts = Message.objects.filter(conversation=OuterRef('pk'), receiver=OuterRef(f'user_{side}'), read_at__isnull=True)
+        if side == 'high':
+            # Notes to self are counted once, on the low side
+            counts = counts.exclude(sender=OuterRef('user_high'))
+        counts = counts.order_by().values('conversation').annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts), 0)
+
+    return conversations.update(
+        last_message_preview=Coalesce(Substr(Subquery(latest.values('content')[:1]), 1, PREVIEW_LENGTH), Value('')),
+        last_sender=Subquery(latest.values('sender')[:1]),
+        last_timestamp=Subquery(latest.values('timestamp')[:1]),
+        user_low_unread=unread('low'),
+        user_high_unread=unread('high'),
+    )
+
+
+class BroadcastResult:
+    """Totals and throughput of a broadcast."""
+
+    def __init__(self):
+        self.sent = 0
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        """Messages written per second."""
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return f"{self.sent} messages in {self.seconds:.1f}s ({self.rate:.0f}/s)"
+
+
+def write_broadcast_chunk(sender, receiver_ids, content):
+    """
+    Send ``content`` from ``sender`` to a chunk of receiver ids in one
+    transaction, with set-based writes in place of the per-message signals.
+    """
+    with transaction.atomic():
+        conversations = Conversation.objects.filter(
+            Q(user_low=sender, user_high__in=receiver_ids) | Q(user_high=sender, user_low__in=receiver_ids)
+        ).order_by()
+        conversation_ids = {
+            low if high == sender.pk else high: pk
+            for pk, low, high in conversations.values_list('pk', 'user_low', 'user_high')
+        }
+        missing = [user_id for user_id in receiver_ids if user_id not in conversation_ids]
+        if missing:
+            Conversation.objects.bulk_create(
+                [Conversation(user_low_id=min(sender.pk, user_id), user_high_id=max(sender.pk, user_id)) for user_id in missing],
+                ignore_conflicts=True,
+            )
+            conversation_ids = {
+                low if high == sender.pk else high: pk
+                for pk, low, high in conversations.values_list('pk', 'user_low', 'user_high')
+            }
+        # Message.timestamp is auto_now_add, so the summary takes the last one written
+        timestamp = insert_messages(sender, content, conversation_ids)[-1].timestamp
+
+        summary = {'last_message_preview': preview(content), 'last_sender': sender, 'last_timestamp': timestamp}
+        conversations.filter(user_high=sender).update(user_low_unread=F('user_low_unread') + 1, **summary)
+        conversations.filter(user_low=sender).exclude(user_high=sender).update(user_high_unread=F('user_high_unread') + 1, **summary)
+        have_mailbox = set(Mailbox.objects.filter(user_id__in=receiver_ids).values_list('user_id', flat=True))
+        Mailbox.objects.bulk_create(
+            [Mailbox(user_id=user_id) for user_id in receiver_ids if user_id not in have_mailbox], ignore_conflicts=True,
+        )
+        Mailbox.objects.filter(user_id__in=receiver_ids).update(unread=F('unread') + 1)
+
+        event = {'sender': sender.pk, 'preview': preview(content), 'timestamp': timestamp.isoformat()}
+
+        def publish():
+            for user_id in receiver_ids:
+                hub.publish(user_id, 'message', {**event, 'conversation': conversation_ids[user_id]})
+        transaction.on_commit(publish)
+
+
+def insert_messages(sender, content, conversation_ids):
+    """
+    Insert one message from ``sender`` to each receiver in ``conversation_ids``
+    (receiver id -> conversation id) with multi-row INSERTs, and return them.
+    """
+    return Message.objects.bulk_create(
+        [
+            Message(sender=sender, receiver_id=user_id, content=content, conversation_id=conversation_id)
+            for user_id, conversation_id in conversation_ids.items()
+        ],
+        batch_size=INSERT_BATCH_SIZE,
+    )
+
+
+def broadcast(sender, receivers, content, batch_size=1000, progress=None):
+    """
+    Send ``content`` from ``sender`` to every user in the ``receivers``
+    queryset (``sender`` excluded).
+
+    Receiver ids are streamed and written ``batch_size`` at a time, one
+    transaction per batch, so memory stays flat however many receivers there
+    are. ``progress`` is called with the running BroadcastResult after every
+    batch.
+    """
+    result = BroadcastResult()
+    batch = []
+
+    def flush():
+        write_broadcast_chunk(sender, list(batch), content)
+        result.sent += len(batch)
+        result.seconds = time.monotonic() - result.started
+        batch.clear()
+        if progress:
+            progress(result)
+
+    for user_id in receivers.exclude(pk=sender.pk).values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    result.seconds = time.monotonic() - result.started
+    return result
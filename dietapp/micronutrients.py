@@ -0,0 +1,154 @@
+# micronutrients.py
+"""
+Per-meal micronutrient vectors.
+
+Every nutrient in the NUTRIENTS registry owns a fixed slot, and each meal's
+Vitamin and Mineral rows are folded into one packed array stored in
+``Meal.nutrients``. Daily or weekly coverage is then a sum of a few hundred
+small arrays instead of a fetch of every child row grouped by name.
+"""
+import datetime
+from collections import defaultdict
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Meal, Mineral, Vitamin
+from .rollups import bucket_starts, check_series_range
+
+# Vector slot order. Only ever append: stored vectors are positional.
+NUTRIENTS = (
+    'Vitamin A', 'Vitamin B1', 'Vitamin B2', 'Vitamin B3', 'Vitamin B5', 'Vitamin B6',
+    'Vitamin B7', 'Vitamin B9', 'Vitamin B12', 'Vitamin C', 'Vitamin D', 'Vitamin E', 'Vitamin K',
+    'Calcium', 'Chloride', 'Chromium', 'Copper', 'Iodine', 'Iron', 'Magnesium', 'Manganese',
+    'Molybdenum', 'Phosphorus', 'Potassium', 'Selenium', 'Sodium', 'Zinc',
+)
+
+# Other spellings of registry names, already normalised.
+ALIASES = {
+    'thiamin': 'Vitamin B1', 'thiamine': 'Vitamin B1',
+    'riboflavin': 'Vitamin B2',
+    'niacin': 'Vitamin B3',
+    'pantothenic acid': 'Vitamin B5',
+    'biotin': 'Vitamin B7',
+    'folate': 'Vitamin B9', 'folic acid': 'Vitamin B9',
+    'cobalamin': 'Vitamin B12',
+    'ascorbic acid': 'Vitamin C',
+}
+
+# Stored percentages are clipped to this dtype; sums are done in int64.
+VECTOR_DTYPE = np.dtype('<u2')
+
+
+def normalize_name(name):
+    return ' '.join(str(name).lower().split())
+
+
+SLOTS = {normalize_name(name): slot for slot, name in enumerate(NUTRIENTS)}
+SLOTS.update({alias: SLOTS[normalize_name(name)] for alias, name in ALIASES.items()})
+
+
+def nutrient_slot(name):
+    """Return the vector slot of a nutrient name, or None if it is not registered."""
+    name = normalize_name(name)
+    slot = SLOTS.get(name)
+    if slot is None and not name.startswith('vitamin '):
+        # "C" and "B12" are common shorthands for the vitamins
+        slot = SLOTS.get(f'vitamin {name}')
+    return slot
+
+
+def nutrient_vector(pairs):
+    """Fold ``(name, percentage)`` pairs into a vector; unregistered names are dropped."""
+    vector = np.zeros(len(NUTRIENTS), dtype=np.int64)
+    for name, percentage in pairs:
+        slot = nutrient_slot(name)
+        if slot is not None:
+            vector[slot] += int(percentage or 0)
+    return vector
+
+
+def pack(vector):
+    info = np.iinfo(VECTOR_DTYPE)
+    return np.clip(vector, info.min, info.max).astype(VECTOR_DTYPE).tobytes()
+
+
+def unpack(data):
+    """Return the vector stored in ``data``, zero-padded to the current registry."""
+    vector = np.zeros(len(NUTRIENTS), dtype=np.int64)
+    if data:
+        stored = np.frombuffer(bytes(data), dtype=VECTOR_DTYPE)
+        vector[:len(stored)] = stored[:len(NUTRIENTS)]
+    return vector
+
+
+def meal_vectors(meal_ids):
+    """Build the vectors of ``meal_ids`` from their Vitamin and Mineral rows."""
+    pairs = defaultdict(list)
+    for model in (Vitamin, Mineral):
+        for meal_id, name, percentage in model.objects.filter(meal_id__in=meal_ids).values_list('meal_id', 'name', 'percentage'):
+            pairs[meal_id].append((name, percentage))
+    return {meal_id: nutrient_vector(pairs[meal_id]) for meal_id in meal_ids}
+
+
+def refresh_meal_vectors(meal_ids):
+    """
+    Recompute and store the vectors of ``meal_ids``; return them by meal id.
+
+    Written with a queryset update, so the Meal signals do not fire.
+    """
+    vectors = meal_vectors(list(meal_ids))
+    for meal_id, vector in vectors.items():
+        Meal.objects.filter(pk=meal_id).update(nutrients=pack(vector))
+    return vectors
+
+
+def rebuild_meal_vectors(meals=None, batch_size=1000):
+    """Recompute the vectors of ``meals`` (default: every meal); return the count."""
+    meals = Meal.objects.all() if meals is None else meals
+    count, batch = 0, []
+    for meal_id in meals.values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(meal_id)
+        if len(batch) >= batch_size:
+            count += len(refresh_meal_vectors(batch))
+            batch = []
+    if batch:
+        count += len(refresh_meal_vectors(batch))
+    return count
+
+
+def micronutrient_series(user, start, end, bucket='day'):
+    """
+    Return summed micronutrient percentages for ``user`` between two
+    inclusive dates, bucketed by day, week or month.
+
+    Meals logged before their vector existed are backfilled on the way.
+    """
+    check_series_range(start, end, bucket)
+    periods = list(bucket_starts(start, end, bucket))
+    index = {period: position for position, period in enumerate(periods)}
+    since = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+    until = timezone.make_aware(datetime.datetime.combine(end, datetime.time.max))
+    rows = list(
+        Meal.objects.filter(user=user, planned=False, date__gte=since, date__lte=until)
+        .order_by().values_list('pk', 'date', 'nutrients')
+    )
+    missing = refresh_meal_vectors([pk for pk, _, data in rows if data is None])
+
+    totals = np.zeros((len(periods), len(NUTRIENTS)), dtype=np.int64)
+    if rows:
+        positions = [index[period_start(timezone.localdate(date), bucket)] for _, date, _ in rows]
+        vectors = np.stack([missing[pk] if data is None else unpack(data) for pk, _, data in rows])
+        np.add.at(totals, positions, vectors)
+    return [
+        {'period': period, 'nutrients': dict(zip(NUTRIENTS, row.tolist()))}
+        for period, row in zip(periods, totals)
+    ]
+
+
+def period_start(day, bucket):
+    if bucket == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
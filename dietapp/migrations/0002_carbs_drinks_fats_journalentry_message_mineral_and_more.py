@@ -0,0 +1,179 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:14
+
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dietapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Carbs',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('gfat', models.PositiveIntegerField(default=0, verbose_name='Fat (g)')),
+                ('gcarb', models.PositiveIntegerField(default=0, verbose_name='Carbs (g)')),
+                ('gprotein', models.PositiveIntegerField(default=0, verbose_name='Protein (g)')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Drinks',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('gfat', models.PositiveIntegerField(default=0, verbose_name='Fat (g)')),
+                ('gcarb', models.PositiveIntegerField(default=0, verbose_name='Carbs (g)')),
+                ('gprotein', models.PositiveIntegerField(default=0, verbose_name='Protein (g)')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Fats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('gfat', models.PositiveIntegerField(default=0, verbose_name='Fat (g)')),
+                ('gcarb', models.PositiveIntegerField(default=0, verbose_name='Carbs (g)')),
+                ('gprotein', models.PositiveIntegerField(default=0, verbose_name='Protein (g)')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('content', models.TextField()),
+                ('date_posted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Journal Entry',
+                'verbose_name_plural': 'Journal Entries',
+                'ordering': ['-date_posted'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Message',
+                'verbose_name_plural': 'Messages',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Mineral',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('percentage', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='profile_pics/')),
+                ('age', models.IntegerField(blank=True, null=True)),
+                ('weight', models.FloatField(blank=True, null=True)),
+                ('height', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Profile',
+                'verbose_name_plural': 'Profile',
+            },
+        ),
+        migrations.CreateModel(
+            name='Proteins',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('gfat', models.PositiveIntegerField(default=0, verbose_name='Fat (g)')),
+                ('gcarb', models.PositiveIntegerField(default=0, verbose_name='Carbs (g)')),
+                ('gprotein', models.PositiveIntegerField(default=0, verbose_name='Protein (g)')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TDEE',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calories', models.PositiveIntegerField(default=0, verbose_name='Calories')),
+                ('date', models.DateField(auto_now_add=True, verbose_name='Date')),
+            ],
+            options={
+                'verbose_name': 'TDEE',
+                'verbose_name_plural': 'TDEEs',
+            },
+        ),
+        migrations.CreateModel(
+            name='Vitamin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('percentage', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Weekly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.CharField(choices=[('Monday', 'Monday'), ('Tuesday', 'Tuesday'), ('Wednesday', 'Wednesday'), ('Thursday', 'Thursday'), ('Friday', 'Friday'), ('Saturday', 'Saturday'), ('Sunday', 'Sunday')], default='Monday', max_length=10)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.RemoveField(
+            model_name='healthdata',
+            name='user',
+        ),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='user',
+        ),
+        migrations.AlterModelOptions(
+            name='exercise',
+            options={'ordering': ['-date'], 'verbose_name': 'Exercise', 'verbose_name_plural': 'Exercises'},
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='type',
+            field=models.CharField(choices=[('cardio', 'Cardio'), ('strength', 'Strength')], default='cardio', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='meal',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='exercise',
+            name='calories_burned',
+            field=models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Calories Burned'),
+        ),
+        migrations.AlterField(
+            model_name='exercise',
+            name='duration',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Duration (minutes)'),
+        ),
+    ]
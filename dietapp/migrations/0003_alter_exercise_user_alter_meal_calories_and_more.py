@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:14
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dietapp', '0002_carbs_drinks_fats_journalentry_message_mineral_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exercise',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercises', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='calories',
+            field=models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='carbs',
+            field=models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='fat',
+            field=models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='protein',
+            field=models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AlterField(
+            model_name='meal',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meals', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='journalentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='receiver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='received_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='sender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sent_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='mineral',
+            name='meal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minerals', to='dietapp.meal'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tdee',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tdee', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AddField(
+            model_name='vitamin',
+            name='meal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vitamins', to='dietapp.meal'),
+        ),
+        migrations.AddField(
+            model_name='weekly',
+            name='meal',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_meals', to='dietapp.meal'),
+        ),
+        migrations.AddField(
+            model_name='weekly',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.DeleteModel(
+            name='HealthData',
+        ),
+        migrations.DeleteModel(
+            name='UserProfile',
+        ),
+        migrations.AddConstraint(
+            model_name='weekly',
+            constraint=models.UniqueConstraint(fields=('day', 'user'), name='unique_weekly_meal_for_user'),
+        ),
+    ]
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:14
+
+import django.core.validators
+from django.db import migrations, models
+
+# Old per-category table -> Food.category
+CATEGORIES = {'Carbs': 'carb', 'Fats': 'fat', 'Proteins': 'protein', 'Drinks': 'drink'}
+
+
+def copy_catalog_to_food(apps, schema_editor):
+    """Copy the rows of the per-category tables into Food, tagged with their category."""
+    Food = apps.get_model('dietapp', 'Food')
+    for model_name, category in CATEGORIES.items():
+        rows = apps.get_model('dietapp', model_name).objects.order_by('pk')
+        Food.objects.bulk_create(
+            [
+                Food(name=row.name, gfat=row.gfat, gcarb=row.gcarb, gprotein=row.gprotein, category=category)
+                for row in rows.iterator()
+            ],
+            batch_size=500,
+        )
+
+
+def copy_food_to_catalog(apps, schema_editor):
+    """Move Food rows back into their per-category tables; decimals are rounded down."""
+    Food = apps.get_model('dietapp', 'Food')
+    for model_name, category in CATEGORIES.items():
+        model = apps.get_model('dietapp', model_name)
+        model.objects.bulk_create(
+            [
+                model(name=food.name[:50], gfat=int(food.gfat), gcarb=int(food.gcarb), gprotein=int(food.gprotein))
+                for food in Food.objects.filter(category=category).order_by('pk').iterator()
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dietapp', '0003_alter_exercise_user_alter_meal_calories_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Food',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('gfat', models.DecimalField(decimal_places=2, default=0, max_digits=5, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Fat (g)')),
+                ('gcarb', models.DecimalField(decimal_places=2, default=0, max_digits=5, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Carbs (g)')),
+                ('gprotein', models.DecimalField(decimal_places=2, default=0, max_digits=5, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Protein (g)')),
+                ('popularity', models.PositiveIntegerField(default=0, editable=False, help_text='Number of logged meals using this food')),
+                ('category', models.CharField(choices=[('carb', 'Carbs'), ('fat', 'Fats'), ('protein', 'Proteins'), ('drink', 'Drinks')], max_length=10)),
+                ('source_id', models.CharField(blank=True, help_text='Identifier in the source nutrient database', max_length=50, null=True)),
+            ],
+            options={
+                'verbose_name': 'Food',
+                'verbose_name_plural': 'Foods',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['category', 'name'], name='food_category_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='food',
+            constraint=models.UniqueConstraint(fields=('source_id',), name='unique_food_source_id'),
+        ),
+        migrations.RunPython(copy_catalog_to_food, copy_food_to_catalog),
+        migrations.DeleteModel(
+            name='Carbs',
+        ),
+        migrations.DeleteModel(
+            name='Drinks',
+        ),
+        migrations.DeleteModel(
+            name='Fats',
+        ),
+        migrations.DeleteModel(
+            name='Proteins',
+        ),
+        migrations.CreateModel(
+            name='Carbs',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Carbs',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('dietapp.food',),
+        ),
+        migrations.CreateModel(
+            name='Drinks',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Drinks',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('dietapp.food',),
+        ),
+        migrations.CreateModel(
+            name='Fats',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Fats',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('dietapp.food',),
+        ),
+        migrations.CreateModel(
+            name='Proteins',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Proteins',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('dietapp.food',),
+        ),
+    ]
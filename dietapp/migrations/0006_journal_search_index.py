@@ -0,0 +1,60 @@
+from django.db import migrations
+
+FTS_TABLE = 'dietapp_journalentry_fts'
+PG_INDEX = 'dietapp_journalentry_search_idx'
+
+SQLITE_CREATE = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, content, content='dietapp_journalentry', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON dietapp_journalentry BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON dietapp_journalentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, content ON dietapp_journalentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    # Index the entries written before the table existed
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_DROP = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+# Must match journal_search.PG_DOCUMENT for queries to use the index
+PG_CREATE = (
+    f"CREATE INDEX {PG_INDEX} ON dietapp_journalentry USING GIN (("
+    "setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')"
+    "))",
+)
+
+PG_DROP = (f"DROP INDEX IF EXISTS {PG_INDEX}",)
+
+
+def run(statements):
+    """Run the statements of ``statements`` (vendor -> SQL) for the migrating database's vendor."""
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dietapp', '0005_columnhistogram_conversation_dailynutritionsummary_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': PG_CREATE}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': PG_DROP}),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dietapp', '0006_journal_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meal',
+            name='planned',
+            field=models.BooleanField(default=False, help_text='Copied from a weekly plan template, not logged as eaten'),
+        ),
+    ]
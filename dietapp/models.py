@@ -10,7 +10,8 @@ from django.db.models import TextChoices
 User = get_user_model()  # Use this dynamically to reference the custom user model
 
 class Profile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
+    # user.profile is the users app's Profile
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dietapp_profile')
     image = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
     age = models.IntegerField(null=True, blank=True)
     weight = models.FloatField(null=True, blank=True)
@@ -33,10 +34,11 @@ class Profile(models.Model):
         return None
         
 class FoodComponent(models.Model):
-    name = models.CharField(max_length=50)
-    gfat = models.PositiveIntegerField(default=0, verbose_name="Fat (g)")
-    gcarb = models.PositiveIntegerField(default=0, verbose_name="Carbs (g)")
-    gprotein = models.PositiveIntegerField(default=0, verbose_name="Protein (g)")
+    name = models.CharField(max_length=200)
+    gfat = models.DecimalField(max_digits=5, decimal_places=2, default=0, validators=[MinValueValidator(0)], verbose_name="Fat (g)")
+    gcarb = models.DecimalField(max_digits=5, decimal_places=2, default=0, validators=[MinValueValidator(0)], verbose_name="Carbs (g)")
+    gprotein = models.DecimalField(max_digits=5, decimal_places=2, default=0, validators=[MinValueValidator(0)], verbose_name="Protein (g)")
+    popularity = models.PositiveIntegerField(default=0, editable=False, help_text="Number of logged meals using this food")
 
     class Meta:
         abstract = True
@@ -44,20 +46,84 @@ class FoodComponent(models.Model):
     def __str__(self):
         return self.name
 
-class Carbs(FoodComponent):
-    pass
+class FoodCategory(TextChoices):
+    CARB = 'carb', _('Carbs')
+    FAT = 'fat', _('Fats')
+    PROTEIN = 'protein', _('Proteins')
+    DRINK = 'drink', _('Drinks')
+
+
+class FoodCategoryManager(models.Manager):
+    """Restricts a Food proxy model to its own category."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.model.proxy_category:
+            queryset = queryset.filter(category=self.model.proxy_category)
+        return queryset
+
+
+class Food(FoodComponent):
+    """
+    A catalog food with its macros per 100g (or 100ml for drinks).
+
+    Carbs, Fats, Proteins and Drinks are proxies over this table limited to
+    one category, so code written against the old per-category tables keeps
+    working.
+    """
+    category = models.CharField(max_length=10, choices=FoodCategory.choices)
+    source_id = models.CharField(max_length=50, blank=True, null=True, help_text="Identifier in the source nutrient database")
+
+    objects = FoodCategoryManager()
+
+    # Category the proxy models below are restricted to
+    proxy_category = None
+
+    class Meta:
+        verbose_name = "Food"
+        verbose_name_plural = "Foods"
+        indexes = [
+            models.Index(fields=['category', 'name'], name='food_category_name_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['source_id'], name='unique_food_source_id'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.proxy_category:
+            self.category = self.proxy_category
+        super().save(*args, **kwargs)
+
+class Carbs(Food):
+    proxy_category = FoodCategory.CARB
+
+    class Meta:
+        proxy = True
+        verbose_name_plural = "Carbs"
 
 
-class Fats(FoodComponent):
-    pass
+class Fats(Food):
+    proxy_category = FoodCategory.FAT
 
+    class Meta:
+        proxy = True
+        verbose_name_plural = "Fats"
 
-class Proteins(FoodComponent):
-    pass
 
+class Proteins(Food):
+    proxy_category = FoodCategory.PROTEIN
+
+    class Meta:
+        proxy = True
+        verbose_name_plural = "Proteins"
 
-class Drinks(FoodComponent):
-    pass
+
+class Drinks(Food):
+    proxy_category = FoodCategory.DRINK
+
+    class Meta:
+        proxy = True
+        verbose_name_plural = "Drinks"
 
 class Meal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="meals", db_index=True)
@@ -67,11 +133,65 @@ class Meal(models.Model):
     carbs = models.FloatField(validators=[MinValueValidator(0.0)], default=0.0)
     fat = models.FloatField(validators=[MinValueValidator(0.0)], default=0.0)
     description = models.TextField(blank=True, null=True)
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=now)
+    # Packed micronutrient vector, see micronutrients.py
+    nutrients = models.BinaryField(null=True, editable=False)
+    planned = models.BooleanField(default=False, help_text="Copied from a weekly plan template, not logged as eaten")
 
     def __str__(self):
         return f"{self.name} ({self.calories} kcal)"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's meals, newest first
+            models.Index(fields=['user', '-date', '-id'], name='meal_user_date_idx'),
+            # Range filters of the admin changelist
+            models.Index(fields=['calories'], name='meal_calories_idx'),
+            models.Index(fields=['protein'], name='meal_protein_idx'),
+            models.Index(fields=['carbs'], name='meal_carbs_idx'),
+            models.Index(fields=['fat'], name='meal_fat_idx'),
+        ]
+
+class ColumnHistogram(models.Model):
+    """
+    Bucket boundaries splitting a numeric column into ranges of roughly equal
+    row counts, used by the admin range filters. Refreshed periodically with
+    the ``refresh_histograms`` management command.
+    """
+    name = models.CharField(max_length=100, unique=True, help_text="app_label.model.field")
+    boundaries = models.JSONField(default=list)
+    row_count = models.PositiveBigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+class DailyNutritionSummary(models.Model):
+    """
+    Pre-aggregated intake and burn for one user on one day.
+
+    Kept up to date by the Meal and Exercise signal receivers; rebuild it
+    with the ``rebuild_daily_summaries`` management command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_summaries")
+    day = models.DateField()
+    calories_intake = models.FloatField(default=0.0)
+    calories_burned = models.FloatField(default=0.0)
+    protein = models.FloatField(default=0.0)
+    carbs = models.FloatField(default=0.0)
+    fat = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = "Daily Nutrition Summary"
+        verbose_name_plural = "Daily Nutrition Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_summary_for_user'),
+        ]
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.user.username} on {self.day}: {self.calories_intake} kcal in, {self.calories_burned} kcal out"
+
 class DaysOfWeek(TextChoices):
     MONDAY = 'Monday', _('Monday')
     TUESDAY = 'Tuesday', _('Tuesday')
@@ -141,15 +261,89 @@ class Message(models.Model):
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="received_messages")
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+    conversation = models.ForeignKey('Conversation', on_delete=models.CASCADE, null=True, blank=True, editable=False, related_name="messages")
 
     class Meta:
         verbose_name = "Message"
         verbose_name_plural = "Messages"
         ordering = ['-timestamp']
+        indexes = [
+            # Conversation detail, newest first
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='message_conversation_time_idx'),
+            # Inbox and sent folders, newest first
+            models.Index(fields=['receiver', '-timestamp', '-id'], name='message_receiver_time_idx'),
+            models.Index(fields=['sender', '-timestamp', '-id'], name='message_sender_time_idx'),
+            models.Index(fields=['receiver'], condition=models.Q(read_at__isnull=True), name='message_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username}"
 
+    @property
+    def is_read(self):
+        return self.read_at is not None
+
+class Conversation(models.Model):
+    """
+    The message thread between two users, with what a conversation list shows.
+
+    ``user_low`` is always the participant with the lower id. The preview,
+    timestamp and unread counts are updated by the Message signal receivers
+    in the same transaction as each message.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    last_message_preview = models.CharField(max_length=140, blank=True)
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    user_low_unread = models.IntegerField(default=0)
+    user_high_unread = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Conversation"
+        verbose_name_plural = "Conversations"
+        ordering = ['-last_timestamp']
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='unique_conversation_pair'),
+            models.CheckConstraint(check=models.Q(user_low__lte=models.F('user_high')), name='conversation_pair_ordered'),
+        ]
+        indexes = [
+            # Conversation list of either participant, most recent first
+            models.Index(fields=['user_low', '-last_timestamp', '-id'], name='conversation_low_time_idx'),
+            models.Index(fields=['user_high', '-last_timestamp', '-id'], name='conversation_high_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation between {self.user_low} and {self.user_high}"
+
+    def side(self, user):
+        """Return 'low' or 'high', the side of the pair ``user`` is on."""
+        return 'low' if user.pk == self.user_low_id else 'high'
+
+    def other(self, user):
+        return self.user_high if self.side(user) == 'low' else self.user_low
+
+    def unread_for(self, user):
+        return getattr(self, f'user_{self.side(user)}_unread')
+
+class Mailbox(models.Model):
+    """
+    Per-user count of unread received messages.
+
+    Kept up to date by the Message signal receivers and ``messaging.mark_read``;
+    rebuild it with the ``recount_unread_messages`` management command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="mailbox")
+    unread = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Mailbox"
+        verbose_name_plural = "Mailboxes"
+
+    def __str__(self):
+        return f"{self.user} ({self.unread} unread)"
+
 class Exercise(models.Model):
     """
     Represents an exercise activity for a user.
@@ -192,3 +386,7 @@ class JournalEntry(models.Model):
         verbose_name = "Journal Entry"
         verbose_name_plural = "Journal Entries"
         ordering = ['-date_posted']
+        indexes = [
+            # Keyset pagination of a user's journal, newest first
+            models.Index(fields=['author', '-date_posted', '-id'], name='journal_author_date_idx'),
+        ]
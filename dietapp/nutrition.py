@@ -0,0 +1,69 @@
+# nutrition.py
+"""
+Meal composition engine.
+
+Ingredients are stacked into a per-100g macro matrix so that meal totals come
+out of a single matrix product instead of one expression per macro and food.
+"""
+import numpy as np
+
+from .models import Drinks
+
+# Column order of the macro matrix, matching the FoodComponent fields.
+MACRO_FIELDS = ('gcarb', 'gfat', 'gprotein')
+
+# Energy per gram of carbs, fat and protein, in the same column order.
+CALORIES_PER_GRAM = np.array([4.0, 9.0, 4.0])
+
+# Catalog rows the meal form uses to mean "nothing selected".
+EMPTY_SOURCE_NAMES = {'No Carb Source', 'No Fat Source', 'No Protein Source', 'No Drink'}
+
+
+def macro_matrix(foods):
+    """Return an (n, 3) array of per-100g carbs, fat and protein for ``foods``."""
+    rows = [[getattr(food, field) for field in MACRO_FIELDS] for food in foods]
+    return np.array(rows, dtype=float).reshape(-1, len(MACRO_FIELDS))
+
+
+def score_meals(matrix, quantities):
+    """
+    Score many candidate meals built from the same ingredients at once.
+
+    ``quantities`` is an (m, n) array holding the grams (or ml) of each of the
+    n ingredients in ``matrix`` for m candidate meals. Returns an (m, 4) array
+    of carbs, fat, protein and calories per candidate.
+    """
+    quantities = np.atleast_2d(np.asarray(quantities, dtype=float))
+    macros = quantities @ matrix / 100
+    calories = macros @ CALORIES_PER_GRAM
+    return np.column_stack((macros, calories))
+
+
+def compose_meal(ingredients):
+    """
+    Compute meal totals for a list of ``(food, quantity)`` pairs.
+
+    Macros are rounded to whole grams and calories are derived from the
+    rounded macros. The result is keyed by ``Meal`` field name.
+    """
+    foods = [food for food, _ in ingredients]
+    quantities = np.array([float(quantity) for _, quantity in ingredients])
+    carbs, fat, protein = np.rint(quantities @ macro_matrix(foods) / 100)
+    calories = np.array([carbs, fat, protein]) @ CALORIES_PER_GRAM
+    return {
+        'carbs': float(carbs),
+        'fat': float(fat),
+        'protein': float(protein),
+        'calories': float(calories),
+    }
+
+
+def describe_ingredients(ingredients):
+    """Format ``(food, quantity)`` pairs as the meal's ingredient list."""
+    parts = []
+    for food, quantity in ingredients:
+        if food.name in EMPTY_SOURCE_NAMES:
+            continue
+        unit = 'ml' if isinstance(food, Drinks) else 'g'
+        parts.append(f'{quantity}{unit} of {food.name}')
+    return ' | '.join(parts)
@@ -0,0 +1,209 @@
+# pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a ``WHERE (date, id) < (last date, last id)`` style
+filter on the ordering columns instead of ``OFFSET``, and no ``COUNT(*)`` is
+run, so with a matching composite index every page costs the same as the
+first. Cursors are signed, opaque tokens naming the row a page continues
+from and the direction to go.
+
+EstimatedCountPaginator keeps offset pages for the admin but replaces the
+exact ``COUNT(*)`` of a large table with the database's own row estimate.
+"""
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'dietapp.pagination'
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was tampered with or belongs to another list."""
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator, usable where a Django Page is expected."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` on ``ordering``, whose last field must be unique
+    (usually ``pk``) and none of whose fields may be null.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pk',)):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+        self.salt = f"{CURSOR_SALT}:{queryset.model._meta.label_lower}:{','.join(self.ordering)}"
+
+    def model_field(self, name):
+        meta = self.queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    def encode(self, direction, obj):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(obj, self.model_field(name).attname)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps([direction, values], salt=self.salt, compress=True)
+
+    def decode(self, cursor):
+        try:
+            direction, values = signing.loads(cursor, salt=self.salt)
+            if direction not in ('next', 'previous') or len(values) != len(self.fields):
+                raise ValueError
+            return direction, [self.model_field(name).to_python(value) for (name, _), value in zip(self.fields, values)]
+        except (signing.BadSignature, ValueError, TypeError) as error:
+            raise InvalidCursor("Invalid pagination cursor.") from error
+
+    def seek(self, values, forward):
+        """Filter for the rows after ``values`` in ordering order (before it if not ``forward``)."""
+        condition = Q()
+        for position, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = {field: value for (field, _), value in zip(self.fields[:position], values)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': values[position]})
+        return condition
+
+    def page(self, cursor=None):
+        """Return the first page, or the page ``cursor`` points to."""
+        direction, values = self.decode(cursor) if cursor else ('next', None)
+        forward = direction == 'next'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, forward))
+        if not forward:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        has_next = more if forward else True
+        has_previous = values is not None if forward else more
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode('next', rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode('previous', rows[0]) if rows and has_previous else None,
+        )
+
+
+def keyset_page(request, queryset, per_page, ordering=('-pk',), cursor_param='cursor'):
+    """Return the page of ``queryset`` named by the request's cursor, for function views."""
+    try:
+        return KeysetPaginator(queryset, per_page, ordering).page(request.GET.get(cursor_param))
+    except InvalidCursor:
+        raise Http404("Invalid pagination cursor.")
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin swapping offset pagination for keyset pagination on
+    ``keyset_ordering``. The template gets a KeysetPage as ``page_obj``;
+    link to other pages with ``?cursor={{ page_obj.next_cursor }}``.
+    """
+    keyset_ordering = ('-pk',)
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not isinstance(queryset, QuerySet):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Invalid pagination cursor.")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Return the database's estimate of the number of rows in ``model``'s
+    table without scanning it, or None when it has none: Postgres's
+    ``pg_class.reltuples``, or SQLite's ``sqlite_stat1`` (after ANALYZE) with
+    ``MAX(rowid)`` as the fallback.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [connection.ops.quote_name(table)])
+            row = cursor.fetchone()
+            # reltuples is -1 (or 0) until the table is first analyzed
+            return row[0] if row and row[0] > 0 else None
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+            row = cursor.fetchone()
+            return row[0] if row else None
+    return None
+
+
+class CountAtLeast(int):
+    """A row count known only to be at least its value; renders as "10000+"."""
+
+    def __str__(self):
+        return f'{int(self)}+'
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists of large tables.
+
+    An unfiltered queryset is counted from the table estimate once the table
+    holds at least ``estimate_threshold`` rows; a filtered one is counted
+    exactly, but only up to ``count_limit`` rows, so neither reads the
+    whole table. A count that reached the limit is a CountAtLeast.
+    LargeTableAdmin raises the limit with the requested page, so the pages
+    after it stay reachable.
+    """
+    estimate_threshold = 10000
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate
+        count = queryset.order_by()[:self.count_limit + 1].count()
+        return CountAtLeast(self.count_limit) if count > self.count_limit else count
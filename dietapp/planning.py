@@ -0,0 +1,148 @@
+# planning.py
+"""
+Bulk weekly plan editing.
+
+A whole week is written with one INSERT ... ON CONFLICT (day, user) DO UPDATE
+statement, so repeated or concurrent submissions for the same day update the
+existing entry instead of failing on the unique_weekly_meal_for_user
+constraint.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .dashboard import invalidate_dashboard
+from .models import DaysOfWeek, Meal, Mineral, Vitamin, Weekly
+
+# Meal fields that make a user's meal a copy of a template meal.
+MEAL_COPY_FIELDS = ('name', 'calories', 'protein', 'carbs', 'fat')
+
+
+def upsert_entries(entries, batch_size=None):
+    """Insert or update Weekly rows on their (day, user) key."""
+    Weekly.objects.bulk_create(
+        entries, batch_size=batch_size, update_conflicts=True,
+        unique_fields=['day', 'user'], update_fields=['meal'],
+    )
+
+
+def expire_dashboards(user_ids):
+    """bulk_create skips post_save, so expire the dashboards ourselves after commit."""
+    user_ids = list(user_ids)
+
+    def expire():
+        for user_id in user_ids:
+            invalidate_dashboard(user_id)
+    transaction.on_commit(expire)
+
+
+def save_weekly_plan(user, plan):
+    """
+    Apply ``plan``, a ``{day: meal id or None}`` mapping, to ``user``'s week.
+
+    Days mapped to None are cleared and days left out are untouched. Every
+    meal must belong to ``user``. Raises ValidationError otherwise.
+    """
+    errors = {}
+    for day in plan:
+        if day not in DaysOfWeek.values:
+            errors[day] = ["Not a day of the week."]
+    meal_ids = {meal_id for meal_id in plan.values() if meal_id is not None}
+    owned = set(Meal.objects.filter(user=user, pk__in=meal_ids).values_list('pk', flat=True))
+    for day, meal_id in plan.items():
+        if meal_id is not None and meal_id not in owned:
+            errors.setdefault(day, []).append("Selected meal does not exist or does not belong to you.")
+    if errors:
+        raise ValidationError(errors)
+
+    with transaction.atomic():
+        upsert_entries([
+            Weekly(user=user, day=day, meal_id=meal_id)
+            for day, meal_id in plan.items() if meal_id is not None
+        ])
+        cleared = [day for day, meal_id in plan.items() if meal_id is None]
+        if cleared:
+            Weekly.objects.filter(user=user, day__in=cleared).delete()
+        expire_dashboards([user.pk])
+
+
+def copy_meals(meals, user_ids, batch_size=None):
+    """
+    Give every user in ``user_ids`` their own copy of each of ``meals``.
+
+    A user's existing meal with the same MEAL_COPY_FIELDS is reused, so
+    cloning a plan twice does not duplicate meals. New copies are flagged
+    ``planned`` and dated now, so they stay out of the user's logged meals
+    and rollups. Returns
+    ``{(user id, template meal id): the user's meal id}``.
+    """
+    copies = {}
+    by_fields = {tuple(getattr(meal, field) for field in MEAL_COPY_FIELDS): meal for meal in meals}
+    existing = Meal.objects.filter(user_id__in=user_ids, name__in={meal.name for meal in meals}).values_list('pk', 'user_id', *MEAL_COPY_FIELDS)
+    for meal_id, user_id, *fields in existing:
+        meal = by_fields.get(tuple(fields))
+        if meal is not None:
+            copies.setdefault((user_id, meal.pk), meal_id)
+
+    missing = [(user_id, meal) for user_id in user_ids for meal in meals if (user_id, meal.pk) not in copies]
+    created = Meal.objects.bulk_create([
+        Meal(user_id=user_id, description=meal.description, nutrients=meal.nutrients, planned=True,
+             **{field: getattr(meal, field) for field in MEAL_COPY_FIELDS})
+        for user_id, meal in missing
+    ], batch_size=batch_size)
+    children = []
+    for copy, (user_id, meal) in zip(created, missing):
+        copies[user_id, meal.pk] = copy.pk
+        children += [Vitamin(meal=copy, name=child.name, percentage=child.percentage) for child in meal.vitamins.all()]
+        children += [Mineral(meal=copy, name=child.name, percentage=child.percentage) for child in meal.minerals.all()]
+    Vitamin.objects.bulk_create([child for child in children if isinstance(child, Vitamin)], batch_size=batch_size)
+    Mineral.objects.bulk_create([child for child in children if isinstance(child, Mineral)], batch_size=batch_size)
+    return copies
+
+
+def clone_weekly_plan(template_user, users, batch_size=1000, replace=True, progress=None):
+    """
+    Copy ``template_user``'s weekly plan to every user in ``users``.
+
+    Each user's plan points at their own copies of the template's meals (see
+    copy_meals), never at the template user's rows. ``users`` is a user
+    queryset; its ids are streamed and written in transactions of
+    ``batch_size`` users. With ``replace``, days missing from the template are
+    cleared for the target users. Returns the number of users updated.
+    """
+    template = list(
+        Weekly.objects.filter(user=template_user).select_related('meal')
+        .prefetch_related('meal__vitamins', 'meal__minerals')
+    )
+    template_days = [entry.day for entry in template]
+    meals = list({entry.meal_id: entry.meal for entry in template}.values())
+    updated = 0
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            copies = copy_meals(meals, batch, batch_size=batch_size)
+            upsert_entries(
+                [
+                    Weekly(user_id=user_id, day=entry.day, meal_id=copies[user_id, entry.meal_id])
+                    for user_id in batch for entry in template
+                ],
+                batch_size=batch_size,
+            )
+            if replace:
+                Weekly.objects.filter(user_id__in=batch).exclude(day__in=template_days).delete()
+            expire_dashboards(batch)
+
+    for user_id in users.exclude(pk=template_user.pk).values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            flush()
+            updated += len(batch)
+            batch = []
+            if progress:
+                progress(updated)
+    if batch:
+        flush()
+        updated += len(batch)
+        if progress:
+            progress(updated)
+    return updated
@@ -0,0 +1,223 @@
+# rollups.py
+"""
+Maintenance of the per-day DailyNutritionSummary rollup.
+
+Meal and Exercise writes are applied to the rollup as deltas with F()
+expressions, so reading a week, month or year of totals touches a handful of
+summary rows instead of every logged meal and exercise.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import DateField, F, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+
+from .models import DailyNutritionSummary, Exercise, Meal
+
+# Summary field -> source field, per model feeding the rollup.
+ROLLUP_FIELDS = {
+    Meal: {'calories_intake': 'calories', 'protein': 'protein', 'carbs': 'carbs', 'fat': 'fat'},
+    Exercise: {'calories_burned': 'calories_burned'},
+}
+
+# Rows of a model matching these values are left out of the rollup.
+ROLLUP_FILTERS = {
+    Meal: {'planned': False},
+    Exercise: {},
+}
+
+SUMMARY_FIELDS = ('calories_intake', 'calories_burned', 'protein', 'carbs', 'fat')
+
+# Granularities accepted by calorie_series.
+SERIES_BUCKETS = ('day', 'week', 'month')
+
+# Most buckets a series may span.
+MAX_SERIES_BUCKETS = 1500
+
+
+def contribution(model, data):
+    """
+    Return ``(user_id, day, values)`` describing what a row with field values
+    ``data`` contributes to the rollup, or None if a value is missing.
+    """
+    source_fields = ROLLUP_FIELDS[model]
+    filters = ROLLUP_FILTERS[model]
+    if data.get('date') is None or data.get('user_id') is None:
+        return None
+    if any(field not in data for field in (*source_fields.values(), *filters)):
+        return None
+    if any(data[field] != value for field, value in filters.items()):
+        values = dict.fromkeys(source_fields, 0.0)
+    else:
+        values = {summary: float(data[field] or 0) for summary, field in source_fields.items()}
+    return data['user_id'], timezone.localdate(data['date']), values
+
+
+def snapshot(instance):
+    """
+    Return the rollup contribution of ``instance`` as held in memory.
+
+    Only already-loaded values are read so deferred fields never trigger a query.
+    """
+    if instance.pk is None:
+        return None
+    return contribution(type(instance), instance.__dict__)
+
+
+def stored_snapshot(instance):
+    """Return the rollup contribution of ``instance`` as currently stored in the database."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    model = type(instance)
+    fields = ('user_id', 'date', *ROLLUP_FIELDS[model].values(), *ROLLUP_FILTERS[model])
+    row = model.objects.filter(pk=instance.pk).values(*fields).first()
+    return contribution(model, row) if row else None
+
+
+def apply_delta(user_id, day, values, sign=1, create=True):
+    """Add (or with ``sign=-1`` subtract) ``values`` to a user's day."""
+    if not any(values.values()):
+        return
+    if create:
+        DailyNutritionSummary.objects.get_or_create(user_id=user_id, day=day)
+    DailyNutritionSummary.objects.filter(user_id=user_id, day=day).update(
+        **{field: F(field) + sign * value for field, value in values.items()}
+    )
+
+
+def record_save(instance, previous):
+    """Move ``instance``'s contribution from ``previous`` to its current state."""
+    current = snapshot(instance)
+    if current is None:
+        # Partially loaded instance: rebuild the days it may have touched
+        days = {timezone.localdate(instance.date)}
+        if previous is not None:
+            days.add(previous[1])
+        for day in days:
+            rebuild_summaries(users=[instance.user_id], start=day, end=day)
+        return
+    with transaction.atomic():
+        if previous is not None:
+            apply_delta(*previous, sign=-1, create=False)
+        apply_delta(*current)
+
+
+def record_delete(instance):
+    """Remove ``instance``'s contribution from the rollup."""
+    previous = snapshot(instance)
+    # Deferred instances cannot be accounted for here and are reconciled by
+    # rebuild_daily_summaries. Never create rows: the user may be being deleted.
+    if previous is not None:
+        apply_delta(*previous, sign=-1, create=False)
+
+
+def rebuild_summaries(users=None, start=None, end=None):
+    """
+    Recompute summaries from the raw Meal and Exercise rows.
+
+    ``users`` is an optional iterable of user ids; ``start`` and ``end`` are
+    optional inclusive dates. Returns the number of summary rows written.
+    """
+    summaries = {}
+    for model, fields in ROLLUP_FIELDS.items():
+        rows = model.objects.filter(**ROLLUP_FILTERS[model])
+        if users is not None:
+            rows = rows.filter(user_id__in=users)
+        rows = rows.annotate(day=TruncDate('date', tzinfo=timezone.get_current_timezone()))
+        if start is not None:
+            rows = rows.filter(day__gte=start)
+        if end is not None:
+            rows = rows.filter(day__lte=end)
+        rows = rows.order_by().values('user_id', 'day').annotate(
+            **{summary: Sum(field) for summary, field in fields.items()}
+        )
+        for row in rows:
+            summary = summaries.setdefault(
+                (row['user_id'], row['day']),
+                DailyNutritionSummary(user_id=row['user_id'], day=row['day']),
+            )
+            for field in fields:
+                setattr(summary, field, row[field] or 0.0)
+
+    stale = DailyNutritionSummary.objects.all()
+    if users is not None:
+        stale = stale.filter(user_id__in=users)
+    if start is not None:
+        stale = stale.filter(day__gte=start)
+    if end is not None:
+        stale = stale.filter(day__lte=end)
+    with transaction.atomic():
+        stale.delete()
+        DailyNutritionSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+    return len(summaries)
+
+
+def period_totals(user, start, end):
+    """Return the summed rollup fields for ``user`` between two inclusive dates."""
+    totals = DailyNutritionSummary.objects.filter(user=user, day__range=(start, end)).aggregate(
+        **{field: Sum(field) for field in SUMMARY_FIELDS}
+    )
+    return {field: value or 0.0 for field, value in totals.items()}
+
+
+def bucket_starts(start, end, bucket):
+    """Yield the first day of every ``bucket`` overlapping the inclusive range."""
+    if bucket == 'day':
+        current, step = start, datetime.timedelta(days=1)
+    elif bucket == 'week':
+        current, step = start - datetime.timedelta(days=start.weekday()), datetime.timedelta(days=7)
+    else:
+        current, step = start.replace(day=1), None
+    while current <= end:
+        yield current
+        if step is not None:
+            if current > datetime.date.max - step:
+                return
+            current += step
+        elif current.month == 12:
+            if current.year == datetime.MAXYEAR:
+                return
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+
+
+def check_series_range(start, end, bucket):
+    """Raise ValueError unless ``start``..``end`` is a valid range of at most MAX_SERIES_BUCKETS buckets."""
+    if bucket not in SERIES_BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}; expected one of {', '.join(SERIES_BUCKETS)}.")
+    if start > end:
+        raise ValueError("start must not be after end.")
+    if bucket == 'month':
+        buckets = (end.year - start.year) * 12 + end.month - start.month + 1
+    else:
+        buckets = (end - start).days // (7 if bucket == 'week' else 1) + 1
+    if buckets > MAX_SERIES_BUCKETS:
+        raise ValueError(f"A series may span at most {MAX_SERIES_BUCKETS} {bucket}s.")
+
+
+def calorie_series(user, start, end, bucket='day'):
+    """
+    Return intake, burn and net balance for ``user`` between two inclusive
+    dates, bucketed by day, week or month.
+
+    The buckets come from one grouped aggregate over the daily rollup. Buckets
+    with nothing logged are filled with zeros so charts get a continuous series.
+    """
+    check_series_range(start, end, bucket)
+    rows = (
+        DailyNutritionSummary.objects
+        .filter(user=user, day__range=(start, end))
+        .annotate(period=Trunc('day', bucket, output_field=DateField()))
+        .order_by()
+        .values('period')
+        .annotate(intake=Sum('calories_intake'), burned=Sum('calories_burned'))
+    )
+    totals = {row['period']: row for row in rows}
+    series = []
+    for period in bucket_starts(start, end, bucket):
+        row = totals.get(period, {})
+        intake, burned = row.get('intake') or 0.0, row.get('burned') or 0.0
+        series.append({'period': period, 'intake': intake, 'burned': burned, 'net': intake - burned})
+    return series
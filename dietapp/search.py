@@ -0,0 +1,228 @@
+# search.py
+"""
+In-memory search index for ingredient autocomplete.
+
+Food names are split into normalised tokens kept in a sorted array, so prefix
+matches are a bisect away. Typo-tolerant matches compare the query against the
+tokens sharing its phonetic key or its first letter with jellyfish's
+Damerau-Levenshtein distance, instead of scanning every name with icontains.
+The index is built from the food catalog. Whenever a table's catalog version
+stamp moves, the rows of that category are compared with the index and only
+new, renamed and removed foods are reindexed. Logged uses don't move the
+version stamp: each worker bumps its own counts and re-reads every food's
+popularity from the database every FOOD_POPULARITY_SYNC seconds.
+"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+import jellyfish
+from django.conf import settings
+from django.db.models import F
+
+from .catalog import FOOD_CATEGORIES, food_catalog
+
+# Relative weight of each kind of match; popularity only breaks ties.
+EXACT_SCORE = 1.0
+NAME_PREFIX_SCORE = 0.9
+TOKEN_PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.6
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase ``text`` and strip accents."""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower().strip()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def max_typos(token):
+    """Number of edits tolerated for a query token of this length."""
+    return 0 if len(token) < 4 else 1 if len(token) < 8 else 2
+
+
+class FoodSearchIndex:
+    """Prefix and typo-tolerant search over every food catalog category."""
+
+    def __init__(self, categories=None, popularity_sync=None):
+        self.categories = categories or FOOD_CATEGORIES
+        self.popularity_sync = popularity_sync if popularity_sync is not None else getattr(settings, 'FOOD_POPULARITY_SYNC', 300)
+        self._lock = threading.Lock()
+        self._versions = {}  # category -> catalog version the entries were built from
+        self._popularity_synced = None  # time.monotonic() of the last popularity sync
+        self._entries = {}  # (category, pk) -> [name, normalised name, popularity]
+        self._tokens = []  # sorted token list for bisect
+        self._postings = defaultdict(set)  # token -> entry keys
+        self._phonetic = defaultdict(set)  # metaphone key -> tokens
+        self._initials = defaultdict(set)  # first character -> tokens
+
+    def refresh(self):
+        """
+        Apply the rows that changed in each catalog table whose version moved
+        since the last refresh, and re-read popularity once it is due.
+        """
+        versions = {category: food_catalog.version(model) for category, model in self.categories.items()}
+        if versions != self._versions:
+            with self._lock:
+                for category, version in versions.items():
+                    if self._versions.get(category) != version:
+                        self._sync(category, food_catalog.foods(self.categories[category]))
+                self._versions = versions
+        synced = self._popularity_synced
+        if synced is None or time.monotonic() - synced >= self.popularity_sync:
+            self.sync_popularity()
+
+    def sync_popularity(self):
+        """Replace the in-memory popularity of every indexed food with the database counts."""
+        counts = {
+            category: dict(model.objects.values_list('pk', 'popularity'))
+            for category, model in self.categories.items()
+        }
+        with self._lock:
+            for (category, pk), entry in self._entries.items():
+                entry[2] = counts[category].get(pk, entry[2])
+            self._popularity_synced = time.monotonic()
+
+    def _sync(self, category, foods):
+        """Reconcile one category's entries with its catalog rows, reindexing only renamed, new and removed foods."""
+        for key in [key for key in self._entries if key[0] == category and key[1] not in foods]:
+            self._unindex(key, self._entries.pop(key)[0])
+        for pk, food in foods.items():
+            key = (category, pk)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [food.name, normalize(food.name), food.popularity]
+                self._index(key, food.name)
+                continue
+            if entry[0] != food.name:
+                self._unindex(key, entry[0])
+                entry[0], entry[1] = food.name, normalize(food.name)
+                self._index(key, food.name)
+            # Catalog rows can be older than this worker's own logged uses
+            entry[2] = max(entry[2], food.popularity)
+
+    def _index(self, key, name):
+        for token in set(tokenize(name)):
+            if token not in self._postings:
+                bisect.insort(self._tokens, token)
+                self._phonetic[jellyfish.metaphone(token)].add(token)
+                self._initials[token[0]].add(token)
+            self._postings[token].add(key)
+
+    def _unindex(self, key, name):
+        for token in set(tokenize(name)):
+            keys = self._postings.get(token)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+                self._phonetic[jellyfish.metaphone(token)].discard(token)
+                self._initials[token[0]].discard(token)
+
+    def _prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self._tokens, prefix)
+        end = bisect.bisect_left(self._tokens, prefix + '\uffff')
+        return self._tokens[start:end]
+
+    def _fuzzy_tokens(self, token):
+        limit = max_typos(token)
+        if not limit:
+            return {}
+        candidates = self._phonetic.get(jellyfish.metaphone(token), set()) | self._initials.get(token[0], set())
+        matches = {}
+        for candidate in candidates:
+            if abs(len(candidate) - len(token)) > limit:
+                continue
+            # Compare against the candidate's leading part too, so a typo in a
+            # partially typed word still matches
+            distance = min(
+                jellyfish.damerau_levenshtein_distance(token, candidate),
+                jellyfish.damerau_levenshtein_distance(token, candidate[:len(token)]),
+            )
+            if distance <= limit:
+                matches[candidate] = FUZZY_SCORE * (1 - distance / (len(token) + 1))
+        return matches
+
+    def _token_scores(self, token):
+        """Return the best score per entry for a single query token."""
+        scores = {}
+        for candidate, score in self._fuzzy_tokens(token).items():
+            for key in self._postings[candidate]:
+                scores[key] = max(scores.get(key, 0), score)
+        for candidate in self._prefix_tokens(token):
+            for key in self._postings[candidate]:
+                scores[key] = max(scores.get(key, 0), TOKEN_PREFIX_SCORE)
+        return scores
+
+    def search(self, query, category=None, limit=10):
+        """
+        Return up to ``limit`` ``(category, pk, name, score)`` matches for
+        ``query``, best match first and most popular first among equals.
+        """
+        self.refresh()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # refresh() updates the index in place, so read it under the same lock
+        with self._lock:
+            return self._search(tokens, normalize(query), category, limit)
+
+    def _search(self, tokens, normalized, category, limit):
+        # Every query token has to match some token of the name
+        scores = None
+        for token in tokens:
+            token_scores = self._token_scores(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {key: scores[key] + score for key, score in token_scores.items() if key in scores}
+            if not scores:
+                return []
+
+        results = []
+        for key, total in scores.items():
+            if category is not None and key[0] != category:
+                continue
+            name, normalized_name, popularity = self._entries[key]
+            if normalized_name == normalized:
+                score = EXACT_SCORE
+            elif normalized_name.startswith(normalized):
+                score = NAME_PREFIX_SCORE
+            else:
+                score = total / len(tokens)
+            results.append((-score, -popularity, name, key))
+        results.sort()
+        return [(key[0], key[1], name, -score) for score, _, name, key in results[:limit]]
+
+    def record_use(self, category, pk):
+        """Bump the in-memory popularity of a food."""
+        entry = self._entries.get((category, pk))
+        if entry is not None:
+            entry[2] += 1
+
+
+food_index = FoodSearchIndex()
+
+
+def record_food_use(ingredients):
+    """Count one more use of every food in a logged meal's ``(food, quantity)`` pairs."""
+    used = defaultdict(set)
+    for food, _ in ingredients:
+        used[type(food)].add(food.pk)
+    for model, pks in used.items():
+        # A queryset update skips post_save, so the catalog version stays put;
+        # other workers' indexes pick the counts up on their next popularity sync
+        model.objects.filter(pk__in=pks).update(popularity=F('popularity') + 1)
+        category = next((key for key, value in FOOD_CATEGORIES.items() if value is model), None)
+        for pk in pks:
+            food_index.record_use(category, pk)
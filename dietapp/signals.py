@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from users.models import Profile
+
+from .models import Food, Carbs, Fats, Proteins, Drinks, Meal, Exercise, Weekly, TDEE, Vitamin, Mineral, Message
+from .catalog import food_catalog
+from . import rollups
+from .dashboard import invalidate_dashboard
+from .micronutrients import refresh_meal_vectors
+from . import messaging
+from .events import hub
+
+# Invalidate the food catalog cache once a catalog write is committed
+@receiver([post_save, post_delete], sender=Food)
+@receiver([post_save, post_delete], sender=Carbs)
+@receiver([post_save, post_delete], sender=Fats)
+@receiver([post_save, post_delete], sender=Proteins)
+@receiver([post_save, post_delete], sender=Drinks)
+def invalidate_food_catalog(sender, **kwargs):
+    # A Food row may have moved between categories, so refresh them all
+    models = food_catalog.models() if sender is Food else [sender]
+
+    def invalidate():
+        for model in models:
+            food_catalog.invalidate(model)
+    transaction.on_commit(invalidate)
+
+# Keep the daily nutrition rollup in step with Meal and Exercise writes
+@receiver(pre_save, sender=Meal)
+@receiver(pre_save, sender=Exercise)
+def capture_rollup_snapshot(sender, instance, **kwargs):
+    instance._rollup_previous = rollups.stored_snapshot(instance)
+
+@receiver(post_save, sender=Meal)
+@receiver(post_save, sender=Exercise)
+def update_daily_summary(sender, instance, **kwargs):
+    rollups.record_save(instance, getattr(instance, '_rollup_previous', None))
+    instance._rollup_previous = None
+
+@receiver(post_delete, sender=Meal)
+@receiver(post_delete, sender=Exercise)
+def remove_from_daily_summary(sender, instance, **kwargs):
+    rollups.record_delete(instance)
+
+# Expire the cached dashboard cards of the user whose data changed
+@receiver([post_save, post_delete], sender=Meal)
+@receiver([post_save, post_delete], sender=Exercise)
+@receiver([post_save, post_delete], sender=Weekly)
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=TDEE)
+def expire_dashboard(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_dashboard(user_id))
+
+# Refold a meal's micronutrient vector when its vitamins or minerals change
+@receiver([post_save, post_delete], sender=Vitamin)
+@receiver([post_save, post_delete], sender=Mineral)
+def update_meal_nutrients(sender, instance, origin=None, **kwargs):
+    # Rows deleted along with their meal (or its user) leave no vector to refold
+    if origin is not None and getattr(origin, 'model', type(origin)) is not sender:
+        return
+    refresh_meal_vectors([instance.meal_id])
+
+# File messages in their conversation and count unread ones, in the write's transaction
+@receiver(pre_save, sender=Message)
+def assign_conversation(sender, instance, **kwargs):
+    if instance.conversation_id is None:
+        instance.conversation = messaging.conversation_between(instance.sender_id, instance.receiver_id)
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, **kwargs):
+    if created:
+        messaging.record_message(instance)
+        if instance.read_at is None:
+            messaging.adjust_unread(instance.receiver_id, 1)
+        event = messaging.message_event(instance)
+        transaction.on_commit(lambda: hub.publish(instance.receiver_id, 'message', event))
+
+@receiver(pre_delete, sender=Message)
+def capture_unread_message(sender, instance, origin=None, **kwargs):
+    # Read the stored state: mark_read updates rows, not loaded instances
+    if origin is None or isinstance(origin, Message):
+        instance._was_unread = Message.objects.filter(pk=instance.pk, read_at__isnull=True).exists()
+
+@receiver(post_delete, sender=Message)
+def uncount_unread_message(sender, instance, origin=None, **kwargs):
+    if origin is not None and not isinstance(origin, Message):
+        # A queryset or cascading delete: settled in bulk once it commits
+        messaging.record_bulk_delete(origin, instance)
+        return
+    if getattr(instance, '_was_unread', instance.read_at is None):
+        messaging.adjust_unread(instance.receiver_id, -1)
+        messaging.adjust_conversation_unread(instance.conversation_id, messaging.receiver_side(instance), -1)
+    messaging.refresh_conversation(instance.conversation_id)
@@ -0,0 +1,101 @@
+from unittest import mock
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from .admin import HighCalorieMealFilter, MealAdmin, MessageAdmin, ProteinRangeFilter
+from .histograms import refresh_histograms
+from .models import ColumnHistogram, Meal, Message
+from .pagination import estimated_row_count, EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class HistogramFilterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='histo', email='histo@example.com', password='12345')
+        Meal.objects.bulk_create([
+            Meal(user=self.user, name=f"Meal {number}", calories=100 + number * 10, protein=number, carbs=2 * number, fat=1)
+            for number in range(60)
+        ])
+
+    def make_filter(self, filter_class, value=None):
+        params = {filter_class.parameter_name: [value]} if value else {}
+        return filter_class(None, params, Meal, MealAdmin(Meal, admin.site))
+
+    def test_refresh_builds_equal_height_boundaries(self):
+        boundaries = refresh_histograms()['dietapp.meal.protein']
+        self.assertEqual(boundaries, [10, 20, 30, 40, 50])
+        self.assertEqual(ColumnHistogram.objects.get(name='dietapp.meal.protein').row_count, 60)
+        self.assertEqual(refresh_histograms()['dietapp.meal.fat'], [1])
+
+    def test_filter_lookups_from_histogram_without_scanning(self):
+        self.assertEqual([value for value, _ in self.make_filter(ProteinRangeFilter).lookup_choices], ['-10', '10-20', '20-40', '40-'])
+        refresh_histograms()
+        with self.assertNumQueries(0):
+            choices = self.make_filter(ProteinRangeFilter).lookup_choices
+        self.assertEqual(choices[0], ('-10', "Below 10 g"))
+        self.assertEqual(choices[-1], ('50-', "50 g and above"))
+
+    def test_filter_queryset_uses_range(self):
+        protein = self.make_filter(ProteinRangeFilter, '10-20')
+        self.assertEqual(protein.queryset(None, Meal.objects.all()).count(), 10)
+        calories = self.make_filter(HighCalorieMealFilter, '500-')
+        self.assertEqual(calories.queryset(None, Meal.objects.all()).count(), 20)
+
+
+class LargeTableAdminTests(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username='staff', email='staff@example.com', password='12345')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='12345')
+        Message.objects.bulk_create([
+            Message(sender=self.staff, receiver=self.member, content=f"Note {number} " + "x" * 200)
+            for number in range(30)
+        ])
+
+    def test_estimate_read_from_table_stats(self):
+        Message.objects.filter(content__startswith="Note 1").delete()
+        # MAX(rowid) without ANALYZE statistics, so deleted rows still count
+        self.assertEqual(estimated_row_count(Message), 30)
+        self.assertEqual(Message.objects.count(), 19)
+
+    def test_paginator_estimates_unfiltered_and_caps_filtered_counts(self):
+        Message.objects.filter(content__startswith="Note 1").delete()
+        paginator = EstimatedCountPaginator(Message.objects.order_by('-pk'), 10)
+        paginator.estimate_threshold = 20
+        self.assertEqual(paginator.count, 30)
+        paginator = EstimatedCountPaginator(Message.objects.filter(sender=self.staff).order_by('-pk'), 10)
+        paginator.count_limit = 15
+        self.assertEqual(paginator.count, 15)
+        self.assertEqual(str(paginator.count), "15+")
+        self.assertEqual(paginator.num_pages, 2)
+        paginator = EstimatedCountPaginator(Message.objects.filter(sender=self.staff).order_by('-pk'), 10)
+        paginator.count_limit = 19
+        self.assertEqual(str(paginator.count), "19")
+
+    def test_pages_past_the_capped_count_stay_reachable(self):
+        model_admin = MessageAdmin(Message, admin.site)
+        model_admin.list_per_page = 5
+        for page, count in ((1, "10+"), (3, "20+"), (5, "30")):
+            request = RequestFactory().get('/admin/dietapp/message/', {'sender__id__exact': self.staff.pk, 'p': page})
+            request.user = self.staff
+            with mock.patch.object(EstimatedCountPaginator, 'count_limit', 10):
+                changelist = model_admin.get_changelist_instance(request)
+            self.assertEqual(str(changelist.result_count), count)
+            self.assertEqual(len(changelist.result_list), 5)
+
+    def test_changelist_defers_content_and_shows_preview(self):
+        request = RequestFactory().get('/admin/dietapp/message/')
+        request.user = self.staff
+        model_admin = MessageAdmin(Message, admin.site)
+        changelist = model_admin.get_changelist_instance(request)
+        self.assertFalse(changelist.show_full_result_count)
+        first, second = list(changelist.result_list)[:2]
+        self.assertIn('content', first.get_deferred_fields())
+        self.assertEqual(first.content, "Note 29 " + "x" * 200)
+        with self.assertNumQueries(0):
+            preview = model_admin.content_preview(second)
+        self.assertEqual(preview, "Note 28 " + "x" * 52 + "…")
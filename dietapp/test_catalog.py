@@ -0,0 +1,123 @@
+from io import StringIO
+from django.test import TestCase
+from .catalog import food_catalog
+from .importers import load_foods
+from .models import Carbs, Drinks, Fats, Food, FoodCategory, Proteins
+from .search import FoodSearchIndex, record_food_use
+
+
+class FoodCatalogTests(TestCase):
+
+    def setUp(self):
+        food_catalog.clear()
+        self.rice = Carbs.objects.create(name="Rice", gcarb=28, gprotein=3)
+
+    def test_catalog_reads_need_no_queries_once_loaded(self):
+        food_catalog.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(food_catalog.get(Carbs, self.rice.id).name, "Rice")
+
+    def test_catalog_get_ignores_malformed_ids(self):
+        for pk in ('abc', '', None, '1.5'):
+            with self.subTest(pk=pk):
+                self.assertIsNone(food_catalog.get(Carbs, pk))
+
+    def test_catalog_write_invalidates_cached_rows(self):
+        food_catalog.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            Carbs.objects.create(name="Oats", gcarb=60)
+        self.assertEqual(
+            sorted(food.name for food in food_catalog.foods(Carbs).values()),
+            ["Oats", "Rice"],
+        )
+
+
+class FoodSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.breast = Proteins.objects.create(name="Chicken or Turkey - Breast", gprotein=31, popularity=5)
+        cls.leg = Proteins.objects.create(name="Chicken - Leg", gprotein=26, popularity=50)
+        cls.chips = Carbs.objects.create(name="Chips", gcarb=53)
+        cls.milk = Drinks.objects.create(name="Milk", gcarb=5)
+
+    def setUp(self):
+        food_catalog.clear()
+        self.index = FoodSearchIndex()
+
+    def test_prefix_matches_rank_by_popularity(self):
+        results = self.index.search("chick")
+        self.assertEqual([pk for _, pk, _, _ in results], [self.leg.pk, self.breast.pk])
+
+    def test_typo_tolerant_match(self):
+        results = self.index.search("chiken leg")
+        self.assertEqual(results[0][1], self.leg.pk)
+
+    def test_category_filter(self):
+        self.assertEqual(self.index.search("chi", category='carb')[0][2], "Chips")
+
+    def test_index_picks_up_catalog_changes(self):
+        self.assertEqual(self.index.search("oat"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Carbs.objects.create(name="Oats", gcarb=60)
+        self.assertEqual(self.index.search("oat")[0][2], "Oats")
+
+    def test_renamed_and_removed_foods_are_reindexed(self):
+        self.assertEqual(len(self.index.search("chicken")), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Proteins.objects.filter(pk=self.leg.pk).update(name="Duck - Leg")
+            food_catalog.invalidate(Proteins)
+            self.breast.delete()
+        self.assertEqual(self.index.search("chicken"), [])
+        self.assertEqual(self.index.search("duck")[0][1], self.leg.pk)
+        self.assertNotIn('chicken', self.index._tokens)
+        self.assertEqual(self.index.search("chips")[0][2], "Chips")
+
+    def test_logged_uses_keep_the_catalog_cached(self):
+        food_catalog.load()
+        version = food_catalog.version(Proteins)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_food_use([(self.breast, 1)])
+        self.assertEqual(food_catalog.version(Proteins), version)
+        with self.assertNumQueries(0):
+            food_catalog.get(Proteins, self.breast.pk)
+
+    def test_logged_uses_reach_other_workers_indexes(self):
+        self.index.popularity_sync = 0
+        elsewhere = FoodSearchIndex(popularity_sync=60)
+        for index in (self.index, elsewhere):
+            index.refresh()
+        record_food_use([(self.breast, 1)])
+        self.index.refresh()
+        self.assertEqual(self.index._entries[FoodCategory.PROTEIN, self.breast.pk][2], 6)
+        # Another worker keeps its counts until its next popularity sync
+        elsewhere.refresh()
+        self.assertEqual(elsewhere._entries[FoodCategory.PROTEIN, self.breast.pk][2], 5)
+        elsewhere.sync_popularity()
+        self.assertEqual(elsewhere._entries[FoodCategory.PROTEIN, self.breast.pk][2], 6)
+
+
+class FoodLoaderTests(TestCase):
+
+    def test_load_foods_upserts_and_classifies(self):
+        load_foods(StringIO(
+            "fdc_id,description,food_category,carbohydrate,fat,protein\n"
+            "1001,Cola,Beverages,10.6,0,0\n"
+            "1002,Almonds,Nut and Seed Products,21.55,49.93,21.15\n"
+            "1003,Lentils,,,,\n"
+        ))
+        result = load_foods(StringIO(
+            "fdc_id,description,food_category,carbohydrate,fat,protein\n"
+            "1003,Lentils boiled,Legumes,20.13,0.38,9.02\n"
+            ",No id,,1,1,1\n"
+        ))
+        self.assertEqual((result.imported, result.failed), (1, 1))
+        self.assertEqual(Food.objects.count(), 3)
+        self.assertEqual(list(Drinks.objects.values_list('name', flat=True)), ["Cola"])
+        self.assertEqual(Fats.objects.get().name, "Almonds")
+        self.assertEqual(Carbs.objects.get(source_id="1003").name, "Lentils boiled")
+
+    def test_proxy_models_keep_their_category(self):
+        oats = Carbs.objects.create(name="Oats", gcarb=60)
+        self.assertEqual(Food.objects.get(pk=oats.pk).category, FoodCategory.CARB)
+        self.assertFalse(Proteins.objects.filter(pk=oats.pk).exists())
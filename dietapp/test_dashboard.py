@@ -0,0 +1,70 @@
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localdate
+from .dashboard import build_dashboard, dashboard_version
+from .models import Exercise, Meal
+
+User = get_user_model()
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dash', email='dash@example.com', password='12345')
+
+    def test_dashboard_query_count_does_not_grow_with_history(self):
+        for number in range(20):
+            Meal.objects.create(user=self.user, name=f"Meal {number}", calories=100)
+            Exercise.objects.create(user=self.user, name="Run", type="cardio", duration=10, calories_burned=50)
+        self.user.profile.height, self.user.profile.weight = 200, 80
+        self.user.profile.save()
+        with self.assertNumQueries(4):
+            context = build_dashboard(self.user)
+        self.assertEqual(context['bmi'], 20)
+        self.assertEqual(context['meal_count'], 20)
+        self.assertEqual(context['calories_consumed'], 2000)
+        self.assertEqual(len(context['meals']), 5)
+
+    def test_writes_expire_cached_cards(self):
+        version = dashboard_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(user=self.user, name="Snack", calories=150)
+        self.assertNotEqual(dashboard_version(self.user.pk), version)
+        version = dashboard_version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.age = 30
+            self.user.profile.save()
+        self.assertNotEqual(dashboard_version(self.user.pk), version)
+
+
+class DashboardApiTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller', email='poller@example.com', password='12345')
+        self.client.force_login(self.user)
+
+    def test_unchanged_dashboard_answers_not_modified(self):
+        response = self.client.get(reverse('dashboard-api'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(2):  # session and user lookups only
+            response = self.client.get(reverse('dashboard-api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(user=self.user, name="Snack", calories=150)
+        response = self.client.get(reverse('dashboard-api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['meal_count'], 1)
+
+    def test_new_week_changes_etag(self):
+        etag = self.client.get(reverse('dashboard-api'))['ETag']
+        next_week = localdate() + timedelta(days=7)
+        with mock.patch('dietapp.dashboard.localdate', return_value=next_week):
+            response = self.client.get(reverse('dashboard-api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
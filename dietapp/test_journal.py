@@ -0,0 +1,93 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from .journal_search import search_journal
+from .models import JournalEntry, Meal
+from .pagination import KeysetPaginator
+
+User = get_user_model()
+
+
+class JournalSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', email='writer@example.com', password='12345')
+        self.other = User.objects.create_user(username='reader', email='reader@example.com', password='12345')
+        JournalEntry.objects.create(author=self.user, title="Long run", content="Ran 20km along the river, felt strong.")
+        JournalEntry.objects.create(author=self.user, title="Rest day", content="Legs sore after running <hard>.")
+        JournalEntry.objects.create(author=self.user, title="Meal prep", content="Cooked rice and chicken for the week.")
+        JournalEntry.objects.create(author=self.other, title="Running", content="My own run.")
+
+    def test_search_ranks_title_matches_and_marks_snippets(self):
+        results = search_journal(self.user, "run")
+        self.assertEqual([entry.title for entry in results], ["Long run", "Rest day"])
+        self.assertIn("<mark>", results[1].snippet)
+        self.assertIn("&lt;hard&gt;", results[1].snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        entry = JournalEntry.objects.get(title="Meal prep")
+        JournalEntry.objects.filter(pk=entry.pk).update(content="Swapped rice for quinoa.")
+        self.assertEqual([e.pk for e in search_journal(self.user, "quinoa")], [entry.pk])
+        self.assertEqual(search_journal(self.user, "chicken"), [])
+        entry.delete()
+        self.assertEqual(search_journal(self.user, "quinoa"), [])
+
+    def test_search_api(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('journal-search'), {'q': 'river "strong'})
+        self.assertEqual([result['title'] for result in response.json()['results']], ["Long run"])
+
+    def test_search_api_clamps_limit(self):
+        self.client.force_login(self.user)
+        # SQLite reads a negative LIMIT as no limit at all
+        response = self.client.get(reverse('journal-search'), {'q': 'run', 'limit': -1})
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', email='pager@example.com', password='12345')
+        start = now()
+        # Pairs of meals share a timestamp, so the id tie-breaker is exercised
+        self.meals = Meal.objects.bulk_create([
+            Meal(user=self.user, name=f"Meal {number}", calories=100, date=start - timedelta(hours=number // 2))
+            for number in range(25)
+        ])
+        self.expected = list(Meal.objects.filter(user=self.user).order_by('-date', '-pk').values_list('pk', flat=True))
+
+    def test_pages_walk_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Meal.objects.filter(user=self.user), 10, ('-date', '-pk'))
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([meal.pk for page in pages for meal in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([meal.pk for meal in back], [meal.pk for meal in pages[1]])
+        self.assertTrue(back.has_next() and back.has_previous())
+
+    def test_deep_pages_cost_one_query(self):
+        paginator = KeysetPaginator(Meal.objects.filter(user=self.user), 5, ('-date', '-pk'))
+        page = paginator.page()
+        for _ in range(3):
+            page = paginator.page(page.next_cursor)
+        with self.assertNumQueries(1):
+            paginator.page(page.next_cursor)
+
+    def test_meals_api_follows_cursors_and_rejects_tampering(self):
+        self.client.force_login(self.user)
+        seen, url, params = [], reverse('meals-api'), {'limit': 20}
+        while True:
+            data = self.client.get(url, params).json()
+            seen += [meal['id'] for meal in data['results']]
+            if not data['next']:
+                break
+            params = {'limit': 20, 'cursor': data['next']}
+        self.assertEqual(seen, self.expected)
+        response = self.client.get(url, {'cursor': data['previous'][:-2] + 'xx'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,237 @@
+import asyncio
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from . import messaging
+from .events import hub, LocalBackend
+from .models import Conversation, Mailbox, Message
+
+User = get_user_model()
+
+
+class MessagingTests(TestCase):
+
+    def setUp(self):
+        self.coach = User.objects.create_user(username='coach', email='coach@example.com', password='12345')
+        self.client_user = User.objects.create_user(username='client', email='client@example.com', password='12345')
+
+    def test_unread_counter_follows_sends_reads_and_deletes(self):
+        sent = [messaging.send_message(self.coach, self.client_user, f"Tip {number}") for number in range(4)]
+        self.assertEqual(messaging.unread_count(self.client_user), 4)
+        self.assertEqual(messaging.mark_read(self.client_user, sent[:2]), 2)
+        self.assertEqual(messaging.mark_read(self.client_user, sent[:2]), 0)
+        sent[3].delete()
+        sent[0].delete()
+        self.assertEqual(messaging.unread_count(self.client_user), 1)
+        with self.assertNumQueries(1):
+            messaging.unread_count(self.client_user)
+
+    def test_recount_repairs_drifted_counters(self):
+        messaging.send_message(self.coach, self.client_user, "Hello")
+        Mailbox.objects.filter(user=self.client_user).update(unread=7)
+        Mailbox.objects.create(user=self.coach, unread=3)
+        messaging.recount_unread()
+        self.assertEqual(messaging.unread_count(self.client_user), 1)
+        self.assertEqual(messaging.unread_count(self.coach), 0)
+
+    def test_bulk_deletes_are_recounted_once_committed(self):
+        for number in range(5):
+            messaging.send_message(self.coach, self.client_user, f"Tip {number}")
+        messaging.send_message(self.client_user, self.coach, "Thanks")
+        with self.captureOnCommitCallbacks() as callbacks:
+            # Loading the rows and deleting them, however many there are
+            with self.assertNumQueries(2):
+                Message.objects.filter(sender=self.coach).delete()
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual((messaging.unread_count(self.client_user), messaging.unread_count(self.coach)), (0, 1))
+        conversation = messaging.conversations_for(self.coach).get()
+        self.assertEqual(conversation.last_message_preview, "Thanks")
+        self.assertEqual((conversation.unread_for(self.client_user), conversation.unread_for(self.coach)), (0, 1))
+
+    def test_deleting_a_user_settles_their_correspondents(self):
+        messaging.send_message(self.coach, self.client_user, "Hello")
+        messaging.send_message(self.client_user, self.coach, "Hi")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.coach.delete()
+        self.assertEqual(messaging.unread_count(self.client_user), 0)
+        self.assertFalse(Message.objects.exists())
+
+    def test_mark_all_read_endpoint(self):
+        for number in range(3):
+            messaging.send_message(self.coach, self.client_user, f"Tip {number}")
+        self.client.force_login(self.client_user)
+        response = self.client.post(reverse('mark-messages-read'))
+        self.assertEqual(response.json(), {'marked': 3, 'unread': 0})
+        self.assertFalse(Message.objects.filter(read_at__isnull=True).exists())
+
+    def test_mark_read_endpoint_rejects_bad_ids(self):
+        message = messaging.send_message(self.coach, self.client_user, "Tip")
+        self.client.force_login(self.client_user)
+        for ids in (['abc'], [str(message.pk), ''], ['1e3'], ['-1'], ['9' * 30], ['1'] * 501):
+            with self.subTest(ids=ids[:2]):
+                response = self.client.post(reverse('mark-messages-read'), {'message': ids})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(messaging.unread_count(self.client_user), 1)
+        response = self.client.post(reverse('mark-messages-read'), {'message': [str(message.pk)]})
+        self.assertEqual(response.json(), {'marked': 1, 'unread': 0})
+
+
+class ConversationTests(TestCase):
+
+    def setUp(self):
+        self.coach = User.objects.create_user(username='coach', email='coach@example.com', password='12345')
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='12345')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='12345')
+
+    def test_messages_update_one_conversation_per_pair(self):
+        messaging.send_message(self.coach, self.alice, "Welcome!")
+        messaging.send_message(self.alice, self.coach, "Thanks")
+        messaging.send_message(self.coach, self.alice, "Log your breakfast " * 20)
+        messaging.send_message(self.coach, self.bob, "Hi Bob")
+        conversations = list(messaging.conversations_for(self.coach))
+        self.assertEqual([c.other(self.coach) for c in conversations], [self.bob, self.alice])
+        with_alice = conversations[1]
+        self.assertEqual((with_alice.unread_for(self.alice), with_alice.unread_for(self.coach)), (2, 1))
+        self.assertTrue(with_alice.last_message_preview.endswith('…'))
+        self.assertEqual(len(with_alice.last_message_preview), messaging.PREVIEW_LENGTH)
+
+        messaging.mark_conversation_read(self.alice, with_alice)
+        with_alice.refresh_from_db()
+        self.assertEqual((with_alice.unread_for(self.alice), with_alice.unread_for(self.coach)), (0, 1))
+        self.assertEqual(messaging.unread_count(self.alice), 0)
+
+    def test_deleting_the_last_message_restores_the_previous_preview(self):
+        messaging.send_message(self.coach, self.alice, "First")
+        last = messaging.send_message(self.coach, self.alice, "Second")
+        last.delete()
+        conversation = messaging.conversations_for(self.alice).get()
+        self.assertEqual((conversation.last_message_preview, conversation.unread_for(self.alice)), ("First", 1))
+
+    def test_notes_to_self_are_counted_once(self):
+        messaging.send_message(self.alice, self.alice, "Buy oats")
+        conversation = messaging.conversations_for(self.alice).get()
+        self.assertEqual((conversation.user_low_unread, conversation.user_high_unread), (1, 0))
+        self.assertEqual(conversation.unread_for(self.alice), 1)
+        messaging.rebuild_conversations()
+        conversation.refresh_from_db()
+        self.assertEqual((conversation.user_low_unread, conversation.user_high_unread), (1, 0))
+        messaging.mark_conversation_read(self.alice, conversation)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_for(self.alice), 0)
+
+    def test_conversation_list_combines_both_sides(self):
+        messaging.send_message(self.alice, self.coach, "Morning")
+        messaging.send_message(self.bob, self.alice, "Lunch?")
+        conversations = messaging.conversations_for(self.alice)
+        self.assertIn('UNION', str(conversations.query))
+        self.assertEqual([c.other(self.alice) for c in conversations], [self.bob, self.coach])
+
+    def test_rebuild_files_messages_and_recounts(self):
+        messaging.send_message(self.coach, self.alice, "Hello")
+        messaging.send_message(self.alice, self.coach, "Hi")
+        Message.objects.update(conversation=None)
+        Conversation.objects.all().delete()
+        self.assertEqual(messaging.rebuild_conversations(), 1)
+        conversation = Conversation.objects.get()
+        self.assertEqual(Message.objects.filter(conversation=conversation).count(), 2)
+        self.assertEqual((conversation.unread_for(self.alice), conversation.unread_for(self.coach)), (1, 1))
+        self.assertEqual(conversation.last_message_preview, "Hi")
+
+
+class RecordingBackend:
+    """Stand-in event backend that keeps what was published."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+
+
+class LiveEventTests(TestCase):
+
+    def setUp(self):
+        self.coach = User.objects.create_user(username='coach', email='coach@example.com', password='12345')
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='12345')
+        self.backend = LocalBackend()
+        hub.backend = self.backend
+        self.addCleanup(setattr, hub, 'backend', None)
+
+    async def test_local_backend_delivers_events_published_from_other_threads(self):
+        subscription = self.backend.subscribe('user:1')
+        await asyncio.to_thread(self.backend.publish, 'user:1', {'id': 1, 'type': 'ping', 'data': {}})
+        self.assertEqual((await subscription.get(timeout=1))['type'], 'ping')
+        self.assertIsNone(await subscription.get(timeout=0.01))
+        subscription.close()
+        self.assertEqual(self.backend.subscriber_count(), 0)
+
+    def test_messages_are_published_once_committed(self):
+        recorder = RecordingBackend()
+        hub.backend = recorder
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            messaging.send_message(self.coach, self.member, "Great week!")
+        self.assertEqual(recorder.published, [])
+        for callback in callbacks:
+            callback()
+        channel, event = recorder.published[0]
+        self.assertEqual((channel, event['type'], event['data']['preview']), (f'user:{self.member.pk}', 'message', "Great week!"))
+
+    async def test_event_stream_relays_the_users_events(self):
+        await self.async_client.aforce_login(self.member)
+        response = await self.async_client.get(reverse('event-stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        hub.publish(self.member.pk, 'dashboard', {'version': 2})
+        frame = (await asyncio.wait_for(pending, 1)).decode()
+        self.assertIn("event: dashboard\n", frame)
+        self.assertIn('data: {"version": 2}', frame)
+        # A client disconnect cancels the pending read, which closes the subscription
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(self.backend.subscriber_count(), 0)
+
+
+class BroadcastTests(TestCase):
+
+    def setUp(self):
+        self.coach = User.objects.create_user(username='coach', email='coach@example.com', password='12345')
+        self.members = [
+            User.objects.create_user(username=f'member{number}', email=f'member{number}@example.com', password='12345')
+            for number in range(5)
+        ]
+
+    def test_broadcast_matches_what_individual_sends_would_store(self):
+        messaging.send_message(self.members[0], self.coach, "Question about macros")
+        result = messaging.broadcast(self.coach, User.objects.all(), "Challenge starts Monday!", batch_size=2)
+        self.assertEqual(result.sent, 5)
+        self.assertEqual(Message.objects.filter(sender=self.coach).count(), 5)
+        for member in self.members:
+            self.assertEqual(messaging.unread_count(member), 1)
+            conversation = messaging.conversations_for(member).get()
+            self.assertEqual(conversation.last_message_preview, "Challenge starts Monday!")
+            self.assertEqual((conversation.unread_for(member), conversation.unread_for(self.coach)), (1, 1 if member == self.members[0] else 0))
+        self.assertFalse(Message.objects.filter(conversation__isnull=True).exists())
+
+    def test_batch_query_count_does_not_depend_on_receivers(self):
+        messaging.broadcast(self.coach, User.objects.all(), "Hello", batch_size=2)
+        # Reading ids, then a fixed set of statements per batch (in a savepoint here)
+        with self.assertNumQueries(1 + 2 + 6):
+            messaging.broadcast(self.coach, User.objects.all(), "Hello again", batch_size=10)
+
+    def test_message_inserts_stay_within_the_parameter_limit(self):
+        # Six columns per message, so two messages per INSERT
+        with mock.patch.object(connection.features, 'max_query_params', 12), CaptureQueriesContext(connection) as queries:
+            messaging.broadcast(self.coach, User.objects.all(), "Hello", batch_size=10)
+        inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO "{Message._meta.db_table}"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Message.objects.filter(sender=self.coach).count(), 5)
@@ -0,0 +1,116 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+from . import micronutrients
+from .catalog import food_catalog
+from .importers import import_meals
+from .micronutrients import micronutrient_series
+from .models import Carbs, Drinks, Fats, Meal, Mineral, Proteins, Vitamin
+from .nutrition import compose_meal, describe_ingredients, macro_matrix, score_meals
+from .views import meal_ingredients
+
+User = get_user_model()
+
+
+class MealCompositionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rice = Carbs.objects.create(name="Rice", gcarb=28, gfat=0, gprotein=3)
+        cls.oil = Fats.objects.create(name="Oil", gcarb=0, gfat=100, gprotein=0)
+        cls.chicken = Proteins.objects.create(name="Chicken", gcarb=0, gfat=4, gprotein=31)
+        cls.no_drink = Drinks.objects.create(name="No Drink")
+
+    def setUp(self):
+        food_catalog.clear()
+
+    def test_compose_meal_totals(self):
+        totals = compose_meal([(self.rice, 200), (self.oil, 10), (self.chicken, 150)])
+        self.assertEqual(totals, {'carbs': 56.0, 'fat': 16.0, 'protein': 52.0, 'calories': 576.0})
+
+    def test_compose_meal_without_ingredients(self):
+        totals = compose_meal([])
+        self.assertEqual(totals, {'carbs': 0.0, 'fat': 0.0, 'protein': 0.0, 'calories': 0.0})
+
+    def test_score_meals_batch(self):
+        matrix = macro_matrix([self.rice, self.chicken])
+        scores = score_meals(matrix, [[100, 100], [200, 0]])
+        self.assertEqual(scores.shape, (2, 4))
+        self.assertEqual(scores[1].tolist(), [56.0, 0.0, 6.0, 248.0])
+
+    def test_describe_ingredients_skips_placeholders(self):
+        description = describe_ingredients([(self.rice, 200), (self.no_drink, 0)])
+        self.assertEqual(description, "200g of Rice")
+
+    def test_meal_ingredients_accepts_decimal_quantities(self):
+        data = QueryDict(mutable=True)
+        data.update({'carbsource': str(self.rice.pk), 'carbgrams': '12.5'})
+        data.update({'ingredient': f'protein:{self.chicken.pk}', 'quantity': ''})
+        self.assertEqual(meal_ingredients(data), [(self.rice, Decimal('12.5')), (self.chicken, 0)])
+
+    def test_meal_ingredients_rejects_bad_quantities(self):
+        for quantity in ('ten', '-5', 'NaN', 'Infinity'):
+            with self.subTest(quantity=quantity), self.assertRaises(ValidationError):
+                meal_ingredients(QueryDict(f'carbsource={self.rice.pk}&carbgrams={quantity}'))
+
+    def test_meal_ingredients_skips_malformed_food_ids(self):
+        data = QueryDict(f'carbsource=abc&ingredient=fat:1x&quantity=5&ingredient=fat:{self.oil.pk}&quantity=5')
+        self.assertEqual(meal_ingredients(data), [(self.oil, 5)])
+
+
+class MicronutrientTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='micro', email='micro@example.com', password='12345')
+
+    def test_vitamin_writes_refresh_the_meal_vector(self):
+        meal = Meal.objects.create(user=self.user, name="Orange juice", calories=110)
+        Vitamin.objects.create(meal=meal, name="Vitamin C", percentage=90)
+        iron = Mineral.objects.create(meal=meal, name="iron", percentage=4)
+        meal.refresh_from_db()
+        vector = micronutrients.unpack(meal.nutrients)
+        self.assertEqual(vector[micronutrients.nutrient_slot("Vitamin C")], 90)
+        self.assertEqual(vector[micronutrients.nutrient_slot("Iron")], 4)
+        iron.delete()
+        meal.refresh_from_db()
+        self.assertEqual(micronutrients.unpack(meal.nutrients)[micronutrients.nutrient_slot("Iron")], 0)
+
+    def test_meal_delete_skips_refolding_its_rows(self):
+        meals = Meal.objects.bulk_create([Meal(user=self.user, name=f"Trail mix {number}", calories=400) for number in range(2)])
+        for meal in meals:
+            Vitamin.objects.bulk_create([Vitamin(meal=meal, name=f"Vitamin B{number}", percentage=5) for number in range(1, 7)])
+            Mineral.objects.create(meal=meal, name="Zinc", percentage=10)
+        with mock.patch('dietapp.signals.refresh_meal_vectors') as refresh:
+            meals[0].delete()
+            self.user.delete()
+        refresh.assert_not_called()
+
+    def test_series_sums_meals_per_day_and_backfills_missing_vectors(self):
+        import_meals(self.user, StringIO(
+            "name,calories,date,vitamins,minerals\n"
+            "Oatmeal,350,2024-03-01T08:00:00,Thiamin:20,Iron:15\n"
+            "Salad,200,2024-03-01T12:00:00,C:40,Iron:10\n"
+            "Soup,300,2024-03-03T19:00:00,Vitamin A:30,\n"
+        ))
+        Meal.objects.filter(name="Soup").update(nutrients=None)
+        series = micronutrient_series(self.user, datetime.date(2024, 3, 1), datetime.date(2024, 3, 3))
+        self.assertEqual(len(series), 3)
+        first, empty, last = (point['nutrients'] for point in series)
+        self.assertEqual((first['Iron'], first['Vitamin B1'], first['Vitamin C']), (25, 20, 40))
+        self.assertFalse(any(empty.values()))
+        self.assertEqual(last['Vitamin A'], 30)
+        self.assertIsNotNone(Meal.objects.get(name="Soup").nutrients)
+
+    def test_series_api_rejects_oversized_spans(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('micronutrient-series'), {'start': '0001-01-01', 'end': '9999-12-31'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('micronutrient-series'), {'end': '0001-01-01'}).status_code, 400)
+        response = self.client.get(reverse('micronutrient-series'), {'end': '9999-12-31'})
+        self.assertEqual(len(response.json()['series']), 29)
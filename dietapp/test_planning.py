@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.urls import reverse
+from .models import DailyNutritionSummary, DaysOfWeek, Meal, Vitamin, Weekly
+from .dashboard import build_dashboard
+from .planning import clone_weekly_plan, save_weekly_plan
+
+User = get_user_model()
+
+
+class WeeklyPlanTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', email='planner@example.com', password='12345')
+        self.breakfast = Meal.objects.create(user=self.user, name="Breakfast", calories=400)
+        self.dinner = Meal.objects.create(user=self.user, name="Dinner", calories=700)
+
+    def plan(self, user):
+        return dict(Weekly.objects.filter(user=user).values_list('day', 'meal_id'))
+
+    def test_save_weekly_plan_upserts_and_clears(self):
+        save_weekly_plan(self.user, {'Monday': self.breakfast.pk, 'Tuesday': self.breakfast.pk})
+        save_weekly_plan(self.user, {'Monday': self.dinner.pk, 'Tuesday': None})
+        self.assertEqual(self.plan(self.user), {'Monday': self.dinner.pk})
+
+    def test_save_weekly_plan_rejects_foreign_meals(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='12345')
+        with self.assertRaises(ValidationError):
+            save_weekly_plan(other, {'Monday': self.breakfast.pk})
+
+    def test_bulk_endpoint_applies_whole_week(self):
+        self.client.force_login(self.user)
+        plan = {day: self.breakfast.pk for day in DaysOfWeek.values}
+        response = self.client.post(reverse('weekly-plan-bulk'), {'plan': plan}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.plan(self.user)), 7)
+
+    def test_clone_weekly_plan(self):
+        save_weekly_plan(self.user, {'Monday': self.breakfast.pk, 'Friday': self.dinner.pk})
+        clients = [
+            User.objects.create_user(username=f'client{number}', email=f'client{number}@example.com', password='12345')
+            for number in range(3)
+        ]
+        Vitamin.objects.create(meal=self.dinner, name="Vitamin C", percentage=30)
+        own = Meal.objects.create(user=clients[0], name="Own dinner", calories=500)
+        Weekly.objects.create(user=clients[0], day='Sunday', meal=own)
+        updated = clone_weekly_plan(self.user, User.objects.filter(username__startswith='client'), batch_size=2)
+        self.assertEqual(updated, 3)
+        for client in clients:
+            entries = Weekly.objects.filter(user=client).select_related('meal')
+            self.assertEqual({entry.day: entry.meal.name for entry in entries}, {'Monday': "Breakfast", 'Friday': "Dinner"})
+            # Every member owns the meals of their plan
+            self.assertEqual({entry.meal.user_id for entry in entries}, {client.pk})
+            self.assertEqual(Vitamin.objects.get(meal__user=client).name, "Vitamin C")
+        # The copies are plans, not meals the members logged
+        self.assertTrue(all(meal.planned for meal in Meal.objects.filter(user=clients[1])))
+        self.assertFalse(DailyNutritionSummary.objects.filter(user=clients[1]).exists())
+        dashboard = build_dashboard(clients[1])
+        self.assertEqual((dashboard['meal_count'], dashboard['calories_consumed'], dashboard['meals']), (0, 0, []))
+        # Cloning again reuses the copies, and the template meal can go
+        clone_weekly_plan(self.user, User.objects.filter(username__startswith='client'))
+        self.assertEqual(Meal.objects.filter(user=clients[1]).count(), 2)
+        self.dinner.delete()
+        self.assertEqual(Weekly.objects.filter(user=clients[1]).count(), 2)
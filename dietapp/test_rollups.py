@@ -0,0 +1,154 @@
+import io
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import localdate
+from .importers import import_meals
+from .models import DailyNutritionSummary, Exercise, Meal, Vitamin
+from .rollups import calorie_series, rebuild_summaries
+from .utils import calculate_weekly_totals
+
+User = get_user_model()
+
+
+class DailyNutritionSummaryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='roller', email='roller@example.com', password='12345')
+
+    def summary(self):
+        return DailyNutritionSummary.objects.get(user=self.user, day=localdate())
+
+    def test_meal_and_exercise_writes_update_rollup(self):
+        meal = Meal.objects.create(user=self.user, name="Lunch", calories=600, protein=30, carbs=70, fat=20)
+        Meal.objects.create(user=self.user, name="Dinner", calories=400, protein=20, carbs=40, fat=15)
+        Exercise.objects.create(user=self.user, name="Run", type="cardio", duration=30, calories_burned=300)
+        summary = self.summary()
+        self.assertEqual((summary.calories_intake, summary.calories_burned, summary.protein), (1000, 300, 50))
+
+        meal.calories = 500
+        meal.save()
+        self.assertEqual(self.summary().calories_intake, 900)
+
+        meal.delete()
+        self.assertEqual(self.summary().calories_intake, 400)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        Meal.objects.create(user=self.user, name="Lunch", calories=600, protein=30, carbs=70, fat=20)
+        Exercise.objects.create(user=self.user, name="Run", type="cardio", duration=30, calories_burned=300)
+        expected = DailyNutritionSummary.objects.values().get(user=self.user)
+        DailyNutritionSummary.objects.all().delete()
+        call_command('rebuild_daily_summaries', stdout=StringIO())
+        rebuilt = DailyNutritionSummary.objects.values().get(user=self.user)
+        expected.pop('id'), rebuilt.pop('id')
+        self.assertEqual(rebuilt, expected)
+
+    def test_planned_meals_stay_out_of_rollup(self):
+        Meal.objects.create(user=self.user, name="Lunch", calories=600)
+        planned = Meal.objects.create(user=self.user, name="Plan dinner", calories=700, planned=True)
+        self.assertEqual(self.summary().calories_intake, 600)
+        rebuild_summaries(users=[self.user.pk])
+        self.assertEqual(self.summary().calories_intake, 600)
+        # Logging a planned meal as eaten moves it into the rollup
+        planned.planned = False
+        planned.save()
+        self.assertEqual(self.summary().calories_intake, 1300)
+
+    def test_weekly_totals_read_rollup(self):
+        Meal.objects.create(user=self.user, name="Lunch", calories=600)
+        Exercise.objects.create(user=self.user, name="Run", type="cardio", duration=30, calories_burned=300)
+        year, week, _ = localdate().isocalendar()
+        with self.assertNumQueries(1):
+            self.assertEqual(calculate_weekly_totals(self.user, week, year), (600, 300))
+
+
+class CalorieSeriesTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='charter', email='charter@example.com', password='12345')
+        today = localdate()
+        DailyNutritionSummary.objects.create(user=self.user, day=today, calories_intake=2000, calories_burned=500)
+        DailyNutritionSummary.objects.create(user=self.user, day=today - timedelta(days=7), calories_intake=1800)
+
+    def test_weekly_series_is_one_query_and_continuous(self):
+        today = localdate()
+        with self.assertNumQueries(1):
+            series = calorie_series(self.user, today - timedelta(weeks=3), today, 'week')
+        self.assertEqual(len(series), 4)
+        self.assertEqual(series[-1]['net'], 1500)
+        self.assertEqual(series[-2]['intake'], 1800)
+        self.assertEqual(series[0]['intake'], 0)
+
+    def test_series_api_rejects_unknown_bucket(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('calorie-series'), {'bucket': 'decade'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_series_api_handles_date_limits(self):
+        self.client.force_login(self.user)
+        for bucket in ('day', 'week', 'month'):
+            with self.subTest(bucket=bucket):
+                response = self.client.get(reverse('calorie-series'), {'end': '9999-12-31', 'bucket': bucket})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['series'][-1]['period'], {'day': '9999-12-31', 'week': '9999-12-27', 'month': '9999-12-01'}[bucket])
+        self.assertEqual(self.client.get(reverse('calorie-series'), {'end': '0001-01-01'}).status_code, 400)
+        response = self.client.get(reverse('calorie-series'), {'start': '0001-01-01', 'bucket': 'day'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MealImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', email='importer@example.com', password='12345')
+
+    def test_csv_import_writes_meals_children_and_rollup(self):
+        stream = StringIO(
+            "name,calories,protein,carbs,fat,date,vitamins,minerals\n"
+            "Oatmeal,350,12,60,6,2024-03-01T08:00:00,Vitamin B1:20,Iron:15;Zinc:10\n"
+            "Broken,-5,0,0,0,2024-03-01T12:00:00,,\n"
+            "Salad,200,5,10,14,2024-03-02T12:00:00,Vitamin C:40,\n"
+        )
+        result = import_meals(self.user, stream, batch_size=1, chunk_size=2)
+        self.assertEqual((result.imported, result.failed), (2, 1))
+        self.assertEqual(result.errors[0][0], 3)
+        self.assertIn('calories', result.errors[0][1])
+        oatmeal = Meal.objects.get(user=self.user, name="Oatmeal")
+        self.assertEqual(oatmeal.date.date().isoformat(), "2024-03-01")
+        self.assertEqual(sorted(oatmeal.minerals.values_list('name', flat=True)), ["Iron", "Zinc"])
+        self.assertEqual(DailyNutritionSummary.objects.filter(user=self.user).count(), 2)
+
+    def test_jsonl_import_reports_malformed_lines(self):
+        stream = StringIO(
+            '{"name": "Eggs", "calories": 150, "vitamins": {"Vitamin D": 10}}\n'
+            'not json\n'
+        )
+        result = import_meals(self.user, stream, format='jsonl')
+        self.assertEqual((result.imported, result.failed), (1, 1))
+        self.assertEqual(Vitamin.objects.get(meal__user=self.user).name, "Vitamin D")
+
+    def test_nutrient_list_of_non_objects_is_a_row_error(self):
+        result = import_meals(self.user, StringIO('{"name": "Tea", "calories": 2, "minerals": [1, 2]}\n'), format='jsonl')
+        self.assertEqual((result.imported, result.failed), (0, 1))
+        self.assertIn('minerals', result.errors[0][1])
+
+    def test_undecodable_file_keeps_earlier_rows_and_rollup(self):
+        rows = "".join(f"Meal {number},100,2024-03-0{number % 3 + 1}T08:00:00\n" for number in range(600))
+        data = ("name,calories,date\n" + rows).encode() + b"\xff\xfe,1,2024-03-01\n"
+        result = import_meals(self.user, io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline=''), chunk_size=100)
+        self.assertTrue(result.error)
+        self.assertGreater(result.imported, 0)
+        self.assertEqual(Meal.objects.filter(user=self.user).count(), result.imported)
+        total = DailyNutritionSummary.objects.filter(user=self.user).aggregate(total=Sum('calories_intake'))['total']
+        self.assertEqual(total, 100 * result.imported)
+
+    def test_upload_of_unparsable_csv_is_rejected(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('meals.csv', b'name,calories\n"' + b'x' * 200000 + b'",1\n')
+        response = self.client.post(reverse('import-meals'), {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['imported'], 0)
@@ -1,5 +1,4 @@
 from django.urls import path, include
-from django.contrib import admin
 from users import views as user_views
 from . import views
 from .views import JournalListView, JournalDetailView, JournalCreateView, JournalUpdateView, JournalDeleteView, TDEEView
@@ -21,31 +20,41 @@ urlpatterns = [
     path("journal/new/", views.JournalCreateView.as_view(), name="journal-create"),
     path("journal/<int:pk>/update/", views.JournalUpdateView.as_view(), name="journal-update"),
     path("journal/<int:pk>/delete/", views.JournalDeleteView.as_view(), name="journal-delete"),
+    path("api/journal/search/", views.journal_search_api, name="journal-search"),
+    path("api/journal/", views.journal_entries_api, name="journal-api"),
 
     # TDEE and Weekly Calories
     path("tdee/", views.TDEEView.as_view(), name="tdee-calculate"),
+    path("calories/weekly/", views.weekly_calories, name="weekly-calories"),
+    path("api/calories/series/", views.calorie_series_api, name="calorie-series"),
+    path("api/micronutrients/series/", views.micronutrient_series_api, name="micronutrient-series"),
     
     # Messaging
     path("messages/send/", views.send_message, name="send-messages"),
     path("messages/inbox/", views.inbox, name="inbox"),
     path("messages/sent/", views.sent_messages, name="sent-messages"),
+    path("messages/read/", views.mark_messages_read, name="mark-messages-read"),
+    path("messages/conversations/", views.conversations, name="conversations"),
+    path("messages/conversations/<int:conversation_id>/", views.conversation_detail, name="conversation-detail"),
+    path("events/", views.event_stream, name="event-stream"),
 
     # Meal Management
     path("meals/single/", views.singlemeal, name="single-meal"),
     path("meals/delete/<int:meal_id>/", views.deletemeal, name="delete-meal"),
+    path("meals/import/", views.import_meals_upload, name="import-meals"),
+    path("api/meals/", views.meals_api, name="meals-api"),
+    path("api/foods/search/", views.food_autocomplete, name="food-autocomplete"),
+    path("api/dashboard/", views.dashboard_api, name="dashboard-api"),
     path("meals/weekly/", views.weekly_plan, name="weekly-plan"),
+    path("meals/weekly/bulk/", views.weekly_plan_bulk, name="weekly-plan-bulk"),
     path("meals/weekly/delete/<int:plan_id>/", views.deletefromplan, name="delete-weekly-plan"),
 
     # Static Pages
     path("about/", views.about, name="about"),
     path("contact/", views.contact, name="contact"),
 
-    # Admin Panel
-    path("admin/", admin.site.urls),
-
     # Additional Apps
-    path("polls/", include(("polls.urls", "polls"), namespace="polls")),
-    path("dashboard/", include(("dashboard.urls", "dashboard"), namespace="dashboard")),
+    path("polls/", include(("polls.url", "polls"), namespace="polls")),
 
     # Exercise Management
     path("add-exercise/", views.add_exercise, name="add-exercise"),
@@ -1,5 +1,10 @@
 # utils.py
-from django.utils.timezone import now
+import calendar
+import datetime
+
+from django.utils.timezone import now, localdate
+
+from .rollups import period_totals
 
 def calculate_tdee(weight, height, age, gender, activity_level):
     gender_value = 5 if gender == "male" else -161
@@ -8,14 +13,25 @@ def calculate_tdee(weight, height, age, gender, activity_level):
 
 
 
-def calculate_weekly_totals(user, week_number):
-    weekly_meals = Meal.objects.filter(user=user, date__week=week_number)
-    weekly_exercises = Exercise.objects.filter(user=user, date__week=week_number)
-    
-    total_calories_intake = sum(meal.calories for meal in weekly_meals)
-    total_calories_burned = sum(exercise.calories_burned for exercise in weekly_exercises)
+def calculate_weekly_totals(user, week_number, year=None):
+    """Return (calories intake, calories burned) for an ISO week, from the daily rollup."""
+    year = year or localdate().isocalendar()[0]
+    start = datetime.date.fromisocalendar(year, week_number, 1)
+    totals = period_totals(user, start, start + datetime.timedelta(days=6))
+    return totals['calories_intake'], totals['calories_burned']
+
+
+def calculate_monthly_totals(user, year, month):
+    """Return (calories intake, calories burned) for a calendar month, from the daily rollup."""
+    last_day = calendar.monthrange(year, month)[1]
+    totals = period_totals(user, datetime.date(year, month, 1), datetime.date(year, month, last_day))
+    return totals['calories_intake'], totals['calories_burned']
+
 
-    return total_calories_intake, total_calories_burned
+def calculate_yearly_totals(user, year):
+    """Return (calories intake, calories burned) for a calendar year, from the daily rollup."""
+    totals = period_totals(user, datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+    return totals['calories_intake'], totals['calories_burned']
 
 
 
@@ -3,31 +3,90 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
-from django.utils.timezone import now, timedelta
+from django.utils import timezone
+from django.utils.timezone import now, timedelta, localdate
 from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Sum, F
-from .models import Meal, Exercise, Weekly, JournalEntry, Profile
+from .models import Meal, Exercise, Weekly, JournalEntry, Profile, Message
 from .utils import calculate_tdee, calculate_weekly_totals, user_directory_path
 from . models import Meal, Vitamin, Mineral, Exercise, Weekly, JournalEntry, User, Carbs, Drinks, Fats, Meal, Proteins, TDEE, FoodComponent, Profile, DaysOfWeek, Weekly
 from django.contrib.auth import authenticate, login, logout
 from django.db import IntegrityError
+from .nutrition import compose_meal, describe_ingredients
+from .catalog import food_catalog, FOOD_CATEGORIES
+from .rollups import calorie_series, period_totals
+from .importers import import_meals
+from .search import food_index, record_food_use
+from .dashboard import build_dashboard, dashboard_version, dashboard_etag, dashboard_last_modified, serialize_dashboard, week_start, CACHE_TTL as DASHBOARD_CACHE_TTL
+from django.views.decorators.http import condition
+from django.views.decorators.cache import cache_control
+from django.utils.functional import SimpleLazyObject
+from django.core.exceptions import ValidationError
+from .planning import save_weekly_plan
+from .micronutrients import micronutrient_series
+from .journal_search import search_journal
+from .pagination import KeysetPaginationMixin, keyset_page
+from . import messaging
+from .events import format_event, hub
+import json
+import re
+from django.views.decorators.http import require_POST
+import io
+import datetime
+from decimal import Decimal, InvalidOperation
+
+
+# Keyset pagination of the meal lists and JSON APIs
+MEALS_PER_PAGE = 20
+MEAL_ORDERING = ('-date', '-pk')
+MAX_API_PAGE_SIZE = 100
+
+
+def api_page_size(request, default=20):
+    """Read the ``limit`` query parameter, clamped to 1..MAX_API_PAGE_SIZE."""
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), MAX_API_PAGE_SIZE))
+    except ValueError:
+        return default
 
 
 # ========== Journal Views ==========
-class JournalListView(LoginRequiredMixin, ListView):
+class JournalListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View to list all journal entries."""
     model = JournalEntry
     template_name = 'dietapp/journal_list.html'
     context_object_name = 'journals'
     paginate_by = 5
+    keyset_ordering = ('-date_posted', '-pk')
 
     def get_queryset(self):
-        """Return only journal entries created by the logged-in user."""
+        """Return only journal entries created by the logged-in user, or those matching ``q``."""
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            return search_journal(self.request.user, query)
         return JournalEntry.objects.filter(author=self.request.user).order_by('-date_posted')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '').strip()
+        return context
+
+@login_required
+def journal_entries_api(request):
+    """Return the user's journal entries as JSON, newest first, a cursor page at a time."""
+    page = keyset_page(request, JournalEntry.objects.filter(author=request.user), api_page_size(request), ('-date_posted', '-pk'))
+    return JsonResponse({
+        'results': [
+            {'id': entry.pk, 'title': entry.title, 'content': entry.content, 'date_posted': entry.date_posted.isoformat()}
+            for entry in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
 class JournalDetailView(LoginRequiredMixin, DetailView):
     """View to display a single journal entry."""
     model = JournalEntry
@@ -65,6 +124,27 @@ class JournalDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         journal = self.get_object()
         return self.request.user == journal.author
 
+@login_required
+def journal_search_api(request):
+    """Return the user's journal entries matching ``q`` as JSON, best match first."""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), MAX_API_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': "limit must be a number."}, status=400)
+    results = [
+        {
+            'id': entry.pk,
+            'title': entry.title,
+            'date_posted': entry.date_posted.isoformat(),
+            'url': entry.get_absolute_url(),
+            'rank': entry.rank,
+            'snippet': entry.snippet,
+        }
+        for entry in search_journal(request.user, query, limit=limit)
+    ] if query else []
+    return JsonResponse({'query': query, 'results': results})
+
 # ========== TDEE Calculation ==========
 @method_decorator(login_required, name='dispatch')
 class TDEEView(TemplateView):
@@ -130,17 +210,27 @@ def contact(request):
 @login_required
 def dashboard(request):
     """Render the dashboard with user details and health summary."""
-    meals = Meal.objects.filter(mealcreator=request.user).select_related('mealcreator')
-    exercises = Exercise.objects.filter(user=request.user).select_related('user')
-    weekly_plan = Weekly.objects.filter(user=request.user).select_related('meal', 'user')
-
+    # Only built when the cached cards are missing or out of date
     context = {
-        'meals': meals,
-        'exercises': exercises,
-        'weekly_plan': weekly_plan,
+        'dashboard': SimpleLazyObject(lambda: build_dashboard(request.user)),
+        'dashboard_version': dashboard_version(request.user.pk),
+        'dashboard_week': week_start(),
+        'dashboard_cache_ttl': DASHBOARD_CACHE_TTL,
     }
     return render(request, 'dietapp/dashboard.html', context)
 
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+def dashboard_api(request):
+    """
+    Return the dashboard data as JSON.
+
+    Clients revalidate with If-None-Match / If-Modified-Since and get a 304
+    from the version stamp alone while nothing has changed.
+    """
+    return JsonResponse(serialize_dashboard(build_dashboard(request.user)))
+
 # ========== Profile Management ==========
 @login_required
 def profile(request):
@@ -196,6 +286,44 @@ def deletemeal(request, meal_id):
     messages.success(request, "Meal successfully deleted!")
     return redirect('singlemeal')
 
+@login_required
+def food_autocomplete(request):
+    """
+    Return catalog foods matching ``q`` as JSON for the meal form.
+
+    Optional ``category`` (carb, fat, protein, drink) and ``limit`` parameters
+    narrow the results. Each result id can be posted back as "<category>:<id>".
+    """
+    query = request.GET.get('q', '')
+    category = request.GET.get('category') or None
+    if category is not None and category not in FOOD_CATEGORIES:
+        return JsonResponse({'error': f"Unknown category {category!r}."}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        return JsonResponse({'error': "limit must be an integer."}, status=400)
+
+    results = [
+        {'id': f"{category}:{pk}", 'name': name, 'category': category, 'score': round(score, 3)}
+        for category, pk, name, score in food_index.search(query, category=category, limit=limit)
+    ]
+    return JsonResponse({'query': query, 'results': results})
+
+@login_required
+@require_POST
+def import_meals_upload(request):
+    """Import an uploaded CSV or JSON Lines meal history and report the outcome as JSON."""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': "No file uploaded."}, status=400)
+    format = request.POST.get('format') or ('jsonl' if upload.name.endswith(('.jsonl', '.json')) else 'csv')
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        result = import_meals(request.user, stream, format=format)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(result.as_dict(), status=400 if result.error else 200)
+
 # ========== Exercise Management ==========
 @login_required
 def add_exercise(request):
@@ -230,19 +358,109 @@ def weekly_plan(request):
             messages.error(request, "Both day and meal selection are required.")
         else:
             try:
-                meal = Meal.objects.get(id=meal_id, mealcreator=request.user)
-                Weekly.objects.create(user=request.user, meal=meal, day=day)
+                save_weekly_plan(request.user, {day: int(meal_id)})
                 messages.success(request, f"Meal added to {day}'s plan!")
-            except Meal.DoesNotExist:
+            except (ValueError, ValidationError):
                 messages.error(request, "Selected meal does not exist or does not belong to you.")
 
         return redirect('weekly-plan')
 
-    meals = Meal.objects.filter(mealcreator=request.user)
-    weekly_meals = Weekly.objects.filter(user=request.user)
+    meals = Meal.objects.filter(user=request.user)
+    weekly_meals = Weekly.objects.filter(user=request.user).select_related('meal')
     context = {'meals': meals, 'weekly_meals': weekly_meals}
     return render(request, 'dietapp/weekly_plan.html', context)
 
+@login_required
+@require_POST
+def deletefromplan(request, plan_id):
+    """Remove one of the user's weekly plan entries."""
+    Weekly.objects.filter(pk=plan_id, user=request.user).delete()
+    return redirect('weekly-plan')
+
+@login_required
+@require_POST
+def weekly_plan_bulk(request):
+    """
+    Apply a whole week's plan in one request and return the resulting plan.
+
+    Expects a JSON body like ``{"plan": {"Monday": 12, "Tuesday": null}}``;
+    null clears a day and days left out are untouched.
+    """
+    try:
+        plan = json.loads(request.body)['plan']
+        plan = {day: None if meal_id is None else int(meal_id) for day, meal_id in plan.items()}
+        save_weekly_plan(request.user, plan)
+    except ValidationError as error:
+        return JsonResponse({'errors': error.message_dict}, status=400)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Expected a JSON body like {"plan": {"Monday": <meal id or null>}}.'}, status=400)
+
+    plan = dict(Weekly.objects.filter(user=request.user).values_list('day', 'meal_id'))
+    return JsonResponse({'plan': plan})
+
+
+# ========== Calorie Tracking ==========
+@login_required
+def weekly_calories(request):
+    """Show this week's intake and burn alongside the last twelve weeks."""
+    today = localdate()
+    week_start = today - datetime.timedelta(days=today.weekday())
+    week_end = week_start + datetime.timedelta(days=6)
+    since = timezone.make_aware(datetime.datetime.combine(week_start, datetime.time.min))
+
+    weekly_meals = Meal.objects.filter(user=request.user, planned=False, date__gte=since).order_by('date')
+    weekly_exercises = Exercise.objects.filter(user=request.user, date__gte=since).order_by('date')
+    totals = period_totals(request.user, week_start, week_end)
+
+    context = {
+        'weekly_meals': weekly_meals,
+        'weekly_exercises': weekly_exercises,
+        'total_calories_intake': totals['calories_intake'],
+        'total_calories_burned': totals['calories_burned'],
+        'weekly_history': calorie_series(request.user, week_start - datetime.timedelta(weeks=11), week_end, 'week'),
+    }
+    return render(request, 'dietapp/weekly_calories.html', context)
+
+@login_required
+def calorie_series_api(request):
+    """
+    Return intake, burn and net calorie series as JSON.
+
+    Accepts ``start`` and ``end`` (YYYY-MM-DD, default: the last twelve weeks)
+    and ``bucket`` (day, week or month; default: week).
+    """
+    try:
+        end = datetime.date.fromisoformat(request.GET['end']) if request.GET.get('end') else localdate()
+        start = datetime.date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - datetime.timedelta(weeks=12)
+        bucket = request.GET.get('bucket', 'week')
+        series = calorie_series(request.user, start, end, bucket)
+    except (ValueError, OverflowError) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    for point in series:
+        point['period'] = point['period'].isoformat()
+    return JsonResponse({'bucket': bucket, 'start': start.isoformat(), 'end': end.isoformat(), 'series': series})
+
+@login_required
+def micronutrient_series_api(request):
+    """
+    Return summed vitamin and mineral percentages as JSON.
+
+    Accepts ``start`` and ``end`` (YYYY-MM-DD, default: the last four weeks)
+    and ``bucket`` (day, week or month; default: day).
+    """
+    try:
+        end = datetime.date.fromisoformat(request.GET['end']) if request.GET.get('end') else localdate()
+        start = datetime.date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - datetime.timedelta(weeks=4)
+        bucket = request.GET.get('bucket', 'day')
+        series = micronutrient_series(request.user, start, end, bucket)
+    except (ValueError, OverflowError) as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    for point in series:
+        point['period'] = point['period'].isoformat()
+    return JsonResponse({'bucket': bucket, 'start': start.isoformat(), 'end': end.isoformat(), 'series': series})
+
 
 # ========== tdee calculator ==========
 def tdee(request):
@@ -251,13 +469,57 @@ def tdee(request):
     }
     return render(request, "dietapp/tdee_calculate.html", context)
 
+# The original fixed form slots: (category, source field, quantity field).
+FIXED_INGREDIENT_FIELDS = (
+    ("carb", "carbsource", "carbgrams"),
+    ("fat", "fatsource", "fatgrams"),
+    ("protein", "proteinsource", "proteingrams"),
+    ("drink", "drinksource", "drinkmililiters"),
+)
+
+def meal_ingredients(data):
+    """
+    Resolve the submitted meal form into a list of ``(food, quantity)`` pairs.
+
+    Besides the four fixed slots, any number of extra ingredients can be sent
+    as repeated ``ingredient`` ("<category>:<id>") and ``quantity`` fields.
+    Raises ValidationError for a quantity that is not a non-negative number.
+    """
+    selected = []
+    for category, source_field, quantity_field in FIXED_INGREDIENT_FIELDS:
+        if data.get(source_field):
+            selected.append((category, data[source_field], data.get(quantity_field)))
+    for ingredient, quantity in zip(data.getlist("ingredient"), data.getlist("quantity")):
+        category, _, food_id = ingredient.partition(":")
+        if category in FOOD_CATEGORIES and food_id:
+            selected.append((category, food_id, quantity))
+
+    # Foods come from the in-memory catalog, so no queries are needed
+    # Default quantities are 0
+    ingredients = []
+    for category, food_id, quantity in selected:
+        food = food_catalog.get(FOOD_CATEGORIES[category], food_id)
+        if food is not None:
+            ingredients.append((food, parse_quantity(quantity)))
+    return ingredients
+
+def parse_quantity(value):
+    """Parse a submitted grams/milliliters field; blank means 0."""
+    try:
+        quantity = Decimal(value or 0)
+    except InvalidOperation:
+        raise ValidationError(f"Quantity must be a number, not {value!r}.")
+    if not quantity.is_finite() or quantity < 0:
+        raise ValidationError(f"Quantity cannot be negative or infinite, got {value!r}.")
+    return quantity
+
 def singlemeal(request):
 
     if request.method == "GET":
 
         # Query that user's meals
         if request.user.is_authenticated:
-            all_meals = Meals.objects.filter(mealcreator = request.user)
+            all_meals = keyset_page(request, Meal.objects.filter(user=request.user, planned=False), MEALS_PER_PAGE, MEAL_ORDERING)
             no_user = False
         else:
             all_meals = None
@@ -274,103 +536,23 @@ def singlemeal(request):
 
         # Get inputs from form
         mealtitle = request.POST["mealtitle"]
-        carb_source = request.POST.get("carbsource")
-        carb_grams = request.POST.get("carbgrams")
-        fat_source = request.POST.get("fatsource")
-        fat_grams = request.POST.get("fatgrams")
-        protein_source = request.POST.get("proteinsource")
-        protein_grams = request.POST.get("proteingrams")
-        drink_source = request.POST.get("drinksource")
-        drinkmililiters = request.POST.get("drinkmililiters")
-        #print(carb_grams)
-
-        # Default quantities are 0
-        if not carb_grams:
-            carb_grams = 0
-        if not fat_grams:
-            fat_grams = 0
-        if not protein_grams:
-            protein_grams = 0
-        if not drinkmililiters:
-            drinkmililiters = 0
-        #print(carb_grams)
-
-        # Prepare variables to save in meal model
-        mealcreator = request.user
-        name = mealtitle
-
-        # Get foods from models
-        mealcarb = Carbs.objects.get(id=carb_source)
-        mealfat = Fats.objects.get(id=fat_source)
-        mealprotein = Proteins.objects.get(id=protein_source)
-        mealdrink = Drinks.objects.get(id=drink_source)
-
-        # Calculate total meal macros
-        totalcarbs = round((int(getattr(mealcarb, "gcarb")) / 100 * int(carb_grams)) + (int(getattr(mealfat, "gcarb")) / 100 * int(fat_grams)) + (int(getattr(mealprotein, "gcarb")) / 100 * int(protein_grams)) + (int(getattr(mealdrink, "gcarb")) / 100 * int(drinkmililiters)))
-        totalfats = round((int(getattr(mealcarb, "gfat")) / 100 * int(carb_grams)) + (int(getattr(mealfat, "gfat")) / 100 * int(fat_grams)) + (int(getattr(mealprotein, "gfat")) / 100 * int(protein_grams)) + (int(getattr(mealdrink, "gfat")) / 100 * int(drinkmililiters)))
-        totalproteins = round((int(getattr(mealcarb, "gprotein")) / 100 * int(carb_grams)) + (int(getattr(mealfat, "gprotein")) / 100 * int(fat_grams)) + (int(getattr(mealprotein, "gprotein")) / 100 * int(protein_grams)) + (int(getattr(mealdrink, "gprotein")) / 100 * int(drinkmililiters)))
-        #print(totalcarbs, totalfats, totalproteins)
-
-        # Calculate total calories
-        calories = (totalcarbs * 4) + (totalfats * 9) + (totalproteins * 4)
-        #print(calories)
-
-        # Make ingredients list
-        carb_name = (getattr(mealcarb, "name"))
-        fat_name = (getattr(mealfat, "name"))
-        protein_name = (getattr(mealprotein, "name"))
-        drink_name = (getattr(mealdrink, "name"))
-
-        # Check for empty inputs
-        if carb_name != "No Carb Source":
-            there_is_carb = True
-        else:
-            there_is_carb = False
-        if fat_name != "No Fat Source":
-            there_is_fat = True
-        else:
-            there_is_fat = False
-        if protein_name != "No Protein Source":
-            there_is_protein = True
-        else:
-            there_is_protein = False
-        if drink_name != "No Drink":
-            there_is_drink = True
-        else:
-            there_is_drink = False
-
-        # Format string quantity and macro name
-        if there_is_carb:
-            carb_ingredient = f'{carb_grams}g of {carb_name} '
-        else:
-            carb_ingredient = ""
-
-        if there_is_fat:
-            fat_ingredient = f'| {fat_grams}g of {fat_name} '
-        else:
-            fat_ingredient = ""
-
-        if there_is_protein:
-            protein_ingredient = f'| {protein_grams}g of {protein_name} '
-        else:
-            protein_ingredient = ""
-
-        if there_is_drink:
-            drink_ingredient = f'| {drinkmililiters}ml of {drink_name}'
-        else:
-            drink_ingredient = ""
+        try:
+            ingredients = meal_ingredients(request.POST)
+        except ValidationError as error:
+            messages.error(request, error.messages[0])
+            all_meals = keyset_page(request, Meal.objects.filter(user=request.user, planned=False), MEALS_PER_PAGE, MEAL_ORDERING)
+            return render(request, "dietapp/single_meal.html", {"all_meals": all_meals}, status=400)
 
-        # Full ingredients list
-        ingredients_list = f"{carb_ingredient}{fat_ingredient}{protein_ingredient}{drink_ingredient}"
-        #print(ingredients_list)
+        # Calculate total meal macros and calories
+        totals = compose_meal(ingredients)
 
         # Save meal
-        meal = Meals(name = name, totalcarb = totalcarbs, totalfat = totalfats, totalprotein = totalproteins, calories = calories, mealcreator = mealcreator, ingredients = ingredients_list)
+        meal = Meal(name=mealtitle, user=request.user, description=describe_ingredients(ingredients), **totals)
         meal.save()
+        record_food_use(ingredients)
 
         # Query that user's meals
-        all_meals = Meals.objects.filter(mealcreator = request.user)
-        #print(all_meals)
+        all_meals = keyset_page(request, Meal.objects.filter(user=request.user, planned=False), MEALS_PER_PAGE, MEAL_ORDERING)
 
         context = {
             "all_meals": all_meals
@@ -378,6 +560,133 @@ def singlemeal(request):
 
         return render(request, "dietapp/single_meal.html", context)
 
+@login_required
+def meals_api(request):
+    """Return the user's meals as JSON, newest first, a cursor page at a time."""
+    page = keyset_page(request, Meal.objects.filter(user=request.user, planned=False), api_page_size(request), MEAL_ORDERING)
+    return JsonResponse({
+        'results': [
+            {
+                'id': meal.pk, 'name': meal.name, 'calories': meal.calories, 'protein': meal.protein,
+                'carbs': meal.carbs, 'fat': meal.fat, 'date': meal.date.isoformat(),
+            }
+            for meal in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+# ========== Messaging ==========
+MESSAGES_PER_PAGE = 20
+MESSAGE_ORDERING = ('-timestamp', '-pk')
+
+@login_required
+def send_message(request):
+    """Send a message to another user by username."""
+    if request.method == "POST":
+        username = request.POST.get('receiver', '').strip()
+        content = request.POST.get('content', '').strip()
+        receiver = User.objects.filter(username=username).first()
+        if receiver is None:
+            messages.error(request, f"No user named {username}.")
+        elif not content:
+            messages.error(request, "Message content cannot be empty.")
+        else:
+            messaging.send_message(request.user, receiver, content)
+            messages.success(request, f"Message sent to {receiver.username}!")
+            return redirect('sent-messages')
+    return render(request, 'dietapp/send_message.html')
+
+@login_required
+def inbox(request):
+    """Show received messages a page at a time and mark the shown ones as read."""
+    received = Message.objects.filter(receiver=request.user).select_related('sender')
+    page = keyset_page(request, received, MESSAGES_PER_PAGE, MESSAGE_ORDERING)
+    messaging.mark_read(request.user, [message for message in page if not message.is_read])
+    return render(request, 'dietapp/send_message.html', {'inbox_messages': page})
+
+@login_required
+def sent_messages(request):
+    """Show sent messages a page at a time."""
+    sent = Message.objects.filter(sender=request.user).select_related('receiver')
+    page = keyset_page(request, sent, MESSAGES_PER_PAGE, MESSAGE_ORDERING)
+    return render(request, 'dietapp/send_message.html', {'sent_messages': page})
+
+@login_required
+def conversations(request):
+    """List the user's conversations, most recent first."""
+    page = keyset_page(request, messaging.conversations_for(request.user), MESSAGES_PER_PAGE, ('-last_timestamp', '-pk'))
+    for conversation in page:
+        conversation.other_user = conversation.other(request.user)
+        conversation.unread = conversation.unread_for(request.user)
+    return render(request, 'dietapp/conversations.html', {'conversations': page})
+
+@login_required
+def conversation_detail(request, conversation_id):
+    """Show a conversation a page of messages at a time and reply to it."""
+    conversation = get_object_or_404(messaging.conversations_for(request.user), pk=conversation_id)
+    other_user = conversation.other(request.user)
+    if request.method == "POST":
+        content = request.POST.get('content', '').strip()
+        if content:
+            messaging.send_message(request.user, other_user, content)
+        else:
+            messages.error(request, "Message content cannot be empty.")
+        return redirect('conversation-detail', conversation_id=conversation.pk)
+
+    page = keyset_page(request, conversation.messages.select_related('sender'), MESSAGES_PER_PAGE, MESSAGE_ORDERING)
+    if conversation.unread_for(request.user):
+        messaging.mark_conversation_read(request.user, conversation)
+    context = {'conversation': conversation, 'other_user': other_user, 'conversation_messages': page}
+    return render(request, 'dietapp/conversation_detail.html', context)
+
+# Most message ids one mark-read request may name
+MAX_MARK_READ = 500
+MESSAGE_ID_RE = re.compile(r'[0-9]{1,18}')
+
+@login_required
+@require_POST
+def mark_messages_read(request):
+    """Mark every unread received message (or the posted ``message`` ids) as read."""
+    ids = request.POST.getlist('message')
+    if not all(MESSAGE_ID_RE.fullmatch(pk) for pk in ids):
+        return JsonResponse({'error': "message ids must be numbers."}, status=400)
+    if len(ids) > MAX_MARK_READ:
+        return JsonResponse({'error': f"At most {MAX_MARK_READ} message ids can be marked at once."}, status=400)
+    marked = messaging.mark_read(request.user, [int(pk) for pk in ids] if ids else None)
+    return JsonResponse({'marked': marked, 'unread': messaging.unread_count(request.user)})
+
+
+# ========== Live Events ==========
+# Seconds between keep-alive comments on an idle event stream
+EVENT_HEARTBEAT = 15
+
+async def event_stream(request):
+    """
+    Stream the user's live events (new messages, dashboard updates) as
+    Server-Sent Events. Needs the ASGI server: each open stream is an idle
+    coroutine, not a worker thread.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': "Authentication required."}, status=401)
+    subscription = hub.subscribe(user.pk)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(timeout=EVENT_HEARTBEAT)
+                yield format_event(event) if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ========== Register ==========
 def register(request):
     if request.method == "POST":
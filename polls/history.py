@@ -0,0 +1,149 @@
+# history.py
+"""
+Vote history.
+
+Every Vote row already records its question, choice and time, so the vote
+table is the append-only event log. roll_up_votes folds the rows added since
+its last run into per-minute and per-hour VoteCount rows, one GROUP BY per
+period plus an increment per touched bucket, and moves a high-water mark
+forward in the same transaction. Charts and the trending query read those
+rollups, never the raw votes, so their cost does not grow with the number
+of votes. They are as fresh as the last ``roll_up_poll_votes`` run, which
+the procfile's clock process repeats every minute; requests only read.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import Question, Vote, VoteCount, VoteRollupState
+
+PERIODS = {
+    VoteCount.Period.MINUTE: (TruncMinute, datetime.timedelta(minutes=1)),
+    VoteCount.Period.HOUR: (TruncHour, datetime.timedelta(hours=1)),
+}
+
+# Votes newer than this many seconds are left for the next run, so a vote
+# whose transaction has not committed yet is not skipped past.
+ROLLUP_LAG = 5
+
+# Most buckets a series may span.
+MAX_BUCKETS = 1500
+
+# Default span of a series, per period.
+DEFAULT_SPANS = {
+    VoteCount.Period.MINUTE: datetime.timedelta(hours=2),
+    VoteCount.Period.HOUR: datetime.timedelta(days=7),
+}
+
+TRENDING_HOURS = 6
+
+
+def add_counts(period, rows):
+    """Add grouped ``{'question', 'choice', 'bucket', 'count'}`` rows to the VoteCount buckets of ``period``."""
+    rows = list(rows)
+    if not rows:
+        return
+    existing = set(
+        VoteCount.objects.filter(
+            period=period,
+            choice__in={row['choice'] for row in rows},
+            bucket__in={row['bucket'] for row in rows},
+        ).values_list('choice', 'bucket')
+    )
+    for row in rows:
+        if (row['choice'], row['bucket']) in existing:
+            VoteCount.objects.filter(period=period, choice=row['choice'], bucket=row['bucket']).update(count=F('count') + row['count'])
+    VoteCount.objects.bulk_create([
+        VoteCount(question_id=row['question'], choice_id=row['choice'], period=period, bucket=row['bucket'], count=row['count'])
+        for row in rows if (row['choice'], row['bucket']) not in existing
+    ])
+
+
+def roll_up_votes():
+    """
+    Fold the votes cast since the last run into the minute and hour rollups.
+    Returns the number of votes folded.
+    """
+    with transaction.atomic():
+        state, _ = VoteRollupState.objects.select_for_update().get_or_create(pk=1)
+        cutoff = timezone.now() - datetime.timedelta(seconds=ROLLUP_LAG)
+        upper = (
+            Vote.objects.filter(pk__gt=state.last_vote_id, created__lte=cutoff)
+            .order_by('-pk').values_list('pk', flat=True).first()
+        )
+        if upper is None:
+            return 0
+        votes = Vote.objects.filter(pk__gt=state.last_vote_id, pk__lte=upper)
+        folded = votes.count()
+        for period, (trunc, _) in PERIODS.items():
+            add_counts(period, (
+                votes.annotate(bucket=trunc('created', tzinfo=datetime.timezone.utc))
+                .order_by().values('question', 'choice', 'bucket').annotate(count=Count('pk'))
+            ))
+        state.last_vote_id = upper
+        state.save(update_fields=['last_vote_id'])
+    return folded
+
+
+def bucket_start(moment, period):
+    moment = moment.astimezone(datetime.timezone.utc)
+    if period == VoteCount.Period.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def vote_series(question, period=VoteCount.Period.MINUTE, start=None, end=None):
+    """
+    Return the votes on ``question`` per ``period`` bucket between ``start``
+    and ``end`` (default: the DEFAULT_SPANS up to now), as
+    ``[{'bucket', 'total', 'choices': {choice id: votes}}]`` with empty
+    buckets filled in.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(PERIODS)}.")
+    step = PERIODS[period][1]
+    end = bucket_start(end or timezone.now(), period)
+    try:
+        start = bucket_start(start or end - DEFAULT_SPANS[period], period)
+    except OverflowError:
+        raise ValueError("end is too early for the default span; give a start.")
+    if start > end:
+        raise ValueError("start must not be after end.")
+    if (end - start) / step >= MAX_BUCKETS:
+        raise ValueError(f"A series may span at most {MAX_BUCKETS} buckets.")
+
+    counts = VoteCount.objects.filter(question=question, period=period, bucket__range=(start, end)).values_list('bucket', 'choice', 'count')
+    buckets = {}
+    for bucket, choice_id, count in counts:
+        buckets.setdefault(bucket, {})[choice_id] = count
+    series = []
+    moment = start
+    while True:
+        choices = buckets.get(moment, {})
+        series.append({'bucket': moment, 'total': sum(choices.values()), 'choices': choices})
+        # Compared as a difference, as end may be the last representable bucket
+        if end - moment < step:
+            return series
+        moment += step
+
+
+def trending_questions(limit=5, hours=TRENDING_HOURS, now=None):
+    """
+    Return the recently published questions with the most votes in the last
+    ``hours`` hours, read from the hour rollups.
+    """
+    now = now or timezone.now()
+    recent = (
+        VoteCount.objects
+        .filter(question=OuterRef('pk'), period=VoteCount.Period.HOUR, bucket__gte=bucket_start(now - datetime.timedelta(hours=hours), VoteCount.Period.HOUR))
+        .order_by().values('question').annotate(total=Sum('count')).values('total')
+    )
+    return (
+        Question.objects.published_recently(now)
+        .filter(pub_date__lte=now)
+        .annotate(recent_votes=Coalesce(Subquery(recent), 0))
+        .order_by('-recent_votes', '-pub_date')[:limit]
+    )
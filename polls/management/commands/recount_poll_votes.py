@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from django.conf import settings
+
+from polls.voting import recount_votes
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the vote counter shards of every choice (or of some questions) from the Vote rows. "
+        "With POLL_VOTE_BUFFER on, stop the web workers first: votes still buffered in them would be counted twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', type=int, action='append', dest='questions', help="Only recount this question id (repeatable).")
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'POLL_VOTE_BUFFER', False):
+            # Each worker buffers its own votes, out of this process's reach
+            self.stderr.write(self.style.WARNING(
+                "POLL_VOTE_BUFFER is on: votes still buffered in running workers will be counted twice."
+            ))
+        count = recount_votes(options['questions'])
+        self.stdout.write(self.style.SUCCESS(f"Recounted the votes of {count} choices."))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from polls.history import roll_up_votes
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold the poll votes cast since the last run into the per-minute and per-hour vote counts. "
+        "Run it every minute from cron, or keep it running with --every (the procfile's clock process)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, metavar='SECONDS', help="Keep running, rolling up again every SECONDS.")
+
+    def handle(self, *args, **options):
+        every = options['every']
+        while True:
+            count = roll_up_votes()
+            if count or not every:
+                self.stdout.write(self.style.SUCCESS(f"Rolled up {count} votes."))
+            if not every:
+                return
+            time.sleep(every)
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=6)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_vote_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VoteShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date'], name='question_pub_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='choice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cast_votes', to='polls.choice'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cast_votes', to='polls.question'),
+        ),
+        migrations.AddField(
+            model_name='vote',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='poll_votes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='votecount',
+            name='choice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_counts', to='polls.choice'),
+        ),
+        migrations.AddField(
+            model_name='votecount',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_counts', to='polls.question'),
+        ),
+        migrations.AddField(
+            model_name='voteshard',
+            name='choice',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='polls.choice'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['question', 'created'], name='vote_question_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('question', 'user'), name='unique_vote_per_user'),
+        ),
+        migrations.AddIndex(
+            model_name='votecount',
+            index=models.Index(fields=['question', 'period', 'bucket'], name='vote_count_question_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votecount',
+            index=models.Index(fields=['period', 'bucket'], name='vote_count_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='votecount',
+            constraint=models.UniqueConstraint(fields=('choice', 'period', 'bucket'), name='unique_vote_count_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='voteshard',
+            constraint=models.UniqueConstraint(fields=('choice', 'shard'), name='unique_vote_shard'),
+        ),
+    ]
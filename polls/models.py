@@ -1,12 +1,27 @@
 import datetime
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 
+class QuestionQuerySet(models.QuerySet):
+    def published_recently(self, now=None):
+        """Queryset form of Question.was_published_recently, served by the pub_date index."""
+        now = now or timezone.now()
+        return self.filter(pub_date__gte=now - datetime.timedelta(days=1))
+
+
 class Question(models.Model):
     question_text = models.CharField(max_length=200)
     pub_date = models.DateTimeField("date published")
 
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_date'], name='question_pub_date_idx'),
+        ]
+
     def __str__(self):
        return self.question_text
 
@@ -17,7 +32,81 @@ class Question(models.Model):
 class Choice(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    # Votes counted before sharding; new votes land in the VoteShard rows
     votes = models.IntegerField(default=0)
 
     def __str__(self):
         return self.choice_text
+
+    def total_votes(self):
+        """Base count plus the sum of the counter shards."""
+        return self.votes + (self.shards.aggregate(total=models.Sum('count'))['total'] or 0)
+
+
+class VoteShard(models.Model):
+    """
+    One of the counter rows a choice's votes are spread over, so concurrent
+    votes on a popular choice increment different rows instead of queueing
+    on one.
+    """
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='unique_vote_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.choice} #{self.shard}: {self.count}"
+
+
+class Vote(models.Model):
+    """Who voted on a question; the unique constraint allows one vote per user."""
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='cast_votes')
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='cast_votes')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='poll_votes')
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'user'], name='unique_vote_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'created'], name='vote_question_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} voted {self.choice}"
+
+
+class VoteCount(models.Model):
+    """Votes a choice received in one UTC minute or hour, rolled up from the Vote rows."""
+
+    class Period(models.TextChoices):
+        MINUTE = 'minute'
+        HOUR = 'hour'
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='vote_counts')
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='vote_counts')
+    period = models.CharField(max_length=6, choices=Period.choices)
+    bucket = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'period', 'bucket'], name='unique_vote_count_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'period', 'bucket'], name='vote_count_question_idx'),
+            models.Index(fields=['period', 'bucket'], name='vote_count_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.choice} {self.period} {self.bucket:%Y-%m-%d %H:%M}: {self.count}"
+
+
+class VoteRollupState(models.Model):
+    """Single row holding the id of the last Vote folded into VoteCount."""
+    last_vote_id = models.BigIntegerField(default=0)
@@ -0,0 +1,150 @@
+# results.py
+"""
+Poll results.
+
+A question's results (every choice with its vote total, share and rank) come
+from one query: each choice's total is its base votes plus a subquery over
+its VoteShard rows, and window functions add the question total and the
+rank. Results are cached per question under a version stamp that the vote
+path bumps; while one request recomputes a new version, concurrent requests
+are served the previous one instead of all recomputing it. The latest
+questions shown by the index are cached the same way.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery, Sum, Window
+from django.db.models.functions import Coalesce, Rank
+
+from .models import Choice, Question, VoteShard
+
+VERSION_KEY = 'polls:results-version:{}'
+RESULTS_KEY = 'polls:results:{}'
+LOCK_KEY = 'polls:results-lock:{}'
+INDEX_VERSION = 'index'
+
+# Number of questions on the index page.
+LATEST_QUESTIONS = 5
+
+# Seconds the process computing a version may hold its lock, and the longest
+# a request with nothing cached waits for that process before computing itself.
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+
+
+def cache_ttl():
+    """Seconds cached results live (the POLL_RESULTS_CACHE_TTL setting)."""
+    return getattr(settings, 'POLL_RESULTS_CACHE_TTL', 30)
+
+
+def results_version(name):
+    """
+    Return the version stamp of a question's results (or of the index).
+
+    A missing stamp restarts from the current time in milliseconds, so a
+    stamp lost to cache eviction never repeats a value handed out before.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_results(name):
+    """Bump the version stamp of a question's results (or of the index)."""
+    results_version(name)
+    try:
+        cache.incr(VERSION_KEY.format(name))
+    except ValueError:
+        # Evicted between the two calls; a fresh stamp is newer anyway
+        results_version(name)
+
+
+def cached(name, compute):
+    """
+    Return ``compute()`` for the current version of ``name``, computing each
+    version at most once at a time.
+
+    The cache holds a ``(version, value)`` pair. When it is out of date, the
+    request that wins the lock recomputes it and the others get the previous
+    value; only when there is none do they wait for the winner.
+    """
+    version = results_version(name)
+    key = RESULTS_KEY.format(name)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock = f'{LOCK_KEY.format(name)}:{version}'
+    if cache.add(lock, True, timeout=LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, (version, value), timeout=cache_ttl())
+        finally:
+            cache.delete(lock)
+        return value
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry[0] >= version:
+            return entry[1]
+    return compute()
+
+
+def vote_total():
+    """
+    Expression for a choice's vote count: its base votes plus its shards,
+    summed in a subquery so the result can feed window functions.
+    """
+    shards = VoteShard.objects.filter(choice=OuterRef('pk')).order_by().values('choice').annotate(total=Sum('count')).values('total')
+    return F('votes') + Coalesce(Subquery(shards), 0)
+
+
+def choice_totals(question):
+    """Return the question's choices annotated with ``total``, their vote count summed over the shards."""
+    return Choice.objects.filter(question=question).annotate(total=vote_total())
+
+
+def compute_results(question):
+    """Return the results of ``question`` as plain data, from one query."""
+    choices = (
+        choice_totals(question)
+        .annotate(
+            question_total=Window(Sum('total')),
+            rank=Window(Rank(), order_by=F('total').desc()),
+        )
+        .order_by('rank', 'pk')
+        .values('pk', 'choice_text', 'total', 'question_total', 'rank')
+    )
+    choices = list(choices)
+    total = choices[0]['question_total'] if choices else 0
+    return {
+        'question': {'id': question.pk, 'text': question.question_text},
+        'total': total,
+        'choices': [
+            {
+                'id': choice['pk'],
+                'text': choice['choice_text'],
+                'votes': choice['total'],
+                'share': round(100 * choice['total'] / total, 1) if total else 0.0,
+                'rank': choice['rank'],
+            }
+            for choice in choices
+        ],
+    }
+
+
+def question_results(question):
+    """Return the results of ``question``, cached until its next vote."""
+    return cached(question.pk, lambda: compute_results(question))
+
+
+def latest_questions():
+    """Return the LATEST_QUESTIONS most recently published questions, cached until a question changes."""
+    return cached(INDEX_VERSION, lambda: list(Question.objects.order_by('-pub_date')[:LATEST_QUESTIONS]))
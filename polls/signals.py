@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Choice, Question
+from .results import INDEX_VERSION, invalidate_results
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def expire_question_results(sender, instance, **kwargs):
+    invalidate_results(instance.question_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def expire_question_index(sender, instance, **kwargs):
+    invalidate_results(INDEX_VERSION)
+    invalidate_results(instance.pk)
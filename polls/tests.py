@@ -1,3 +1,193 @@
-from django.test import TestCase
+import datetime
+from io import StringIO
+from unittest import mock
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-# Create your tests here.
+from .models import Choice, Question, Vote, VoteCount, VoteShard
+from .history import roll_up_votes, trending_questions, vote_series
+from .results import LOCK_KEY, choice_totals, compute_results, latest_questions, question_results, results_version
+from .voting import AlreadyVoted, add_votes, cast_vote, recount_votes, vote_buffer
+
+
+class VotingTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(question_text="Favourite breakfast?", pub_date=timezone.now())
+        self.oats = Choice.objects.create(question=self.question, choice_text="Oats", votes=3)
+        self.eggs = Choice.objects.create(question=self.question, choice_text="Eggs")
+        self.users = [
+            get_user_model().objects.create_user(username=f'voter{number}', email=f'voter{number}@example.com', password='12345')
+            for number in range(4)
+        ]
+
+    def test_votes_spread_over_shards_and_sum(self):
+        for user in self.users[:3]:
+            cast_vote(user, self.oats)
+        cast_vote(self.users[3], self.eggs)
+        totals = {choice.choice_text: choice.total for choice in choice_totals(self.question)}
+        self.assertEqual(totals, {"Oats": 6, "Eggs": 1})
+        self.assertEqual(self.oats.total_votes(), 6)
+
+    def test_second_vote_rejected(self):
+        cast_vote(self.users[0], self.oats)
+        with self.assertRaises(AlreadyVoted):
+            cast_vote(self.users[0], self.eggs)
+        self.assertEqual(Vote.objects.filter(user=self.users[0]).count(), 1)
+        self.assertEqual(self.eggs.total_votes(), 0)
+
+    def test_other_integrity_errors_are_not_repeat_votes(self):
+        with mock.patch.object(Vote.objects, 'create', side_effect=IntegrityError("NOT NULL constraint failed")):
+            with self.assertRaises(IntegrityError):
+                cast_vote(self.users[0], self.eggs)
+
+    def test_increments_do_not_overwrite_each_other(self):
+        add_votes(self.eggs.pk, shard=0)
+        add_votes(self.eggs.pk, 5, shard=0)
+        add_votes(self.eggs.pk, shard=1)
+        self.assertEqual(VoteShard.objects.get(choice=self.eggs, shard=0).count, 6)
+        self.assertEqual(self.eggs.total_votes(), 7)
+
+    @override_settings(POLL_VOTE_BUFFER=True, POLL_VOTE_FLUSH_INTERVAL=60, POLL_VOTE_FLUSH_SIZE=100)
+    def test_buffer_coalesces_votes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users:
+                cast_vote(user, self.eggs)
+        buffer = vote_buffer()
+        self.assertEqual(buffer.pending(), 4)
+        self.assertEqual(self.eggs.total_votes(), 0)
+        self.assertEqual(buffer.flush(), 4)
+        # Four votes, one increment
+        self.assertEqual(list(VoteShard.objects.filter(choice=self.eggs).values_list('count', flat=True)), [4])
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_recount_rebuilds_shards_from_votes(self):
+        cast_vote(self.users[0], self.eggs)
+        cast_vote(self.users[1], self.eggs)
+        VoteShard.objects.filter(choice=self.eggs).update(count=100)
+        recount_votes([self.question])
+        self.assertEqual(self.eggs.total_votes(), 2)
+
+
+class ResultsTests(TestCase):
+    def setUp(self):
+        self.question = Question.objects.create(question_text="Best snack?", pub_date=timezone.now())
+        self.fruit = Choice.objects.create(question=self.question, choice_text="Fruit", votes=1)
+        self.nuts = Choice.objects.create(question=self.question, choice_text="Nuts")
+        add_votes(self.nuts.pk, 2, shard=0)
+        add_votes(self.nuts.pk, 1, shard=3)
+
+    def test_results_from_one_query(self):
+        with self.assertNumQueries(1):
+            results = compute_results(self.question)
+        self.assertEqual(results['total'], 4)
+        self.assertEqual(
+            [(choice['text'], choice['votes'], choice['share'], choice['rank']) for choice in results['choices']],
+            [("Nuts", 3, 75.0, 1), ("Fruit", 1, 25.0, 2)],
+        )
+
+    def test_results_cached_until_next_vote(self):
+        question_results(self.question)
+        with self.assertNumQueries(0):
+            self.assertEqual(question_results(self.question)['total'], 4)
+        voter = get_user_model().objects.create_user(username='snacker', email='snacker@example.com', password='12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(voter, self.fruit)
+        self.assertEqual(question_results(self.question)['total'], 5)
+
+    def test_stale_results_served_while_another_request_recomputes(self):
+        question_results(self.question)
+        add_votes(self.fruit.pk)
+        cache.incr(f'polls:results-version:{self.question.pk}')
+        cache.add(f'{LOCK_KEY.format(self.question.pk)}:{results_version(self.question.pk)}', True)
+        with self.assertNumQueries(0):
+            self.assertEqual(question_results(self.question)['total'], 4)
+
+    def test_index_cached_until_a_question_changes(self):
+        latest_questions()
+        with self.assertNumQueries(0):
+            self.assertEqual(latest_questions(), [self.question])
+        newer = Question.objects.create(question_text="Best drink?", pub_date=timezone.now())
+        self.assertEqual(latest_questions()[0], newer)
+
+    def test_results_data_endpoint(self):
+        response = self.client.get(reverse('polls:results-data', args=[self.question.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['choices'][0]['text'], "Nuts")
+
+
+class VoteHistoryTests(TestCase):
+    def setUp(self):
+        self.now = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+        self.question = Question.objects.create(question_text="Lunch?", pub_date=self.now - datetime.timedelta(hours=3))
+        self.soup = Choice.objects.create(question=self.question, choice_text="Soup")
+        self.salad = Choice.objects.create(question=self.question, choice_text="Salad")
+        self.users = [
+            get_user_model().objects.create_user(username=f'luncher{number}', email=f'luncher{number}@example.com', password='12345')
+            for number in range(4)
+        ]
+
+    def vote(self, user, choice, minutes_ago):
+        vote = cast_vote(user, choice)
+        Vote.objects.filter(pk=vote.pk).update(created=self.now - datetime.timedelta(minutes=minutes_ago, seconds=-10))
+
+    def test_rollups_fold_each_vote_once(self):
+        self.vote(self.users[0], self.soup, 1)
+        self.vote(self.users[1], self.soup, 1)
+        self.vote(self.users[2], self.salad, 61)
+        self.assertEqual(roll_up_votes(), 3)
+        self.assertEqual(roll_up_votes(), 0)
+        self.vote(self.users[3], self.soup, 1)
+        self.assertEqual(roll_up_votes(), 1)
+        minute = VoteCount.objects.get(choice=self.soup, period='minute')
+        self.assertEqual((minute.bucket, minute.count), (datetime.datetime(2024, 5, 1, 12, 29, tzinfo=datetime.timezone.utc), 3))
+        self.assertEqual(
+            dict(VoteCount.objects.filter(period='hour').values_list('choice__choice_text', 'bucket__hour')),
+            {"Soup": 12, "Salad": 11},
+        )
+
+    def test_roll_up_command_keeps_running_with_every(self):
+        self.vote(self.users[0], self.soup, 1)
+        with mock.patch('polls.management.commands.roll_up_poll_votes.time.sleep', side_effect=[None, KeyboardInterrupt]) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('roll_up_poll_votes', every=60, stdout=StringIO())
+        self.assertEqual([call.args for call in sleep.call_args_list], [(60,), (60,)])
+        self.assertEqual(VoteCount.objects.get(choice=self.soup, period='minute').count, 1)
+
+    def test_series_reads_rollups_and_fills_gaps(self):
+        self.vote(self.users[0], self.soup, 1)
+        self.vote(self.users[1], self.salad, 3)
+        roll_up_votes()
+        with self.assertNumQueries(1):
+            series = vote_series(self.question, 'minute', self.now - datetime.timedelta(minutes=4), self.now)
+        self.assertEqual([point['total'] for point in series], [0, 1, 0, 1, 0])
+        self.assertEqual(series[3]['choices'], {self.soup.pk: 1})
+        with self.assertRaises(ValueError):
+            vote_series(self.question, 'second')
+
+    def test_trending_orders_recent_questions_by_recent_votes(self):
+        quiet = Question.objects.create(question_text="Dinner?", pub_date=self.now - datetime.timedelta(hours=1))
+        Question.objects.create(question_text="Breakfast?", pub_date=self.now - datetime.timedelta(days=2))
+        self.vote(self.users[0], self.soup, 5)
+        roll_up_votes()
+        trending = list(trending_questions(now=self.now))
+        self.assertEqual(trending, [self.question, quiet])
+        self.assertEqual(trending[0].recent_votes, 1)
+        self.assertEqual(
+            set(Question.objects.published_recently(self.now)),
+            {question for question in Question.objects.all() if question.pub_date >= self.now - datetime.timedelta(days=1)},
+        )
+
+    def test_history_endpoint(self):
+        url = reverse('polls:vote-history', args=[self.question.pk])
+        response = self.client.get(url, {'period': 'hour'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['series']), 7 * 24 + 1)
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'end': '0001-01-01T00:00:00'}).status_code, 400)
+        response = self.client.get(url, {'start': '9999-12-31T23:59', 'end': '9999-12-31T23:59'})
+        self.assertEqual(len(response.json()['series']), 1)
@@ -11,6 +11,9 @@ urlpatterns = [
     path("<int:question_id>/", views.detail, name="detail"),
     # ex: /polls/5/results/
     path("<int:question_id>/results/", views.results, name="results"),
+    path("<int:question_id>/results/data/", views.results_data, name="results-data"),
+    path("<int:question_id>/results/history/", views.vote_history, name="vote-history"),
+    path("trending/", views.trending, name="trending"),
     # ex: /polls/5/vote/
     path("<int:question_id>/vote/", views.vote, name="vote"),
 ]
@@ -1,10 +1,18 @@
-from django.http import HttpResponse
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseRedirect, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
-from .models import Question
+from .models import Choice, Question
+from .history import trending_questions, vote_series
+from .results import latest_questions, question_results
+from .voting import AlreadyVoted, cast_vote
 
 def index(request):
-    latest_question_list = Question.objects.order_by("-pub_date")[:5]
+    latest_question_list = latest_questions()
     context = {"latest_question_list": latest_question_list}
     return render(request, "polls/home.html", context)
 
@@ -19,8 +27,62 @@ def detail(request, question_id):
     return render(request, "polls/detail.html", {"question": question})
 
 def results(request, question_id):
-    response = "You're looking at the results of question %s."
-    return HttpResponse(response % question_id)
+    question = get_object_or_404(Question, pk=question_id)
+    return render(request, "polls/poll_results.html", {"question": question, "results": question_results(question)})
+
+def results_data(request, question_id):
+    question = get_object_or_404(Question, pk=question_id)
+    return JsonResponse(question_results(question))
 
+@login_required
+@require_POST
 def vote(request, question_id):
-    return HttpResponse("You're voting on question %s." % question_id)
+    question = get_object_or_404(Question, pk=question_id)
+    try:
+        selected_choice = question.choice_set.get(pk=request.POST["choice"])
+    except (KeyError, ValueError, Choice.DoesNotExist):
+        return render(request, "polls/detail.html", {
+            "question": question,
+            "error_message": "You didn't select a choice.",
+        }, status=400)
+    try:
+        cast_vote(request.user, selected_choice)
+    except AlreadyVoted:
+        return render(request, "polls/detail.html", {
+            "question": question,
+            "error_message": "You have already voted on this question.",
+        }, status=409)
+    return HttpResponseRedirect(reverse("polls:results", args=(question.id,)))
+
+def parse_moment(value):
+    """Parse an ISO 8601 datetime query parameter; blank gives None."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f"Invalid datetime {value!r}.")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+def vote_history(request, question_id):
+    """
+    Return the votes on a question per minute or hour as JSON.
+
+    Accepts ``period`` (minute or hour; default: minute) and ``start`` and
+    ``end`` (ISO 8601 datetimes; default: the last two hours or seven days).
+    """
+    question = get_object_or_404(Question, pk=question_id)
+    period = request.GET.get("period", "minute")
+    try:
+        start, end = (parse_moment(request.GET.get(name)) for name in ("start", "end"))
+        series = vote_series(question, period, start, end)
+    except (ValueError, TypeError, OverflowError) as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    for point in series:
+        point["bucket"] = point["bucket"].isoformat()
+    return JsonResponse({"question": question.pk, "period": period, "series": series})
+
+def trending(request):
+    return JsonResponse({"questions": [
+        {"id": question.pk, "text": question.question_text, "recent_votes": question.recent_votes}
+        for question in trending_questions()
+    ]})
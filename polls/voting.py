@@ -0,0 +1,171 @@
+# voting.py
+"""
+Vote ingestion.
+
+Each vote inserts one Vote row, whose unique (question, user) constraint
+rejects a second vote by the same user, and adds one to a randomly picked
+VoteShard of the choice with an F() expression. Concurrent votes on one
+choice thus update different rows and none is lost to a read-modify-write
+race. A choice's total is its base ``votes`` plus the sum of its shards.
+
+With POLL_VOTE_BUFFER enabled the shard increments are coalesced in memory
+and flushed in batches (one UPDATE per choice) every POLL_VOTE_FLUSH_INTERVAL
+seconds or POLL_VOTE_FLUSH_SIZE votes. The Vote rows are still written
+immediately, so recount_votes can rebuild the counters from them. Each
+process only sees its own buffer, though: votes still queued in another
+worker are flushed on top of a recount and counted twice. Recount with the
+buffer off, or with the web workers stopped.
+"""
+import atexit
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, F
+from django.dispatch import receiver
+
+from .models import Choice, Vote, VoteShard
+from .results import invalidate_results
+
+DEFAULT_SHARDS = 16
+
+
+class AlreadyVoted(Exception):
+    """Raised when a user votes twice on the same question."""
+
+
+def shard_count():
+    return getattr(settings, 'POLL_VOTE_SHARDS', DEFAULT_SHARDS)
+
+
+def add_votes(choice_id, count=1, shard=None):
+    """Add ``count`` votes to one shard (random by default) of a choice."""
+    if shard is None:
+        shard = random.randrange(shard_count())
+    shards = VoteShard.objects.filter(choice_id=choice_id, shard=shard)
+    if not shards.update(count=F('count') + count):
+        VoteShard.objects.bulk_create([VoteShard(choice_id=choice_id, shard=shard)], ignore_conflicts=True)
+        shards.update(count=F('count') + count)
+
+
+class VoteBuffer:
+    """Coalesce shard increments in memory and write them in batches."""
+
+    def __init__(self, interval=1.0, max_pending=500):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._timer = None
+
+    def add(self, question_id, choice_id, count=1):
+        with self._lock:
+            self._pending[question_id, choice_id] += count
+            full = sum(self._pending.values()) >= self.max_pending
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return sum(self._pending.values())
+
+    def flush(self):
+        """Write the coalesced increments, one UPDATE per choice. Returns the number of votes written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            with transaction.atomic():
+                for (_, choice_id), count in sorted(pending.items()):
+                    add_votes(choice_id, count)
+            for question_id in {question_id for question_id, _ in pending}:
+                invalidate_results(question_id)
+        return sum(pending.values())
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection
+            connections.close_all()
+
+
+_buffer = None
+
+
+def vote_buffer():
+    """Return the process's VoteBuffer, or None when POLL_VOTE_BUFFER is off."""
+    global _buffer
+    if not getattr(settings, 'POLL_VOTE_BUFFER', False):
+        return None
+    if _buffer is None:
+        _buffer = VoteBuffer(
+            interval=getattr(settings, 'POLL_VOTE_FLUSH_INTERVAL', 1.0),
+            max_pending=getattr(settings, 'POLL_VOTE_FLUSH_SIZE', 500),
+        )
+        atexit.register(_buffer.flush)
+    return _buffer
+
+
+@receiver(setting_changed)
+def reset_buffer(setting, **kwargs):
+    global _buffer
+    if setting in ('POLL_VOTE_BUFFER', 'POLL_VOTE_FLUSH_INTERVAL', 'POLL_VOTE_FLUSH_SIZE') and _buffer is not None:
+        _buffer.flush()
+        _buffer = None
+
+
+def cast_vote(user, choice):
+    """
+    Record ``user``'s vote for ``choice``. Raises AlreadyVoted if the user
+    has voted on the question before.
+    """
+    buffer = vote_buffer()
+    try:
+        with transaction.atomic():
+            vote = Vote.objects.create(question_id=choice.question_id, choice=choice, user=user)
+            if buffer is None:
+                add_votes(choice.pk)
+                transaction.on_commit(lambda: invalidate_results(choice.question_id))
+            else:
+                transaction.on_commit(lambda: buffer.add(choice.question_id, choice.pk))
+    except IntegrityError:
+        # Only the unique (question, user) constraint means a repeat vote
+        if not Vote.objects.filter(question_id=choice.question_id, user=user).exists():
+            raise
+        raise AlreadyVoted(f"{user} has already voted on question {choice.question_id}.")
+    return vote
+
+
+def recount_votes(questions=None):
+    """
+    Rebuild the shards of ``questions`` (default: all) from the Vote rows,
+    one shard per choice. Returns the number of choices recounted.
+
+    Increments still buffered in a web worker are added again when it
+    flushes, so run this with POLL_VOTE_BUFFER off or the workers stopped.
+    """
+    choices = Choice.objects.all()
+    if questions is not None:
+        choices = choices.filter(question__in=questions)
+    counts = dict(
+        Vote.objects.filter(choice__in=choices).order_by()
+        .values('choice').annotate(count=Count('pk')).values_list('choice', 'count')
+    )
+    with transaction.atomic():
+        VoteShard.objects.filter(choice__in=choices).delete()
+        VoteShard.objects.bulk_create([
+            VoteShard(choice_id=choice_id, shard=0, count=count) for choice_id, count in counts.items()
+        ])
+    for question_id in set(choices.values_list('question', flat=True)):
+        transaction.on_commit(lambda question_id=question_id: invalidate_results(question_id))
+    return len(counts)
@@ -0,0 +1,147 @@
+# images.py
+"""
+Profile image pipeline.
+
+Saving a profile no longer decodes its image. When the image actually
+changes (by content hash), its resized WebP and JPEG variants are rendered in
+a process pool once the save commits, and stored under content-addressed
+names so identical uploads share one set of files.
+
+The pool lives in the web process, so renders still queued when it stops
+are lost; the profile keeps serving its original image. Run the
+``generate_profile_variants`` command from cron to render those.
+"""
+import atexit
+import hashlib
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each variant, and the formats each is stored in.
+VARIANT_SIZES = (64, 150, 300)
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+VARIANT_QUALITY = 85
+
+VARIANT_DIR = 'profile_pics/variants'
+
+_executor = None
+
+
+def content_hash(field_file):
+    """Return the SHA-256 of a stored file, read in chunks."""
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def variant_name(digest, size, extension):
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest}-{size}.{extension}'
+
+
+def render_variants(data, digest):
+    """
+    Decode ``data`` once and encode every variant. Returns ``{name: bytes}``.
+
+    Runs in a worker process, so it only takes and returns plain values.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        source.load()
+    rendered = {}
+    for size in VARIANT_SIZES:
+        image = source.copy()
+        image.thumbnail((size, size))
+        for extension, format in VARIANT_FORMATS.items():
+            if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                encoded = image.convert('RGB')
+            else:
+                encoded = image
+            buffer = io.BytesIO()
+            encoded.save(buffer, format=format, quality=VARIANT_QUALITY)
+            rendered[variant_name(digest, size, extension)] = buffer.getvalue()
+    return rendered
+
+
+def store_variants(rendered):
+    """Write rendered variants, skipping names that already exist (shared content)."""
+    for name, data in rendered.items():
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(data))
+
+
+def executor():
+    """Return the shared process pool, or None when PROFILE_IMAGE_WORKERS is 0 (render inline)."""
+    global _executor
+    workers = getattr(settings, 'PROFILE_IMAGE_WORKERS', 2)
+    if not workers:
+        return None
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
+def record_hash(profile_id, image_name, digest):
+    """Record ``digest`` as the profile's image hash, unless its image was replaced since."""
+    from .models import Profile
+
+    Profile.objects.filter(pk=profile_id, image=image_name).update(image_hash=digest)
+
+
+def finish(profile_id, image_name, digest, rendered):
+    """Store the variants and record the hash they were rendered from."""
+    store_variants(rendered)
+    record_hash(profile_id, image_name, digest)
+
+
+def process_profile_image(profile_id, digest, image_name=None):
+    """
+    Render and store the variants of a profile's image, off the request.
+    Skipped if ``image_name`` is given and no longer the profile's image.
+    """
+    from .models import Profile
+
+    profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.image or image_name not in (None, profile.image.name):
+        return
+    image_name = profile.image.name
+    if all(default_storage.exists(variant_name(digest, size, extension)) for size in VARIANT_SIZES for extension in VARIANT_FORMATS):
+        # Same content as an earlier upload: nothing to render
+        record_hash(profile_id, image_name, digest)
+        return
+    with profile.image.open('rb') as image:
+        data = image.read()
+
+    pool = executor()
+    if pool is None:
+        finish(profile_id, image_name, digest, render_variants(data, digest))
+        return
+
+    def done(future):
+        # Runs on the pool's result thread, which has its own connection
+        try:
+            finish(profile_id, image_name, digest, future.result())
+        except Exception:
+            logger.exception("Could not render the image variants of profile %s", profile_id)
+        finally:
+            connections.close_all()
+    pool.submit(render_variants, data, digest).add_done_callback(done)
+
+
+def schedule_variants(profile, digest):
+    """Render ``profile``'s variants for ``digest`` once the current transaction commits."""
+    image_name = profile.image.name
+    transaction.on_commit(lambda: process_profile_image(profile.pk, digest, image_name))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from users.images import content_hash, process_profile_image
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the resized variants of profile images that have none, or of every profile with --all. "
+        "Run it from cron: renders queued in a web worker are lost when the worker stops."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-check every profile, not only those without variants.")
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(image__in=['', Profile._meta.get_field('image').default])
+        if not options['all']:
+            profiles = profiles.filter(image_hash='')
+        done = missing = 0
+        # Render inline: the command is already off the request path
+        with override_settings(PROFILE_IMAGE_WORKERS=0):
+            for profile in profiles.only('pk', 'image', 'image_hash').iterator():
+                try:
+                    digest = content_hash(profile.image)
+                except OSError:
+                    missing += 1
+                    continue
+                if digest != profile.image_hash or options['all']:
+                    process_profile_image(profile.pk, digest)
+                    done += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered variants for {done} profiles ({missing} images missing)."))
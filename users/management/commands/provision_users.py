@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from users.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = "Create user accounts and their profiles in bulk from a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with a header row: username, email, password, first_name, last_name, age, weight, height, dietary_preferences.")
+        parser.add_argument('--group', help="Add every new user to this auth group (created if needed).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users written per transaction.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: PROVISIONING_WORKERS or the CPU count; 0 hashes inline).")
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f"{result.processed} rows processed, {result.created} created ({result.rate:.0f}/s)")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            result = provision_users(
+                stream, batch_size=options['batch_size'], group=options['group'],
+                workers=options['workers'], progress=progress,
+            )
+
+        for line, errors in result.errors:
+            for field, messages in errors.items():
+                self.stderr.write(f"Line {line}: {field}: {' '.join(messages)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Provisioned {result} ({result.skipped} already taken, {result.failed} rows rejected, "
+            f"{result.profiles_repaired} missing profiles created)."
+        ))
@@ -1,10 +1,17 @@
+import logging
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import default_storage
 from django.core.validators import FileExtensionValidator
-from PIL import Image
+
+from .images import content_hash, schedule_variants, variant_name
+from .tracking import DirtyFieldsMixin
+
+logger = logging.getLogger(__name__)
 
 # Custom User Model
-class CustomUser(AbstractUser):
+class CustomUser(DirtyFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True)
 
     def __str__(self):
@@ -18,7 +25,7 @@ def user_directory_path(instance, filename):
 
 
 # Profile Model
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(
         CustomUser, 
         on_delete=models.CASCADE, 
@@ -29,6 +36,8 @@ class Profile(models.Model):
         upload_to=user_directory_path,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]
     )
+    # SHA-256 of the image the stored variants were rendered from
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
     age = models.IntegerField(null=True, blank=True)
     weight = models.FloatField(null=True, blank=True)
     height = models.FloatField(null=True, blank=True)
@@ -38,15 +47,39 @@ class Profile(models.Model):
         return f'{self.user.username} Profile'
 
     def save(self, *args, **kwargs):
-        """Override save method to resize image before saving."""
+        """Save the changed fields, then queue new variants if the image content changed."""
+        update_fields = kwargs.get('update_fields')
+        image_changed = 'image' in self.dirty_fields() and (update_fields is None or 'image' in update_fields)
+        if image_changed and not self._state.adding:
+            # The old image's variants must not be served for the new one
+            self.image_hash = ''
+            kwargs['update_fields'] = {*(self.dirty_fields() if update_fields is None else update_fields), 'image_hash'}
         super().save(*args, **kwargs)
+        if not image_changed:
+            return
+        # The shared default picture is served as is
+        if self.image and self.image.name != self._meta.get_field('image').default:
+            try:
+                digest = content_hash(self.image)
+            except OSError:
+                logger.warning("Profile image %s is missing; no variants rendered.", self.image.name)
+            else:
+                if digest != self.image_hash:
+                    schedule_variants(self, digest)
+
+    def image_variant_url(self, size=150, extension='webp'):
+        """URL of a resized copy of the image, or of the original until variants exist."""
+        if self.image_hash:
+            return default_storage.url(variant_name(self.image_hash, size, extension))
+        return self.image.url if self.image else ''
 
-        if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.image.path)
+    @property
+    def avatar_url(self):
+        return self.image_variant_url(64)
+
+    @property
+    def picture_url(self):
+        return self.image_variant_url(300)
 
     @property
     def bmi(self):
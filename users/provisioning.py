@@ -0,0 +1,230 @@
+# provisioning.py
+"""
+Bulk user provisioning.
+
+Accounts are read from a CSV file and written with bulk_create, users and
+their profiles together, one transaction per batch. bulk_create sends no
+post_save, so none of the per-user receivers in signals.py run; a single
+consistency pass at the end gives any user still missing a profile one.
+Password hashing, which dominates the cost, runs in a process pool and
+overlaps with writing the previous batch.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import BaseUserManager, Group
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import CustomUser, Profile
+
+# Profile fields a provisioning row may set; anything else in the row is ignored.
+PROFILE_FIELDS = ('age', 'weight', 'height', 'dietary_preferences')
+
+USER_FIELDS = ('first_name', 'last_name')
+
+
+class ProvisionResult:
+    """Running totals, row-level errors and throughput of a provisioning run."""
+
+    def __init__(self, max_errors=1000):
+        self.created = 0
+        self.skipped = 0  # username or email already taken
+        self.failed = 0
+        self.profiles_repaired = 0
+        self.errors = []  # (line number, {field: [messages]})
+        self.max_errors = max_errors
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    @property
+    def processed(self):
+        return self.created + self.skipped + self.failed
+
+    @property
+    def rate(self):
+        """Users created per second."""
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}))
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'profiles_repaired': self.profiles_repaired,
+            'errors': [{'line': line, 'errors': errors} for line, errors in self.errors],
+        }
+
+    def __str__(self):
+        return f"{self.created} users in {self.seconds:.1f}s ({self.rate:.0f}/s)"
+
+
+def build_account(row):
+    """
+    Validate one CSV row and return ``(user, profile, password)``, unsaved.
+
+    Raises ValidationError with the offending fields.
+    """
+    errors = {}
+    username = CustomUser.normalize_username((row.get('username') or '').strip())
+    email = BaseUserManager.normalize_email((row.get('email') or '').strip())
+    username_field = CustomUser._meta.get_field('username')
+    try:
+        username_field.clean(username, None)
+    except ValidationError as error:
+        errors['username'] = error.messages
+    try:
+        validate_email(email)
+    except ValidationError as error:
+        errors['email'] = error.messages
+    user = CustomUser(username=username, email=email, **{
+        field: (row.get(field) or '').strip() for field in USER_FIELDS
+    })
+    profile = Profile(**{field: row[field] for field in PROFILE_FIELDS if row.get(field) not in (None, '')})
+    try:
+        profile.full_clean(exclude=['user', 'image'], validate_unique=False, validate_constraints=False)
+    except ValidationError as error:
+        errors.update(error.message_dict)
+    if errors:
+        raise ValidationError(errors)
+    return user, profile, row.get('password') or None
+
+
+def init_worker():
+    # Spawned (not forked) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+
+def password_hasher(workers=None):
+    """
+    Return ``(hash, close)``. ``hash(passwords)`` starts hashing a batch and
+    returns an iterator of the encoded passwords. PROVISIONING_WORKERS (or
+    ``workers``) sets the pool size; 0 hashes inline.
+    """
+    if workers is None:
+        workers = getattr(settings, 'PROVISIONING_WORKERS', os.cpu_count() or 1)
+    if not workers:
+        return (lambda passwords: map(make_password, passwords)), (lambda: None)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+    def hash(passwords):
+        passwords = list(passwords)
+        return pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4)))
+    return hash, pool.shutdown
+
+
+def write_batch(batch, hashes, group, result):
+    """Insert a batch of ``(line, user, profile)`` accounts not already taken, in one transaction."""
+    with transaction.atomic():
+        taken_usernames = set(CustomUser.objects.filter(
+            username__in=[user.username for _, user, _ in batch]).values_list('username', flat=True))
+        taken_emails = set(CustomUser.objects.filter(
+            email__in=[user.email for _, user, _ in batch]).values_list('email', flat=True))
+
+        users, profiles = [], []
+        for (_, user, profile), password in zip(batch, hashes):
+            if user.username in taken_usernames or user.email in taken_emails:
+                result.skipped += 1
+                continue
+            user.password = password
+            users.append(user)
+            profiles.append(profile)
+
+        CustomUser.objects.bulk_create(users)
+        for user, profile in zip(users, profiles):
+            profile.user = user
+        Profile.objects.bulk_create(profiles)
+        if group is not None:
+            Membership = CustomUser.groups.through
+            Membership.objects.bulk_create([Membership(customuser_id=user.pk, group_id=group.pk) for user in users])
+    result.created += len(users)
+
+
+def ensure_profiles(batch_size=1000):
+    """Create the missing Profile of every user that has none. Returns the number created."""
+    missing = CustomUser.objects.exclude(pk__in=Profile.objects.values('user')).values_list('pk', flat=True)
+    created = 0
+    batch = []
+    for user_id in missing.iterator(chunk_size=batch_size):
+        batch.append(Profile(user_id=user_id))
+        if len(batch) >= batch_size:
+            created += len(Profile.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+    if batch:
+        created += len(Profile.objects.bulk_create(batch, ignore_conflicts=True))
+    return created
+
+
+def provision_users(stream, batch_size=1000, group=None, workers=None, progress=None, max_errors=1000):
+    """
+    Create the users listed in a CSV text stream with a header row.
+
+    Columns: username and email (required), password (blank for an unusable
+    one), first_name, last_name and the PROFILE_FIELDS. Rows whose username
+    or email is already taken, in the database or earlier in the file, are
+    skipped; invalid rows are reported. New users are added to ``group`` (a
+    Group or a name) if given. ``progress`` is called with the running
+    ProvisionResult after every batch.
+    """
+    result = ProvisionResult(max_errors=max_errors)
+    if isinstance(group, str):
+        group, _ = Group.objects.get_or_create(name=group)
+    hash, close = password_hasher(workers)
+    seen_usernames, seen_emails = set(), set()
+    reader = csv.DictReader(stream)
+    batch, pending = [], None
+
+    def flush():
+        # Start hashing this batch, then write the previous one while it runs
+        nonlocal batch, pending
+        hashes = hash(password for *_, password in batch)
+        accounts = [(line, user, profile) for line, user, profile, _ in batch]
+        if pending:
+            write(*pending)
+        pending, batch = (accounts, hashes), []
+
+    def write(accounts, hashes):
+        write_batch(accounts, hashes, group, result)
+        result.seconds = time.monotonic() - result.started
+        if progress:
+            progress(result)
+
+    try:
+        for row in reader:
+            try:
+                user, profile, password = build_account(row)
+            except ValidationError as error:
+                result.add_error(reader.line_num, error)
+                continue
+            email = user.email.lower()
+            if user.username in seen_usernames or email in seen_emails:
+                result.skipped += 1
+                continue
+            seen_usernames.add(user.username)
+            seen_emails.add(email)
+            batch.append((reader.line_num, user, profile, password))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        if pending:
+            write(*pending)
+    finally:
+        close()
+
+    result.profiles_repaired = ensure_profiles(batch_size)
+    result.seconds = time.monotonic() - result.started
+    return result
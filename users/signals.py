@@ -1,13 +1,23 @@
 from django.db.models.signals import post_save
-from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .models import CustomUser, Profile
+
+# The user -> profile relation, whose cache says whether a user's profile was loaded
+PROFILE_RELATION = Profile._meta.get_field('user').remote_field
 
-@receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        Profile.objects.create(user=instance)
 
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+@receiver(post_save, sender=CustomUser)
+def sync_profile(sender, instance, created, raw, **kwargs):
+    """
+    Create a new user's profile. Afterwards save the profile only if it was
+    loaded through the user and has changed, so a last_login update or a
+    user edit costs no profile query.
+    """
+    if raw:
+        return
+    if created:
+        Profile.objects.get_or_create(user=instance)
+        return
+    profile = PROFILE_RELATION.get_cached_value(instance, default=None)
+    if isinstance(profile, Profile) and profile.is_dirty():
+        profile.save()
@@ -1,5 +1,17 @@
-from django.test import TestCase, Client
+import io
+import shutil
+import tempfile
+from unittest import mock
+from io import StringIO
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from .provisioning import provision_users
+from .images import VARIANT_FORMATS, VARIANT_SIZES, variant_name
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
 from .models import Profile
 from django.urls import reverse
@@ -91,3 +103,168 @@ class UserProfileViewTest(TestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.username, 'updateduser')
         self.assertEqual(self.user.email, 'updated@example.com')
+
+
+class ProfileImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root, PROFILE_IMAGE_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user(username='pictured', email='pictured@example.com', password='password123')
+        self.profile, _ = Profile.objects.get_or_create(user=self.user)
+
+    def upload(self, color='red', size=(800, 600)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, format='PNG')
+        return SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+
+    def test_variants_rendered_after_commit(self):
+        self.profile.image = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        self.profile.refresh_from_db()
+        self.assertEqual(len(self.profile.image_hash), 64)
+        for size in VARIANT_SIZES:
+            for extension in VARIANT_FORMATS:
+                name = variant_name(self.profile.image_hash, size, extension)
+                self.assertTrue(default_storage.exists(name))
+                with default_storage.open(name) as stored, Image.open(stored) as image:
+                    self.assertEqual(max(image.size), size)
+        self.assertTrue(self.profile.avatar_url.endswith(f'{self.profile.image_hash}-64.webp'))
+        # The original upload is kept as is
+        with self.profile.image.open('rb') as original, Image.open(original) as image:
+            self.assertEqual(image.size, (800, 600))
+
+    def test_unchanged_image_not_reprocessed(self):
+        self.profile.image = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        self.profile.refresh_from_db()
+        self.profile.age = 30
+        with mock.patch('users.models.schedule_variants') as schedule:
+            self.profile.save()
+        schedule.assert_not_called()
+
+    def test_late_render_of_replaced_image_is_dropped(self):
+        self.profile.image = self.upload('red')
+        with self.captureOnCommitCallbacks() as first:
+            self.profile.save()
+        self.profile.image = self.upload('blue')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        self.profile.refresh_from_db()
+        current = self.profile.image_hash
+        for callback in first:
+            callback()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.image_hash, current)
+
+    def test_new_image_clears_old_hash(self):
+        self.profile.image = self.upload('red')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        self.profile.refresh_from_db()
+        self.profile.image = self.upload('blue')
+        with self.captureOnCommitCallbacks():
+            self.profile.save()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.image_hash, '')
+        self.assertEqual(self.profile.avatar_url, self.profile.image.url)
+
+    def test_identical_upload_shares_variants(self):
+        self.profile.image = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        other = get_user_model().objects.create_user(username='twin', email='twin@example.com', password='password123')
+        twin, _ = Profile.objects.get_or_create(user=other)
+        twin.image = self.upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.save()
+        twin.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertEqual(twin.image_hash, self.profile.image_hash)
+        self.assertNotEqual(twin.image.name, self.profile.image.name)
+
+
+class DirtyFieldTrackingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tracked', email='tracked@example.com', password='password123')
+
+    def test_profile_created_once_with_user(self):
+        self.assertEqual(Profile.objects.filter(user=self.user).count(), 1)
+
+    def test_unchanged_save_writes_nothing(self):
+        profile = Profile.objects.get(user=self.user)
+        with self.assertNumQueries(0):
+            profile.save()
+
+    def test_save_writes_only_changed_fields(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.age = 31
+        self.assertEqual(profile.dirty_fields(), {'age'})
+        with self.assertNumQueries(1) as queries:
+            profile.save()
+        self.assertNotIn('weight', queries.captured_queries[0]['sql'])
+        self.assertFalse(profile.is_dirty())
+        self.assertEqual(Profile.objects.get(user=self.user).age, 31)
+
+    def test_login_does_not_touch_profile(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+
+    def test_user_save_saves_loaded_profile_changes(self):
+        profile = Profile.objects.select_related('user').get(user=self.user)
+        user = profile.user
+        user.first_name = 'Tracy'
+        profile.weight = 70.5
+        user.save()
+        self.assertEqual(Profile.objects.get(user=self.user).weight, 70.5)
+        self.assertFalse(user.is_dirty())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TestCase):
+    def test_csv_creates_users_profiles_and_memberships(self):
+        get_user_model().objects.create_user(username='existing', email='existing@example.com', password='password123')
+        stream = StringIO(
+            "username,email,password,first_name,age\n"
+            "ann,ann@example.com,secret-1,Ann,34\n"
+            "bob,bob@example.com,,Bob,\n"
+            "existing,other@example.com,secret-2,,\n"
+            "ann,ann2@example.com,secret-3,,\n"
+            "bad,not-an-email,secret-4,,\n"
+            "cat,cat@example.com,secret-5,,-3x\n"
+        )
+        result = provision_users(stream, batch_size=1, group='acme', workers=0)
+        self.assertEqual((result.created, result.skipped, result.failed), (2, 2, 2))
+        self.assertEqual([line for line, _ in result.errors], [6, 7])
+        ann = get_user_model().objects.get(username='ann')
+        self.assertTrue(ann.check_password('secret-1'))
+        self.assertEqual(ann.first_name, 'Ann')
+        self.assertEqual(Profile.objects.get(user=ann).age, 34)
+        self.assertFalse(get_user_model().objects.get(username='bob').has_usable_password())
+        self.assertEqual(set(get_user_model().objects.filter(groups__name='acme').values_list('username', flat=True)), {'ann', 'bob'})
+
+    def test_consistency_pass_creates_missing_profiles(self):
+        orphan = get_user_model().objects.create_user(username='orphan', email='orphan@example.com', password='password123')
+        Profile.objects.filter(user=orphan).delete()
+        result = provision_users(StringIO("username,email\n"), workers=0)
+        self.assertEqual(result.profiles_repaired, 1)
+        self.assertTrue(Profile.objects.filter(user=orphan).exists())
+
+    def test_upload_endpoint_reports_unreadable_and_oversized_files(self):
+        staff = get_user_model().objects.create_user(username='admin', email='admin@example.com', password='password123', is_staff=True)
+        self.client.force_login(staff)
+        # A field past the csv module's size limit makes the reader raise csv.Error
+        bad = SimpleUploadedFile('users.csv', b'username,email\n' + b'a' * 200000 + b'\n', content_type='text/csv')
+        response = self.client.post(reverse('provision-users'), {'file': bad})
+        self.assertEqual(response.status_code, 400)
+        with mock.patch('users.views.PROVISIONING_UPLOAD_MAX_BYTES', 10):
+            big = SimpleUploadedFile('users.csv', b'username,email\nann,ann@example.com\n', content_type='text/csv')
+            response = self.client.post(reverse('provision-users'), {'file': big})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('provision_users', response.json()['error'])
+        self.assertFalse(get_user_model().objects.filter(username='ann').exists())
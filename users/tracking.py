@@ -0,0 +1,58 @@
+# tracking.py
+"""
+Change tracking for model instances.
+
+Instances remember their field values as read from the database, so a save
+of a loaded instance writes only the columns that changed (with
+``update_fields``) and a save with nothing changed issues no query at all.
+"""
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin:
+    """Model mixin that saves only the fields changed since the row was loaded."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _tracked_value(self, field):
+        value = self.__dict__[field.attname]
+        # A file compares by the name stored in its column
+        return value.name if isinstance(value, FieldFile) else value
+
+    def _snapshot(self, fields=None):
+        """Record the current values of ``fields`` (names; default: all loaded fields) as clean."""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                loaded[field.attname] = self._tracked_value(field)
+
+    def dirty_fields(self):
+        """Return the names of the fields a save would have to write."""
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        loaded = self.__dict__.get('_loaded_values')
+        if self._state.adding or loaded is None:
+            return {field.name for field in fields}
+        return {
+            field.name for field in fields
+            if field.attname in self.__dict__ and (
+                field.attname not in loaded
+                or loaded[field.attname] != self._tracked_value(field)
+                or getattr(field, 'auto_now', False)
+            )
+        }
+
+    def is_dirty(self):
+        return bool(self.dirty_fields())
+
+    def save(self, *args, **kwargs):
+        if (
+            not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+            and not self._state.adding and '_loaded_values' in self.__dict__
+        ):
+            kwargs['update_fields'] = self.dirty_fields()
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get('update_fields'))
@@ -1,9 +1,19 @@
+import csv
+import io
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import login, logout
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
+from .provisioning import provision_users
+
+# Uploads above this size are left to the provision_users management command
+PROVISIONING_UPLOAD_MAX_BYTES = getattr(settings, 'PROVISIONING_UPLOAD_MAX_BYTES', 1024 * 1024)
 
 # User Registration View
 def register(request):
@@ -61,3 +71,28 @@ def profile(request):
         'p_form': p_form
     }
     return render(request, 'users/profile.html', context)
+
+# Bulk Provisioning View
+@staff_member_required
+@require_POST
+def provision_users_upload(request):
+    """
+    Create the user accounts of a small uploaded CSV and report the outcome
+    as JSON. Passwords are hashed inline, in the request; larger files are
+    refused with a pointer to ``manage.py provision_users``, which hashes in
+    a process pool.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': "No file uploaded."}, status=400)
+    if upload.size > PROVISIONING_UPLOAD_MAX_BYTES:
+        return JsonResponse({
+            'error': f"Uploads are limited to {PROVISIONING_UPLOAD_MAX_BYTES} bytes; "
+                     "run 'manage.py provision_users' for larger files.",
+        }, status=413)
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        result = provision_users(stream, group=request.POST.get('group') or None, workers=0)
+    except (csv.Error, UnicodeDecodeError) as error:
+        return JsonResponse({'error': f"Could not read the file: {error}"}, status=400)
+    return JsonResponse(result.as_dict())